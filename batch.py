@@ -0,0 +1,124 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout, redirect_stderr
+
+# plush build DIR -j N: compiles every .pl file under DIR. c_functions.o is built once, then each
+# worker process runs the front end of a file and its llc and gcc subprocesses, so N files are
+# built at a time. The artifacts of DIR/a/b.pl go to OUT/a/, a file that fails does not stop the others
+
+def findSources(dir):
+    sources = []
+    for root, dirs, files in os.walk(dir):
+        dirs.sort()
+        sources += [os.path.join(root, file) for file in sorted(files) if file.endswith(".pl")]
+    return sources
+
+def startWorker():
+    from plush import frontEnd
+    frontEnd()
+
+def buildFile(file, outDir, optLevel, useCache):
+    from plush import compileFile
+    from cache import BuildCache
+    from timing import PassTimer
+
+    cache = BuildCache() if useCache else None
+    timer = PassTimer()
+    out = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(out), redirect_stderr(out):
+        try:
+            status = compileFile(file, outDir, rebuildRuntime=False, cache=cache, optLevel=optLevel, timer=timer)
+        # the front end reports errors by printing and calling exit
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+    elapsed = time.perf_counter() - start
+
+    if cache:
+        cache.flush()
+
+    return status, out.getvalue(), elapsed, timer.phases
+
+# seconds spent in the phases of each group, cached when they came from the cache and None when they
+# did not run. A cached stage is recorded with its name in the cache, a cached build as build
+phaseGroups = {
+    "front end": (["parse", "verify", "fold", "codegen"], ["ll"]),
+    "opt+llc": (["opt", "llc"], ["opt", "s"]),
+    "gcc": (["assemble", "link"], ["o", "exe"]),
+}
+
+def groupTimes(phases):
+    cached = {phase["phase"] for phase in phases if phase["cached"]}
+    times = {}
+    for group, (names, stages) in phaseGroups.items():
+        ran = [phase["wall"] for phase in phases if phase["phase"] in names and not phase["cached"]]
+        if ran:
+            times[group] = sum(ran)
+        elif "build" in cached or cached & set(stages):
+            times[group] = "cached"
+        else:
+            times[group] = None
+    return times
+
+def formatTime(seconds):
+    match seconds:
+        case None:
+            return f"{'-':>10}"
+        case "cached":
+            return f"{'cached':>10}"
+        case _:
+            return f"{seconds:>9.3f}s"
+
+def build(dir, jobs=None, outDir="build", optLevel=0, useCache=True):
+    from plush import buildRuntime
+
+    sources = findSources(dir)
+    if not sources:
+        print(f"No .pl files in {dir}")
+        return 1
+
+    if buildRuntime() != 0:
+        print("Could not build c_functions.o")
+        return 1
+
+    width = max(len(os.path.relpath(file, dir)) for file in sources) + 2
+    print(f"{'file':<{width}}{'status':>8}{'total':>10}" + "".join(f"{group:>10}" for group in phaseGroups))
+    failures = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(jobs, initializer=startWorker) as pool:
+        futures = {}
+        for file in sources:
+            fileOutDir = os.path.join(outDir, os.path.dirname(os.path.relpath(file, dir)))
+            os.makedirs(fileOutDir, exist_ok=True)
+            futures[pool.submit(buildFile, file, fileOutDir, optLevel, useCache)] = file
+
+        for future in as_completed(futures):
+            file = os.path.relpath(futures[future], dir)
+            try:
+                status, output, elapsed, phases = future.result()
+            except Exception as e:
+                status, output, elapsed, phases = 1, f"Build worker error: {e}\n", 0.0, []
+            if status != 0:
+                failures.append((file, output))
+            times = groupTimes(phases)
+            print(f"{file:<{width}}{'ok' if status == 0 else 'failed':>8}{elapsed:>9.3f}s" + "".join(formatTime(times[group]) for group in phaseGroups), flush=True)
+    elapsed = time.perf_counter() - start
+
+    for file, output in sorted(failures):
+        print(f"\n{file}:")
+        print(output.rstrip())
+    print(f"\n{len(sources) - len(failures)} built, {len(failures)} failed in {elapsed:.3f}s")
+    return 1 if failures else 0
+
+def main(argv):
+    argParser = argparse.ArgumentParser(prog="plush build")
+    argParser.add_argument("dir", help="directory with the .pl files to build")
+    argParser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="files built at a time, by default the number of cpus")
+    argParser.add_argument("-o", "--out-dir", default="build", help="directory of the artifacts, by default build")
+    argParser.add_argument("-O", dest="optLevel", type=int, choices=[0, 1, 2, 3], default=int(os.environ.get("PLUSH_OPT_LEVEL", 0)), help="optimization level, by default $PLUSH_OPT_LEVEL or 0")
+    argParser.add_argument("--no-cache", action="store_true", help="always rebuild every artifact")
+    args = argParser.parse_args(argv)
+    return build(args.dir, args.jobs, args.out_dir, args.optLevel, not args.no_cache)
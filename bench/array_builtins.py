@@ -0,0 +1,56 @@
+import argparse
+import io
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from common import workload, build, timeRun
+
+from parser import parse
+from typeChecker import verify, Context as TypeContext
+import interpreter
+import closures
+
+# Elements each array builtin of the workload goes through, in the order they are called
+passes = 16
+
+def timeInterpreter(source, repeat, vectorized):
+    numpy = interpreter.numpy
+    interpreter.numpy = numpy if vectorized else None
+    best = None
+    try:
+        for _ in range(repeat):
+            ast = parse(source)
+            verify(TypeContext(), ast)
+            run = closures.compileProgram(ast)
+            out = io.StringIO()
+            t = time.perf_counter()
+            with redirect_stdout(out):
+                run(["./arrayBuiltins"])
+            elapsed = time.perf_counter() - t
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        interpreter.numpy = numpy
+    return best, out.getvalue()
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("-n", type=int, default=1_000_000, help="number of elements of the arrays")
+    argParser.add_argument("--repeat", type=int, default=3)
+    args = argParser.parse_args()
+
+    source = workload("arrayBuiltins", args.n)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for level in [0, 2]:
+            results[f"native -O{level}"] = timeRun([build(source, f"arrayBuiltins_O{level}", tmpDir, level)], args.repeat)
+    if interpreter.numpy:
+        results["--run numpy"] = timeInterpreter(source, args.repeat, True)
+    results["--run python"] = timeInterpreter(source, args.repeat, False)
+
+    outputs = {out for _, out in results.values()}
+    print(f"{'engine':<16}{'time':>10}{'Melem/s':>10}")
+    for name, (elapsed, _) in results.items():
+        print(f"{name:<16}{elapsed:>9.3f}s{passes * args.n / elapsed / 1e6:>10.1f}")
+    if len(outputs) > 1:
+        print("outputs differ")
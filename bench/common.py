@@ -0,0 +1,48 @@
+import io
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+workloadsDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workloads")
+
+# Workloads are plush programs whose size is the global `val N: int := ...;`
+def workload(name, n=None):
+    with open(os.path.join(workloadsDir, name + ".pl")) as f:
+        source = f.read()
+    if n is not None:
+        source = re.sub(r"val N: int := [\d_]+;", f"val N: int := {n};", source, count=1)
+    return source
+
+def build(source, name, outDir, optLevel=0, **flags):
+    from plush import compileFile, buildRuntime
+
+    file = os.path.join(outDir, name + ".pl")
+    with open(file, "w") as f:
+        f.write(source)
+
+    out = io.StringIO()
+    with redirect_stdout(out):
+        buildRuntime()
+        status = compileFile(file, outDir, rebuildRuntime=False, optLevel=optLevel, **flags)
+    if status != 0:
+        raise RuntimeError(f"Could not build {name}:\n{out.getvalue()}")
+
+    return os.path.join(outDir, name)
+
+# Best wall time of a command and its output
+def timeRun(cmd, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        elapsed = time.perf_counter() - t
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} failed:\n{proc.stdout}{proc.stderr}")
+        best = elapsed if best is None else min(best, elapsed)
+    return best, proc.stdout
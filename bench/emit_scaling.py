@@ -0,0 +1,78 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from common import root
+
+from parser import parse
+from typeChecker import verify, Context as TypeContext
+from codegen import codegen, Emitter
+
+# Functions of 100 string literals and one global per function
+def synthetic(literals):
+    lines = ["function print_str(val s: string);", "function print_int(val n: int);", ""]
+    functions = max(1, literals // 100)
+    for f in range(functions):
+        lines.append(f"var g{f}: int := {f};")
+        lines.append(f"function f{f}() {{")
+        lines.extend(f"  print_str(\"literal {f} {i}\");" for i in range(literals // functions))
+        lines.append(f"  print_int(g{f});")
+        lines.append("}")
+    lines.append("function main() {")
+    lines.extend(f"  f{f}();" for f in range(functions))
+    lines.append("}")
+    return "\n".join(lines)
+
+# What the emitter used to do: every global and string constant inserted at the front of the
+# function lines and the whole module joined in memory before writing it
+class LegacyEmitter(Emitter):
+    def addConstant(self, line):
+        self.lines.insert(0, line)
+
+    def flush(self):
+        pass
+
+    def finish(self):
+        pass
+
+def emit(ast, path, legacy):
+    with open(path, "w") as out:
+        if legacy:
+            emitter = codegen(ast, LegacyEmitter())
+            out.write("\n".join(emitter.types))
+            out.write("\n".join(emitter.lines))
+            out.write("\n".join(emitter.decls))
+        else:
+            codegen(ast, Emitter(out=out))
+
+def measure(source, path, legacy):
+    ast = parse(source)
+    verify(TypeContext(), ast)
+    t = time.perf_counter()
+    emit(ast, path, legacy)
+    elapsed = time.perf_counter() - t
+
+    ast = parse(source)
+    verify(TypeContext(), ast)
+    tracemalloc.start()
+    emit(ast, path, legacy)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="number of string literals of each program")
+    args = argParser.parse_args()
+
+    print(f"{'literals':>10}{'legacy':>12}{'peak':>10}{'sections':>12}{'peak':>10}")
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for size in args.sizes:
+            source = synthetic(size)
+            row = f"{size:>10}"
+            for legacy in [True, False]:
+                elapsed, peak = measure(source, os.path.join(tmpDir, f"synthetic_{size}.ll"), legacy)
+                row += f"{elapsed:>11.3f}s{peak / 2**20:>7.1f}MiB"
+            print(row)
@@ -0,0 +1,70 @@
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+from common import root, workload
+
+from parser import parse
+from typeChecker import verify, Context as TypeContext
+from optimizer import optimize
+from interpreter import eval, Context as ValueContext
+import closures
+import vm
+
+# Sizes of the bench/workloads programs that run in a few seconds in the tree walker
+workloadSizes = {"isPrime": 20_000, "insertionSort": 300, "fibonacci": 2_000}
+
+def frontEnd(source):
+    ast = parse(source)
+    verify(TypeContext(), ast)
+    optimize(ast)
+    return ast
+
+def treeWalker(source):
+    ast = frontEnd(source)
+    return lambda: eval(ast, ValueContext())
+
+def closureCompiler(source):
+    run = closures.compileProgram(frontEnd(source))
+    return lambda: run(["./program"])
+
+def registerVm(source):
+    program = vm.compileProgram(frontEnd(source))
+    return lambda: vm.execute(*program, ["./program"])
+
+engines = {"tree walker": treeWalker, "closures": closureCompiler, "vm": registerVm}
+
+def best(engine, source, repeat):
+    times = []
+    for _ in range(repeat):
+        run = engine(source)
+        out = io.StringIO()
+        t = time.perf_counter()
+        with redirect_stdout(out):
+            run()
+        times.append(time.perf_counter() - t)
+    return min(times), out.getvalue()
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--repeat", type=int, default=5)
+    argParser.add_argument("--scale", type=float, default=1.0, help="multiplies the size of the bench/workloads programs, 0 skips them")
+    args = argParser.parse_args()
+    sys.setrecursionlimit(200_000)
+
+    programs = [(os.path.relpath(file, root), open(file).read()) for file in sorted(glob.glob(os.path.join(root, "programs", "*.pl")))]
+    for name, n in workloadSizes.items():
+        n = int(n * args.scale)
+        if n:
+            programs.append((f"workloads/{name} {n}", workload(name, n)))
+
+    print(f"{'program':<32}" + "".join(f"{engine:>14}" for engine in engines) + "".join(f"{engine:>10}" for engine in list(engines)[1:]))
+    for name, source in programs:
+        results = [best(engine, source, args.repeat) for engine in engines.values()]
+        times = [elapsed for elapsed, _ in results]
+        note = "" if len({out for _, out in results}) == 1 else "  output differs"
+        print(f"{name:<32}" + "".join(f"{t * 1000:>12.2f}ms" for t in times) + "".join(f"{times[0] / t:>9.1f}x" for t in times[1:]) + note)
@@ -0,0 +1,150 @@
+import argparse
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+from common import root, build
+from program_generator import generateProgram
+
+from plush import pausedCollector
+from parser import parse, lexer
+from typeChecker import verify, Context as TypeContext
+from optimizer import optimize, countNodes
+from codegen import codegen, Emitter
+
+# Time and peak memory of every phase of the front end on generated programs of growing size. One
+# size parameter of the generator grows, the others keep their value, and each phase is reported
+# in microseconds per AST node with the exponent of its growth over the size before it: a phase
+# that scales linearly stays near 1, one near 2 is quadratic in the size of the program. The phases
+# run with the collector paused, like in plush, unless --gc is given. --no-ssa generates the code with
+# every local in an alloca, and --build also builds and runs every program, in the python engine and
+# natively at --levels, so the code generated for it is checked and not only timed
+phases = ["lex", "parse", "verify", "fold", "codegen"]
+sizeNames = {"functions": "functions", "depth": "depth", "expression": "expressionSize", "statements": "statements", "structs": "structs", "globals": "globals", "strings": "strings"}
+
+def lex(source):
+    lex = lexer.clone()
+    lex.lineno = 1
+    lex.input(source)
+    tokens = 0
+    while lex.token():
+        tokens += 1
+    return tokens
+
+# Runs the phases in order, each on the result of the one before, and calls measure around each.
+# Returns the nodes of the AST before folding
+def runPhases(source, measure, ssa):
+    measure("lex", lambda: lex(source))
+    ast = measure("parse", lambda: parse(source))
+    nodes = countNodes(ast)
+    measure("verify", lambda: verify(TypeContext(), ast))
+    measure("fold", lambda: optimize(ast))
+    with open(os.devnull, "w") as out:
+        measure("codegen", lambda: codegen(ast, Emitter(ssa=ssa, out=out)))
+    return nodes
+
+def timePhases(source, repeat, collector, ssa):
+    best = {}
+    for _ in range(repeat):
+        def measure(phase, run):
+            t = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - t
+            best[phase] = min(best.get(phase, elapsed), elapsed)
+            return result
+        with collector():
+            nodes = runPhases(source, measure, ssa)
+    return best, nodes
+
+def peakMemory(source, collector, ssa):
+    peaks = {}
+    def measure(phase, run):
+        tracemalloc.start()
+        result = run()
+        peaks[phase] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result
+    with collector():
+        runPhases(source, measure, ssa)
+    return peaks
+
+# Builds the program and checks that every build prints what the closures print
+def checkBuilds(source, name, levels, ssa):
+    with tempfile.TemporaryDirectory() as tmpDir:
+        file = os.path.join(tmpDir, name + ".pl")
+        with open(file, "w") as f:
+            f.write(source)
+        expected = subprocess.run([sys.executable, os.path.join(root, "plush.py"), "--run", file], capture_output=True, text=True).stdout
+        for level in levels:
+            try:
+                exe = build(source, name, tmpDir, optLevel=level, ssa=ssa)
+            except RuntimeError as e:
+                return f"-O{level}: {e}"
+            if subprocess.run([exe], capture_output=True, text=True).stdout != expected:
+                return f"-O{level}: the output differs from --run"
+    return None
+
+def exponent(new, old, newNodes, oldNodes):
+    if not old or newNodes == oldNodes:
+        return None
+    return math.log(new / old) / math.log(newNodes / oldNodes)
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--vary", choices=list(sizeNames), default="functions", help="the size parameter of the generator that grows, by default functions")
+    argParser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400, 800, 1600], help="values of the varied parameter")
+    argParser.add_argument("--functions", type=int, default=100)
+    argParser.add_argument("--depth", type=int, default=3)
+    argParser.add_argument("--expression", type=int, default=6)
+    argParser.add_argument("--statements", type=int, default=4)
+    argParser.add_argument("--structs", type=int, default=10)
+    argParser.add_argument("--globals", type=int, default=50)
+    argParser.add_argument("--strings", type=int, default=100)
+    argParser.add_argument("--seed", type=int, default=0)
+    argParser.add_argument("--repeat", type=int, default=3)
+    argParser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    argParser.add_argument("--gc", action="store_true", help="keep the garbage collector running during the phases")
+    argParser.add_argument("--threshold", type=float, default=1.3, help="growth exponent above which a phase is flagged as super-linear, by default 1.3")
+    argParser.add_argument("--no-ssa", dest="ssa", action="store_false", help="generate the code with every local in an alloca")
+    argParser.add_argument("--build", action="store_true", help="also build and run every program and check its output")
+    argParser.add_argument("--levels", type=int, nargs="+", default=[0, 2], help="optimization levels of --build, by default 0 and 2")
+    args = argParser.parse_args()
+
+    # deep programs recurse deeply in every phase
+    sys.setrecursionlimit(100_000)
+    collector = nullcontext if args.gc else pausedCollector
+    print(f"{args.vary:>10}{'lines':>9}{'nodes':>9}" + "".join(f"{phase + ' us/node':>17}{'exp':>6}" for phase in phases) + ("" if args.no_memory else f"{'peak':>10}"))
+    previous = None
+    flagged = set()
+    failed = []
+    for size in args.sizes:
+        sizes = {name: getattr(args, arg) for arg, name in sizeNames.items()}
+        sizes[sizeNames[args.vary]] = size
+        source = generateProgram(seed=args.seed, **sizes)
+        times, nodes = timePhases(source, args.repeat, collector, args.ssa)
+        row = f"{size:>10}{source.count(chr(10)):>9}{nodes:>9}"
+        for phase in phases:
+            growth = exponent(times[phase], previous[0][phase], nodes, previous[1]) if previous else None
+            if growth is not None and growth > args.threshold:
+                flagged.add(phase)
+            row += f"{times[phase] / nodes * 1e6:>17.2f}" + (f"{growth:>6.2f}" if growth is not None else f"{'-':>6}")
+        if not args.no_memory:
+            peaks = peakMemory(source, collector, args.ssa)
+            row += f"{max(peaks.values()) / 2**20:>7.1f}MiB"
+        print(row, flush=True)
+        previous = (times, nodes)
+        if args.build:
+            error = checkBuilds(source, f"{args.vary}{size}", args.levels, args.ssa)
+            if error:
+                print(f"{args.vary} {size} does not build: {error}", flush=True)
+                failed.append(size)
+
+    for phase in phases:
+        if phase in flagged:
+            print(f"{phase} grew faster than n^{args.threshold} between two sizes")
+    exit(1 if failed else 0)
@@ -0,0 +1,40 @@
+import argparse
+import os
+import tempfile
+import time
+
+from common import workload, build, timeRun
+
+workloads = ["isPrime", "insertionSort", "fibonacci"]
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--scale", type=float, default=1.0, help="multiplies the size of every workload")
+    argParser.add_argument("--repeat", type=int, default=3)
+    args = argParser.parse_args()
+
+    levels = [0, 1, 2, 3]
+    print(f"{'program':<16}" + "".join(f"{'-O' + str(level):>12}" for level in levels) + f"{'compile -O0':>14}{'compile -O3':>14}")
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for name in workloads:
+            source = workload(name)
+            if args.scale != 1.0:
+                n = int(workload(name).split("val N: int := ", 1)[1].split(";", 1)[0].replace("_", ""))
+                source = workload(name, int(n * args.scale))
+
+            times = []
+            compileTimes = {}
+            outputs = set()
+            for level in levels:
+                t = time.perf_counter()
+                exe = build(source, f"{name}_O{level}", tmpDir, optLevel=level)
+                compileTimes[level] = time.perf_counter() - t
+                elapsed, output = timeRun([exe], args.repeat)
+                times.append(elapsed)
+                outputs.add(output)
+
+            if len(outputs) != 1:
+                print(f"{name}: output differs between optimization levels")
+
+            print(f"{name:<16}" + "".join(f"{t:>11.3f}s" for t in times) + f"{compileTimes[0]:>13.3f}s{compileTimes[3]:>13.3f}s")
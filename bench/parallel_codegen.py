@@ -0,0 +1,63 @@
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from common import root
+
+from parser import parse
+from typeChecker import verify, Context as TypeContext
+from codegen import codegen, Emitter
+
+# Functions with a loop, a conditional, arithmetic and a string each, every one calling the one before it
+def synthetic(functions):
+    lines = ["function print_str(val s: string);", "function print_int(val n: int);", ""]
+    for f in range(functions):
+        lines.append(f"function f{f}(val n: int): int {{")
+        lines.append("  var i: int := 0;")
+        lines.append("  var acc: int := n;")
+        lines.append("  while i < n {")
+        lines.append(f"    if acc % {f % 7 + 2} = 0 {{")
+        lines.append(f"      acc := acc / 2 + {f};")
+        lines.append("    } else {")
+        lines.append("      acc := acc * 3 + 1;")
+        lines.append("    }")
+        lines.append("    i := i + 1;")
+        lines.append("  }")
+        lines.append(f"  print_str(\"f{f}\");")
+        lines.append(f"  f{f} := acc{f' + f{f - 1}(n - 1)' if f else ''};")
+        lines.append("}")
+    lines.append("function main() {")
+    lines.append(f"  print_int(f{functions - 1}(3));")
+    lines.append("}")
+    return "\n".join(lines)
+
+def measure(source, path, jobs):
+    ast = parse(source)
+    verify(TypeContext(), ast)
+    t = time.perf_counter()
+    with open(path, "w") as out:
+        codegen(ast, Emitter(out=out, jobs=jobs))
+    elapsed = time.perf_counter() - t
+    with open(path, "rb") as f:
+        return elapsed, hashlib.sha256(f.read()).hexdigest()
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--functions", type=int, default=10_000)
+    argParser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = argParser.parse_args()
+
+    source = synthetic(args.functions)
+    print(f"{os.cpu_count()} cpus, {args.functions} functions")
+    print(f"{'jobs':>6}{'codegen':>12}{'speedup':>10}")
+    hashes = set()
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for jobs in args.jobs:
+            elapsed, digest = measure(source, os.path.join(tmpDir, f"synthetic_{jobs}.ll"), jobs)
+            hashes.add(digest)
+            if jobs == args.jobs[0]:
+                base = elapsed
+            print(f"{jobs:>6}{elapsed:>11.3f}s{base / elapsed:>9.2f}x")
+    print("modules are identical" if len(hashes) == 1 else "modules differ")
@@ -0,0 +1,77 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from ply import yacc
+
+import parser as plushParser
+
+# Time from a fresh interpreter to the first AST of a program
+firstAst = """
+import sys, time
+t = time.perf_counter()
+sys.path.insert(0, {root!r})
+import parser
+parser.parse(open({file!r}).read())
+print(time.perf_counter() - t)
+"""
+
+def coldStart(file):
+    out = subprocess.run([sys.executable, "-c", firstAst.format(root=root, file=file)], capture_output=True, text=True, check=True)
+    return float(out.stdout.split()[-1])
+
+def clearTables():
+    for table in glob.glob(os.path.join(plushParser.tablesDir, "parsetab_*.pickle")):
+        os.remove(table)
+
+# What parse() used to do: build a parser object on every call
+def legacyParse(data, tmpDir, parserStart="start"):
+    parser = yacc.yacc(module=plushParser, start=parserStart, debug=False, outputdir=tmpDir, errorlog=yacc.NullLogger())
+    lex = plushParser.lexer.clone()
+    lex.lineno = 1
+    return parser.parse(data, lexer=lex)
+
+def perParse(parse, sources, repeat):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for source in sources:
+            parse(source)
+    return (time.perf_counter() - t) / (repeat * len(sources))
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--repeat", type=int, default=20, help="times every program is parsed")
+    args = argParser.parse_args()
+    repeat = args.repeat
+
+    files = sorted(glob.glob(os.path.join(root, "programs", "*.pl")))
+    sources = [open(file).read() for file in files]
+
+    print(f"{'program':<20} {'no tables':>12} {'tables':>12}")
+    for file in files:
+        clearTables()
+        cold = coldStart(file)
+        warm = coldStart(file)
+        print(f"{os.path.basename(file):<20} {cold*1000:>10.1f}ms {warm*1000:>10.1f}ms")
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        sys.path.insert(0, tmpDir)
+        legacy = perParse(lambda source: legacyParse(source, tmpDir), sources, repeat)
+        # the repl alternates start symbols, which used to regenerate the tables on every line
+        legacyRepl = perParse(lambda source: legacyParse("print_int(1);", tmpDir, "statement") and legacyParse(source, tmpDir), sources, 1)
+
+    plushParser.parse(sources[0])
+    cached = perParse(plushParser.parse, sources, repeat)
+    cachedRepl = perParse(lambda source: plushParser.parse("print_int(1);", "statement") and plushParser.parse(source), sources, repeat)
+
+    print()
+    print(f"{'parse':<20} {'before':>12} {'after':>12}")
+    print(f"{'per program':<20} {legacy*1000:>10.2f}ms {cached*1000:>10.2f}ms")
+    print(f"{'alternating starts':<20} {legacyRepl*1000:>10.2f}ms {cachedRepl*1000:>10.2f}ms")
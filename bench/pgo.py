@@ -0,0 +1,36 @@
+import argparse
+import os
+import subprocess
+import tempfile
+
+from common import workload, build, timeRun
+
+# Two phase profile guided build of insertionSort: a --profile-generate build is trained on a smaller
+# input, then the program is rebuilt with --profile-use and timed against the build without profile
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("-n", type=int, default=100_000, help="elements sorted by the timed runs")
+    argParser.add_argument("--train", type=int, default=20_000, help="elements sorted by the training run")
+    argParser.add_argument("-O", dest="optLevel", type=int, default=2)
+    argParser.add_argument("--repeat", type=int, default=3)
+    args = argParser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        profilePath = os.path.join(tmpDir, "insertionSort.prof")
+        trainExe = build(workload("insertionSort", args.train), "insertionSort_train", tmpDir, optLevel=args.optLevel, instrument=True)
+        subprocess.run([trainExe], check=True, capture_output=True, env=dict(os.environ, PLUSH_PROFILE=profilePath))
+
+        source = workload("insertionSort", args.n)
+        results = {
+            "no profile": timeRun([build(source, "insertionSort", tmpDir, optLevel=args.optLevel)], args.repeat),
+            "profile use": timeRun([build(source, "insertionSort_pgo", tmpDir, optLevel=args.optLevel, profileUse=profilePath)], args.repeat),
+        }
+
+    print(f"{'build':<16}{'time':>10}")
+    for name, (elapsed, _) in results.items():
+        print(f"{name:<16}{elapsed:>9.3f}s")
+    base, pgo = results["no profile"][0], results["profile use"][0]
+    print(f"speedup: {base / pgo:.2f}x")
+    if len({out for _, out in results.values()}) > 1:
+        print("outputs differ")
@@ -0,0 +1,236 @@
+import argparse
+import random
+
+# Generates valid, type checked plush programs of any size: structs that nest the one before them,
+# int and float globals computed at compile time, and functions with ifs and whiles nested depth
+# deep, locals that shadow outer ones, else blocks that reuse the names of the locals of their then
+# block, struct values, string literals and a call to an earlier function. Every while runs 3 times
+# and the call is outside the loops, so the programs also run quickly
+
+class ProgramGenerator:
+    def __init__(self, functions=100, depth=3, expressionSize=6, statements=4, structs=10, globals=50, strings=100, seed=0):
+        self.functions = max(1, functions)
+        self.depth = depth
+        self.expressionSize = expressionSize
+        self.statements = statements
+        self.structs = structs
+        self.globals = globals
+        self.strings = strings
+        self.random = random.Random(seed)
+        self.lines = []
+        # int and float names in scope, one list per block, and the names of the block that ended just
+        # before each block next to it, the then block of an else
+        self.scopes = []
+        self.siblings = []
+        self.locals = 0
+        self.stringsLeft = strings
+
+    def generate(self):
+        self.lines += ["function print_int(val n: int);", "function print_float(val f: float);", "function print_str(val s: string);", ""]
+        for i in range(self.structs):
+            inner = f" var inner: struct S{i - 1}," if i else ""
+            self.lines.append(f"struct S{i} {{ var a: int, var b: float,{inner} }}")
+        for i in range(self.globals):
+            if i % 2:
+                self.lines.append(f"val g{i}: float := {self.floatConstant()};")
+            else:
+                self.lines.append(f"val g{i}: int := {self.intConstant()};")
+        self.lines.append("")
+        for i in range(self.functions):
+            self.function(i)
+        self.lines.append("function main() {")
+        for i in sorted({self.functions - 1, *self.random.sample(range(self.functions), min(5, self.functions))}):
+            self.lines.append(f"  print_int(f{i}({self.random.randint(0, 9)}, {self.random.randint(0, 9)}.5));")
+        if self.globals > 1:
+            self.lines.append("  print_float(g1);")
+        self.lines.append("}")
+        return "\n".join(self.lines) + "\n"
+
+    def intConstant(self):
+        expr = str(self.random.randint(0, 1000))
+        for _ in range(self.random.randint(0, self.expressionSize)):
+            expr = f"({expr} {self.random.choice(['+', '-', '*'])} {self.random.randint(1, 1000)})"
+        return expr
+
+    def floatConstant(self):
+        expr = f"{self.random.randint(0, 100)}.25"
+        for _ in range(self.random.randint(0, self.expressionSize)):
+            expr = f"({expr} {self.random.choice(['+', '-'])} {self.random.randint(1, 100)}.5)"
+        return expr
+
+    def names(self, type):
+        return [name for scope in self.scopes for name, nameType in scope if nameType == type]
+
+    # half of the locals of an else block have the name of a local of the same type of its then block
+    def siblingName(self, type):
+        current = {name for name, _ in self.scopes[-1]}
+        names = [name for name, nameType in self.siblings[-1] if nameType == type and name not in current]
+        if names and self.random.random() < 0.5:
+            return self.random.choice(names)
+        return None
+
+    def newLocal(self, type, indent):
+        # one local in three shadows a local of an outer block
+        current = {name for name, _ in self.scopes[-1]}
+        outer = [name for scope in self.scopes[:-1] for name, nameType in scope if nameType == type and name not in current]
+        name = self.siblingName(type)
+        if not name and outer and self.random.random() < 0.3:
+            name = self.random.choice(outer)
+        if not name:
+            name = f"v{self.locals}"
+            self.locals += 1
+        value = self.intExpression() if type == "int" else self.floatExpression()
+        self.lines.append(f"{indent}var {name}: {type} := {value};")
+        self.scopes[-1].append((name, type))
+
+    def intTerm(self):
+        choices = self.names("int") + [f"g{i}" for i in range(0, self.globals, 2)]
+        roll = self.random.random()
+        if roll < 0.2 or not choices:
+            return str(self.random.randint(0, 100))
+        if roll < 0.3 and self.names("struct"):
+            return f"{self.random.choice(self.names('struct'))}.a"
+        return self.random.choice(choices)
+
+    def floatTerm(self):
+        choices = self.names("float") + [f"g{i}" for i in range(1, self.globals, 2)]
+        roll = self.random.random()
+        if roll < 0.2 or not choices:
+            return f"{self.random.randint(0, 100)}.5"
+        if roll < 0.3 and self.names("struct"):
+            return f"{self.random.choice(self.names('struct'))}.b"
+        return self.random.choice(choices)
+
+    def intExpression(self, size=None):
+        size = self.random.randint(1, self.expressionSize) if size is None else size
+        if size <= 0:
+            return self.intTerm()
+        left = self.random.randint(0, size - 1)
+        match self.random.choice(["+", "-", "*", "/", "%", "neg"]):
+            case "/" | "%" as op:
+                return f"({self.intExpression(size - 1)} {op} {self.random.randint(2, 9)})"
+            case "neg":
+                return f"-({self.intExpression(size - 1)})"
+            case op:
+                return f"({self.intExpression(left)} {op} {self.intExpression(size - 1 - left)})"
+
+    # floats are only added and scaled by constants, so they stay finite
+    def floatExpression(self, size=None):
+        size = self.random.randint(1, self.expressionSize) if size is None else size
+        if size <= 0:
+            return self.floatTerm()
+        left = self.random.randint(0, size - 1)
+        match self.random.choice(["+", "-", "scale"]):
+            case "scale":
+                return f"({self.floatExpression(size - 1)} * 0.{self.random.randint(1, 9)})"
+            case op:
+                return f"({self.floatExpression(left)} {op} {self.floatExpression(size - 1 - left)})"
+
+    def boolExpression(self):
+        comparison = lambda: f"{self.intExpression(self.expressionSize // 2)} {self.random.choice(['<', '<=', '>', '>=', '=', '!='])} {self.intExpression(self.expressionSize // 2)}"
+        match self.random.choice(["compare", "and", "or", "not"]):
+            case "and":
+                return f"{comparison()} && {comparison()}"
+            case "or":
+                return f"{comparison()} || {comparison()}"
+            case "not":
+                return f"!({comparison()})"
+            case _:
+                return comparison()
+
+    def structValue(self, index):
+        inner = f", {self.structValue(index - 1)}" if index else ""
+        return f"struct S{index}({self.intExpression()}, {self.floatExpression()}{inner})"
+
+    def statement(self, indent, depth, nested, kind=None):
+        options = ["if", "while"] if nested else ["int", "float", "assign", "print"] + (["struct"] if self.structs else [])
+        match kind or self.random.choice(options):
+            case "int" | "float" as type:
+                self.newLocal(type, indent)
+            case "assign":
+                # the arguments are vals
+                targets = [(name, "int") for name in self.names("int") if name != "a"] + [(name, "float") for name in self.names("float") if name != "x"]
+                targets += [(f"{name}.a", "int") for name in self.names("struct")]
+                if not targets:
+                    return self.newLocal("int", indent)
+                name, type = self.random.choice(targets)
+                self.lines.append(f"{indent}{name} := {self.intExpression() if type == 'int' else self.floatExpression()};")
+            case "print":
+                if self.stringsLeft > 0:
+                    self.stringsLeft -= 1
+                    self.lines.append(f"{indent}print_str(\"string {self.stringsLeft} of the program\");")
+                else:
+                    self.lines.append(f"{indent}print_int({self.intExpression()});")
+            case "struct":
+                index = self.random.randrange(self.structs)
+                name = self.siblingName("struct")
+                if not name:
+                    name = f"v{self.locals}"
+                    self.locals += 1
+                self.lines.append(f"{indent}var {name}: struct S{index} := {self.structValue(index)};")
+                self.scopes[-1].append((name, "struct"))
+            case "if":
+                self.lines.append(f"{indent}if {self.boolExpression()} {{")
+                thenScope = self.block(self.deeper(indent), depth + 1)
+                self.lines.append(f"{indent}}} else {{")
+                self.block(self.deeper(indent), self.depth, thenScope)
+                self.lines.append(f"{indent}}}")
+            case "while":
+                counter = f"k{self.locals}"
+                self.locals += 1
+                self.lines.append(f"{indent}var {counter}: int := 0;")
+                self.lines.append(f"{indent}while {counter} < 3 {{")
+                self.block(self.deeper(indent), depth + 1)
+                self.lines.append(f"{indent}  {counter} := {counter} + 1;")
+                self.lines.append(f"{indent}}}")
+
+    # indentation stops growing at 16 levels, otherwise deep programs are mostly spaces
+    def deeper(self, indent):
+        return indent + "  " if len(indent) < 32 else indent
+
+    # Only one statement of a block nests and only the then block of an if nests further, so the
+    # size of a function grows linearly with the depth
+    def statementList(self, indent, depth):
+        nested = self.random.randrange(self.statements) if depth < self.depth and self.statements else None
+        for i in range(self.statements):
+            self.statement(indent, depth, i == nested)
+
+    def block(self, indent, depth, siblings=()):
+        self.scopes.append([])
+        self.siblings.append(list(siblings))
+        self.statementList(indent, depth)
+        self.siblings.pop()
+        return self.scopes.pop()
+
+    def function(self, index):
+        self.locals = 0
+        self.scopes = [[("a", "int"), ("x", "float")]]
+        self.siblings = [[]]
+        self.lines.append(f"function f{index}(val a: int, val x: float): int {{")
+        # strings are spread evenly over the functions
+        self.stringsLeft = self.strings * (index + 1) // self.functions - self.strings * index // self.functions
+        # the body is in the scope of the arguments
+        self.statementList("  ", 0)
+        for _ in range(self.stringsLeft):
+            self.statement("  ", 0, False, "print")
+        self.newLocal("int", "  ")
+        call = f" + f{self.random.randrange(index)}({self.intTerm()}, {self.floatTerm()})" if index else ""
+        self.lines.append(f"  f{index} := {self.intExpression()}{call};")
+        self.lines.append("}")
+        self.lines.append("")
+
+def generateProgram(**sizes):
+    return ProgramGenerator(**sizes).generate()
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--functions", type=int, default=100)
+    argParser.add_argument("--depth", type=int, default=3, help="nesting of ifs and whiles")
+    argParser.add_argument("--expression-size", type=int, default=6, help="operators of the largest expression")
+    argParser.add_argument("--statements", type=int, default=4, help="statements of every block")
+    argParser.add_argument("--structs", type=int, default=10)
+    argParser.add_argument("--globals", type=int, default=50)
+    argParser.add_argument("--strings", type=int, default=100)
+    argParser.add_argument("--seed", type=int, default=0)
+    args = argParser.parse_args()
+    print(generateProgram(functions=args.functions, depth=args.depth, expressionSize=args.expression_size, statements=args.statements, structs=args.structs, globals=args.globals, strings=args.strings, seed=args.seed), end="")
@@ -0,0 +1,27 @@
+import argparse
+import tempfile
+
+from common import workload, build, timeRun
+
+# The same loop guard with the right operand evaluated up front, which is what && used to compile to
+eager = """
+    val check: bool := costly(i);
+    if i % 100 = 0 && check {"""
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("-n", type=int, default=None, help="number of loop iterations")
+    argParser.add_argument("--repeat", type=int, default=3)
+    args = argParser.parse_args()
+
+    lazySource = workload("short_circuit", args.n)
+    eagerSource = lazySource.replace("\n    if i % 100 = 0 && costly(i) {", eager)
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        print(f"{'level':<8}{'eager':>10}{'lazy':>10}")
+        for level in [0, 2]:
+            eagerTime, eagerOut = timeRun([build(eagerSource, f"eager_O{level}", tmpDir, level)], args.repeat)
+            lazyTime, lazyOut = timeRun([build(lazySource, f"lazy_O{level}", tmpDir, level)], args.repeat)
+            if eagerOut != lazyOut:
+                print("outputs differ")
+            print(f"{'-O' + str(level):<8}{eagerTime:>9.3f}s{lazyTime:>9.3f}s")
@@ -0,0 +1,66 @@
+import glob
+import io
+import os
+import subprocess
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from common import root, workload, timeRun
+
+from plush import frontEnd, buildRuntime, compileFile, generate
+
+def emit(file, outDir, ssa):
+    ll = os.path.join(outDir, f"{os.path.basename(file)}.{'ssa' if ssa else 'alloca'}.ll")
+    with open(file) as f:
+        source = f.read()
+    try:
+        with redirect_stdout(io.StringIO()):
+            generate(source, ll, ssa=ssa)
+    except SystemExit:
+        return None
+    return ll
+
+def llcTime(ll):
+    t = time.perf_counter()
+    subprocess.run(["llc", "-O0", ll, "-o", ll + ".s"], check=True)
+    return time.perf_counter() - t
+
+if __name__ == "__main__":
+    frontEnd()
+    files = sorted(glob.glob(os.path.join(root, "tests", "**", "*.pl"), recursive=True) + glob.glob(os.path.join(root, "programs", "*.pl")))
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        totals = {True: [0, 0, 0.0], False: [0, 0, 0.0]}
+        for file in files:
+            lls = {ssa: emit(file, tmpDir, ssa) for ssa in [False, True]}
+            if not lls[True]:
+                continue
+            for ssa, ll in lls.items():
+                with open(ll) as f:
+                    text = f.read()
+                totals[ssa][0] += text.count("\n")
+                totals[ssa][1] += len(text)
+                totals[ssa][2] += llcTime(ll)
+
+        print(f"tests/ and programs/ corpus")
+        print(f"{'':<10}{'lines':>10}{'bytes':>10}{'llc -O0':>10}")
+        for ssa in [False, True]:
+            lines, size, llc = totals[ssa]
+            print(f"{'ssa' if ssa else 'alloca':<10}{lines:>10}{size:>10}{llc:>9.2f}s")
+
+        print()
+        print(f"runtime at -O0")
+        print(f"{'program':<16}{'alloca':>10}{'ssa':>10}")
+        with redirect_stdout(io.StringIO()):
+            buildRuntime()
+        for name in ["isPrime", "insertionSort", "fibonacci"]:
+            times = []
+            for ssa in [False, True]:
+                file = os.path.join(tmpDir, f"{name}_{'ssa' if ssa else 'alloca'}.pl")
+                with open(file, "w") as f:
+                    f.write(workload(name))
+                with redirect_stdout(io.StringIO()):
+                    compileFile(file, tmpDir, rebuildRuntime=False, ssa=ssa)
+                times.append(timeRun([file[:-3]], 1)[0])
+            print(f"{name:<16}{times[0]:>9.3f}s{times[1]:>9.3f}s")
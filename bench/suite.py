@@ -0,0 +1,126 @@
+import argparse
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from common import workload, build, timeRun
+from engines import closureCompiler, registerVm
+
+# Compile time, binary size and run time of the workloads in every backend, written as json and
+# compared with the json of an earlier run. Native builds run the workloads at the size of their
+# file, about a second at -O0, and the python engines at the smaller sizes below
+interpreterSizes = {
+    "factorial": 100_000,
+    "fibonacci": 20_000,
+    "insertionSort": 1_000,
+    "isPrime": 300_000,
+    "sqrt": 20_000,
+    "arrayList": 30_000,
+    "sieve": 300_000,
+    "matmul": 50,
+    "strings": 30_000,
+}
+interpreters = {"closures": closureCompiler, "vm": registerVm}
+metrics = ["compile", "size", "run"]
+
+def workloadSize(name):
+    return int(workload(name).split("val N: int := ", 1)[1].split(";", 1)[0].replace("_", ""))
+
+def measureNative(name, n, level, tmpDir, repeat):
+    t = time.perf_counter()
+    exe = build(workload(name, n), f"{name}_O{level}", tmpDir, optLevel=level)
+    compileTime = time.perf_counter() - t
+    runTime, output = timeRun([exe], repeat)
+    return {"compile": compileTime, "size": os.path.getsize(exe), "run": runTime}, output
+
+def measureInterpreter(name, n, engine, repeat):
+    source = workload(name, n)
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        run = interpreters[engine](source)
+        compileTime = time.perf_counter() - t
+        out = io.StringIO()
+        t = time.perf_counter()
+        with redirect_stdout(out):
+            run()
+        runTime = time.perf_counter() - t
+        if not best or runTime < best["run"]:
+            best = {"compile": compileTime, "size": None, "run": runTime}
+    return best, out.getvalue()
+
+# Metrics that grew more than threshold over the baseline. Times under minTime are too noisy to compare
+def regressions(results, baseline, threshold, minTime):
+    found = []
+    for name, backends in results.items():
+        for backend, result in backends.items():
+            old = baseline.get(name, {}).get(backend)
+            # a run at another size is not comparable
+            if not old or old.get("n") != result["n"]:
+                continue
+            for metric in metrics:
+                if result[metric] is None or old.get(metric) is None:
+                    continue
+                if metric != "size" and old[metric] < minTime:
+                    continue
+                if result[metric] > old[metric] * (1 + threshold):
+                    found.append((name, backend, metric, old[metric], result[metric]))
+    return found
+
+def formatMetric(metric, value):
+    if value is None:
+        return f"{'-':>10}"
+    if metric == "size":
+        return f"{value / 1024:>7.1f}KiB"
+    return f"{value:>9.3f}s"
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--workloads", nargs="+", choices=list(interpreterSizes), default=list(interpreterSizes))
+    argParser.add_argument("--levels", type=int, nargs="+", default=[0, 2], help="optimization levels of the native builds")
+    argParser.add_argument("--engines", nargs="*", choices=list(interpreters), default=list(interpreters), help="python engines, none to only measure native builds")
+    argParser.add_argument("--scale", type=float, default=1.0, help="multiplies the size of every workload")
+    argParser.add_argument("--repeat", type=int, default=3)
+    argParser.add_argument("--output", help="write the results to this json file")
+    argParser.add_argument("--baseline", help="json of an earlier run to compare with")
+    argParser.add_argument("--threshold", type=float, default=0.10, help="relative growth of a metric over the baseline that is a regression, by default 0.10")
+    argParser.add_argument("--min-time", type=float, default=0.05, help="times below this many seconds are not compared")
+    args = argParser.parse_args()
+
+    results = {}
+    print(f"{'workload':<16}{'backend':<12}{'n':>12}{'compile':>10}{'size':>10}{'run':>10}")
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for name in args.workloads:
+            results[name] = {}
+            nativeN = int(workloadSize(name) * args.scale)
+            interpreterN = max(1, int(interpreterSizes[name] * args.scale))
+            outputs = {}
+            backends = [(f"native -O{level}", nativeN, lambda level=level: measureNative(name, nativeN, level, tmpDir, args.repeat)) for level in args.levels]
+            backends += [(engine, interpreterN, lambda engine=engine: measureInterpreter(name, interpreterN, engine, args.repeat)) for engine in args.engines]
+            for backend, n, measure in backends:
+                result, output = measure()
+                result["n"] = n
+                results[name][backend] = result
+                outputs.setdefault(n, set()).add(output)
+                print(f"{name:<16}{backend:<12}{n:>12}" + "".join(formatMetric(metric, result[metric]) for metric in metrics), flush=True)
+            # backends that ran the same size must print the same
+            if any(len(printed) > 1 for printed in outputs.values()):
+                print(f"{name}: output differs between backends")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()}, "results": results}, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        found = regressions(results, baseline, args.threshold, args.min_time)
+        for name, backend, metric, old, new in found:
+            print(f"regression: {name} {backend} {metric} {formatMetric(metric, old).strip()} -> {formatMetric(metric, new).strip()} ({new / old - 1:+.0%})")
+        print(f"{len(found)} regressions over {args.threshold:.0%}")
+        exit(1 if found else 0)
@@ -0,0 +1,87 @@
+import argparse
+import io
+import os
+import re
+import sys
+import time
+from contextlib import redirect_stdout
+
+from common import root, workload
+
+from parser import parse
+from typeChecker import verify, Context as TypeContext
+from interpreter import runProgram
+
+# tests/recursion.pl computes fib(17) with the naive recursion
+def recursion(n):
+    with open(os.path.join(root, "tests", "recursion.pl")) as f:
+        return re.sub(r"fib\(17\)", f"fib({n})", f.read())
+
+# A loop nested in blocks that shadow each other
+def nestedLoops(n):
+    return f"""function print_int(val n: int);
+
+function main() {{
+  var total: int := 0;
+  var i: int := 0;
+  while i < {n} {{
+    var j: int := 0;
+    {{
+      var i: int := 10;
+      while j < i {{
+        total := total + j;
+        j := j + 1;
+      }}
+    }}
+    i := i + 1;
+  }}
+  print_int(total);
+}}
+"""
+
+# A recursion as deep as n, too deep for the python stack
+def deepRecursion(n):
+    return f"""function print_int(val n: int);
+
+function sum(val n: int): int {{
+  if n = 0 {{
+    sum := 0;
+  }} else {{
+    sum := n + sum(n - 1);
+  }}
+}}
+
+function main() {{
+  print_int(sum({n}));
+}}
+"""
+
+def timeTree(source, repeat):
+    best = None
+    for _ in range(repeat):
+        ast = parse(source)
+        verify(TypeContext(), ast)
+        out = io.StringIO()
+        t = time.perf_counter()
+        with redirect_stdout(out):
+            runProgram(ast, ["./program"])
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out.getvalue().strip()
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--repeat", type=int, default=3)
+    args = argParser.parse_args()
+
+    programs = [
+        ("recursion fib(20)", recursion(20)),
+        ("nested loops 20000", nestedLoops(20_000)),
+        ("deep recursion 100000", deepRecursion(100_000)),
+        ("workloads/isPrime 20000", workload("isPrime", 20_000)),
+        ("workloads/fibonacci 1000", workload("fibonacci", 1_000)),
+    ]
+    print(f"{'program':<28}{'time':>10}  output")
+    for name, source in programs:
+        elapsed, output = timeTree(source, args.repeat)
+        print(f"{name:<28}{elapsed:>9.3f}s  {output}")
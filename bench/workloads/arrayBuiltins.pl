@@ -0,0 +1,49 @@
+function print_int(val n: int);
+function print_float(val f: float);
+function int_array(val size: int): [int];
+function float_array(val size: int): [float];
+function fill_int_array(val arr: [int], val size: int, val v: int);
+function fill_float_array(val arr: [float], val size: int, val v: float);
+function add_int_arrays(val dest: [int], val a: [int], val b: [int], val size: int);
+function add_float_arrays(val dest: [float], val a: [float], val b: [float], val size: int);
+function mul_int_arrays(val dest: [int], val a: [int], val b: [int], val size: int);
+function mul_float_arrays(val dest: [float], val a: [float], val b: [float], val size: int);
+function sum_int_array(val arr: [int], val size: int): int;
+function sum_float_array(val arr: [float], val size: int): float;
+function min_int_array(val arr: [int], val size: int): int;
+function max_float_array(val arr: [float], val size: int): float;
+function dot_int_arrays(val a: [int], val b: [int], val size: int): int;
+function dot_float_arrays(val a: [float], val b: [float], val size: int): float;
+function prefix_sum_int_array(val arr: [int], val size: int);
+function prefix_sum_float_array(val arr: [float], val size: int);
+function sort_int_array(val arr: [int], val size: int);
+function sort_float_array(val arr: [float], val size: int);
+
+val N: int := 1_000_000;
+
+function main() {
+  var x: [int] := int_array(N);
+  var y: [int] := int_array(N);
+  var a: [float] := float_array(N);
+  var b: [float] := float_array(N);
+
+  # ramps made with prefix sums, squared into values that are out of order once they wrap around
+  fill_int_array(x, N, 7);
+  prefix_sum_int_array(x, N);
+  mul_int_arrays(y, x, x, N);
+  add_int_arrays(y, y, x, N);
+  fill_float_array(a, N, 0.001);
+  prefix_sum_float_array(a, N);
+  mul_float_arrays(b, a, a, N);
+  add_float_arrays(b, b, a, N);
+
+  print_int(sum_int_array(y, N));
+  print_int(dot_int_arrays(x, y, N));
+  print_float(sum_float_array(b, N));
+  print_float(dot_float_arrays(a, b, N));
+  sort_int_array(y, N);
+  print_int(min_int_array(y, N));
+  print_int(y[N / 2]);
+  sort_float_array(b, N);
+  print_float(max_float_array(b, N));
+}
@@ -0,0 +1,78 @@
+function print_int(val n: int);
+function print_float(val f: float);
+function int_array(val size: int): [int];
+function copy_int_array(val dest: [int], val src: [int], val size: int);
+
+val N: int := 5_000_000;
+
+struct ArrayList {
+  var arr: [int],
+  var cap: int,
+  var len: int,
+}
+
+struct Vec {
+  var x: float,
+  var y: float,
+}
+
+function new(val cap: int): struct ArrayList {
+  new := struct ArrayList(int_array(cap), cap, 0);
+}
+
+# structs are passed by value, add returns the array list it changed
+function add(var list: struct ArrayList, val value: int): struct ArrayList {
+  if list.len = list.cap {
+    var grown: [int] := int_array(list.cap * 2);
+    copy_int_array(grown, list.arr, list.len);
+    list.arr := grown;
+    list.cap := list.cap * 2;
+  }
+  var arr: [int] := list.arr;
+  arr[list.len] := value;
+  list.len := list.len + 1;
+  add := list;
+}
+
+function get(val list: struct ArrayList, val idx: int): int {
+  val arr: [int] := list.arr;
+  get := arr[idx];
+}
+
+function plus(val a: struct Vec, val b: struct Vec): struct Vec {
+  plus := struct Vec(a.x + b.x, a.y + b.y);
+}
+
+function scale(val a: struct Vec, val s: float): struct Vec {
+  scale := struct Vec(a.x * s, a.y * s);
+}
+
+function main() {
+  var list: struct ArrayList := new(2);
+  var i: int := 0;
+  while i < N {
+    list := add(list, i * 3 + 1);
+    i := i + 1;
+  }
+
+  var sum: int := 0;
+  i := 0;
+  while i < list.len {
+    sum := sum + get(list, i);
+    i := i + 1;
+  }
+  print_int(list.len);
+  print_int(list.cap);
+  print_int(sum);
+
+  var pos: struct Vec := struct Vec(0.0, 0.0);
+  var vel: struct Vec := struct Vec(1.0, 0.5);
+  i := 0;
+  while i < N {
+    pos := plus(pos, scale(vel, 0.001));
+    vel := struct Vec(vel.x * 0.9999 + vel.y * 0.01, vel.y * 0.9999 - vel.x * 0.01);
+    i := i + 1;
+  }
+  print_float(pos.x);
+  print_float(pos.y);
+}
@@ -0,0 +1,22 @@
+function print_int(val n: int);
+
+val N: int := 50_000_000;
+
+function fac(var n: int): int {
+  var res: int := 1;
+  while n > 1 {
+    res := res * n;
+    n := n - 1;
+  }
+  fac := res;
+}
+
+function main() {
+  var i: int := 0;
+  var sum: int := 0;
+  while i < N {
+    sum := sum + fac(i % 13);
+    i := i + 1;
+  }
+  print_int(sum);
+}
@@ -0,0 +1,38 @@
+function print_int(val n: int);
+
+val N: int := 2_000_000;
+
+function fib(var n: int): int {
+  var res: int := 0;
+  if n = 0 {
+    res := 0;
+  } else {
+
+  if n = 1 {
+    res := 1;
+  } else {
+    var a: int := 0;
+    var b: int := 1;
+    while n > 1 {
+      val tmp: int := a;
+      a := b;
+      b := tmp + b;
+      n := n - 1;
+    }
+
+    res := b;
+  }
+  }
+
+  fib := res;
+}
+
+function main() {
+  var i: int := 0;
+  var sum: int := 0;
+  while i < N {
+    sum := sum + fib(40 + i % 5);
+    i := i + 1;
+  }
+  print_int(sum);
+}
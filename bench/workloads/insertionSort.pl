@@ -0,0 +1,33 @@
+function print_int(val n: int);
+function int_array(val size: int): [int];
+
+val N: int := 20_000;
+
+function sort(var lst : [int], val len : int) : [int] {
+  var i : int := 1;
+
+  while i < len {
+    val key : int := lst[i];
+    var j : int := i - 1;
+    while j >= 0 && lst[j] > key {
+      lst[j+1] := lst[j];
+      j := j - 1;
+    }
+    lst[j+1] := key;
+    i := i + 1;
+  }
+
+  sort := lst;
+}
+
+function main() {
+  var lst : [int] := int_array(N);
+  var i : int := 0;
+  while i < N {
+    lst[i] := N - i;
+    i := i + 1;
+  }
+  lst := sort(lst, N);
+  print_int(lst[0]);
+  print_int(lst[N - 1]);
+}
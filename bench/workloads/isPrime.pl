@@ -0,0 +1,24 @@
+function print_bool(val b: bool);
+
+val N: int := 400_000_009;
+
+function isPrime(val n : int) : bool {
+  var i : int := 2;
+  var res :int := 0;
+  while i < n {
+    if n % i = 0 {
+      res := res + 1;
+    }
+    i := i + 1;
+  }
+
+  if res = 0 {
+    isPrime := true;
+  } else {
+    isPrime := false;
+  }
+}
+
+function main() {
+  print_bool(isPrime(N));
+}
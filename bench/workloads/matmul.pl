@@ -0,0 +1,47 @@
+function print_float(val f: float);
+function float_array(val size: int): [float];
+
+val N: int := 500;
+
+# a and b are filled with a sawtooth in [0, 1), c := a * b in i, k, j order
+function main() {
+  var a: [float] := float_array(N * N);
+  var b: [float] := float_array(N * N);
+  var c: [float] := float_array(N * N);
+  var v: float := 0.0;
+  var k: int := 0;
+  while k < N * N {
+    a[k] := v;
+    b[k] := 1.0 - v;
+    c[k] := 0.0;
+    v := v + 0.007;
+    if v >= 1.0 {
+      v := v - 1.0;
+    }
+    k := k + 1;
+  }
+
+  var i: int := 0;
+  while i < N {
+    k := 0;
+    while k < N {
+      val aik: float := a[i * N + k];
+      var j: int := 0;
+      while j < N {
+        c[i * N + j] := c[i * N + j] + aik * b[k * N + j];
+        j := j + 1;
+      }
+      k := k + 1;
+    }
+    i := i + 1;
+  }
+
+  var trace: float := 0.0;
+  i := 0;
+  while i < N {
+    trace := trace + c[i * N + i];
+    i := i + 1;
+  }
+  print_float(trace);
+  print_float(c[N * N - 1]);
+}
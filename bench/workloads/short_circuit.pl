@@ -0,0 +1,26 @@
+function print_int(val n: int);
+
+val N: int := 2_000_000;
+
+# stands for an expensive check that only matters for a few values
+function costly(val n: int): bool {
+  var i: int := 0;
+  var acc: int := n;
+  while i < 200 {
+    acc := (acc * 31 + i) % 1_000_003;
+    i := i + 1;
+  }
+  costly := acc % 2 = 0;
+}
+
+function main() {
+  var i: int := 0;
+  var count: int := 0;
+  while i < N {
+    if i % 100 = 0 && costly(i) {
+      count := count + 1;
+    }
+    i := i + 1;
+  }
+  print_int(count);
+}
@@ -0,0 +1,33 @@
+function print_int(val n: int);
+function bool_array(val size: int): [bool];
+
+val N: int := 50_000_000;
+
+function main() {
+  var composite: [bool] := bool_array(N + 1);
+  var i: int := 0;
+  while i <= N {
+    composite[i] := false;
+    i := i + 1;
+  }
+
+  var count: int := 0;
+  var last: int := 0;
+  i := 2;
+  while i <= N {
+    if !composite[i] {
+      count := count + 1;
+      last := i;
+      if i <= N / i {
+        var j: int := i * i;
+        while j <= N {
+          composite[j] := true;
+          j := j + i;
+        }
+      }
+    }
+    i := i + 1;
+  }
+  print_int(count);
+  print_int(last);
+}
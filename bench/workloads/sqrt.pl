@@ -0,0 +1,43 @@
+function print_float(val f: float);
+
+val N: int := 10_000_000;
+
+function sqrt(val n: float): float {
+  var guess: float := 1.0;
+  while !good_enough(guess, n) {
+    guess := improve(guess, n);
+  }
+  sqrt := guess;
+}
+
+function good_enough(val guess: float, val x: float): bool {
+  good_enough := abs(guess * guess - x) < 0.001;
+}
+
+function abs(val n: float): float {
+  if n < 0.0 {
+    abs := -n;
+  } else {
+    abs := n;
+  }
+}
+
+function improve(val guess: float, val x: float): float {
+  improve := (guess + (x / guess)) / 2.0;
+}
+
+# square roots of a sawtooth of floats in [1, 100)
+function main() {
+  var x: float := 1.0;
+  var sum: float := 0.0;
+  var i: int := 0;
+  while i < N {
+    sum := sum + sqrt(x);
+    x := x + 0.37;
+    if x >= 100.0 {
+      x := x - 99.0;
+    }
+    i := i + 1;
+  }
+  print_float(sum);
+}
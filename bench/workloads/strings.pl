@@ -0,0 +1,68 @@
+function print_str(val s: string);
+function print_char_array(val arr: [char], val size: int);
+function char_array(val size: int): [char];
+function str_array(val size: int): [string];
+
+val N: int := 20_000_000;
+
+# text of N chars picked from an alphabet, reversed in place a few times, and N words copied
+# around a ring of string pointers
+function main() {
+  var alphabet: [char] := char_array(8);
+  alphabet[0] := 'p';
+  alphabet[1] := 'l';
+  alphabet[2] := 'u';
+  alphabet[3] := 's';
+  alphabet[4] := 'h';
+  alphabet[5] := ' ';
+  alphabet[6] := 'i';
+  alphabet[7] := 'r';
+
+  var text: [char] := char_array(N);
+  var i: int := 0;
+  while i < N {
+    text[i] := alphabet[(i * 7 + i / 8) % 8];
+    i := i + 1;
+  }
+
+  var round: int := 0;
+  while round < 5 {
+    i := 0;
+    while i < N / 2 {
+      val c: char := text[i];
+      text[i] := text[N - 1 - i];
+      text[N - 1 - i] := c;
+      i := i + 1;
+    }
+    round := round + 1;
+  }
+  print_char_array(text, 40);
+
+  var words: [string] := str_array(N);
+  i := 0;
+  while i < N {
+    if i % 3 = 0 {
+      words[i] := "alpha";
+    } else {
+      if i % 3 = 1 {
+        words[i] := "beta";
+      } else {
+        words[i] := "gamma";
+      }
+    }
+    i := i + 1;
+  }
+  round := 0;
+  while round < 5 {
+    val first: string := words[0];
+    i := 0;
+    while i < N - 1 {
+      words[i] := words[i + 1];
+      i := i + 1;
+    }
+    words[N - 1] := first;
+    round := round + 1;
+  }
+  print_str(words[0]);
+  print_str(words[N - 1]);
+}
@@ -110,3 +110,217 @@ void copy_int_array(int* dest, int* src, int size) {
 int pow_int(int b, int e) {
   return (int) pow(b, e);
 }
+
+// Ints wrap around like the arithmetic of plush, so the loops add and multiply them as unsigned
+
+void fill_int_array(int* arr, int size, int val) {
+  for (int i = 0; i < size; ++i) {
+    arr[i] = val;
+  }
+}
+
+void fill_float_array(float* arr, int size, float val) {
+  for (int i = 0; i < size; ++i) {
+    arr[i] = val;
+  }
+}
+
+void copy_float_array(float* dest, float* src, int size) {
+  memcpy(dest, src, size*sizeof(float));
+}
+
+void add_int_arrays(int* dest, int* a, int* b, int size) {
+  for (int i = 0; i < size; ++i) {
+    dest[i] = (int) ((unsigned) a[i] + (unsigned) b[i]);
+  }
+}
+
+void add_float_arrays(float* dest, float* a, float* b, int size) {
+  for (int i = 0; i < size; ++i) {
+    dest[i] = a[i] + b[i];
+  }
+}
+
+void mul_int_arrays(int* dest, int* a, int* b, int size) {
+  for (int i = 0; i < size; ++i) {
+    dest[i] = (int) ((unsigned) a[i] * (unsigned) b[i]);
+  }
+}
+
+void mul_float_arrays(float* dest, float* a, float* b, int size) {
+  for (int i = 0; i < size; ++i) {
+    dest[i] = a[i] * b[i];
+  }
+}
+
+int sum_int_array(int* arr, int size) {
+  unsigned sum = 0;
+  for (int i = 0; i < size; ++i) {
+    sum += (unsigned) arr[i];
+  }
+  return (int) sum;
+}
+
+// Floats are added in order in single precision, the interpreter gives the same result
+float sum_float_array(float* arr, int size) {
+  float sum = 0.0f;
+  for (int i = 0; i < size; ++i) {
+    sum += arr[i];
+  }
+  return sum;
+}
+
+int min_int_array(int* arr, int size) {
+  if (size <= 0) {
+    return 0;
+  }
+  int min = arr[0];
+  for (int i = 1; i < size; ++i) {
+    if (arr[i] < min) {
+      min = arr[i];
+    }
+  }
+  return min;
+}
+
+int max_int_array(int* arr, int size) {
+  if (size <= 0) {
+    return 0;
+  }
+  int max = arr[0];
+  for (int i = 1; i < size; ++i) {
+    if (arr[i] > max) {
+      max = arr[i];
+    }
+  }
+  return max;
+}
+
+// The first of the smallest elements, nan only when the first element is nan
+float min_float_array(float* arr, int size) {
+  if (size <= 0) {
+    return 0.0f;
+  }
+  float min = arr[0];
+  for (int i = 1; i < size; ++i) {
+    if (arr[i] < min) {
+      min = arr[i];
+    }
+  }
+  return min;
+}
+
+float max_float_array(float* arr, int size) {
+  if (size <= 0) {
+    return 0.0f;
+  }
+  float max = arr[0];
+  for (int i = 1; i < size; ++i) {
+    if (arr[i] > max) {
+      max = arr[i];
+    }
+  }
+  return max;
+}
+
+int dot_int_arrays(int* a, int* b, int size) {
+  unsigned dot = 0;
+  for (int i = 0; i < size; ++i) {
+    dot += (unsigned) a[i] * (unsigned) b[i];
+  }
+  return (int) dot;
+}
+
+float dot_float_arrays(float* a, float* b, int size) {
+  float dot = 0.0f;
+  for (int i = 0; i < size; ++i) {
+    dot += a[i] * b[i];
+  }
+  return dot;
+}
+
+void prefix_sum_int_array(int* arr, int size) {
+  unsigned sum = 0;
+  for (int i = 0; i < size; ++i) {
+    sum += (unsigned) arr[i];
+    arr[i] = (int) sum;
+  }
+}
+
+void prefix_sum_float_array(float* arr, int size) {
+  float sum = 0.0f;
+  for (int i = 0; i < size; ++i) {
+    sum += arr[i];
+    arr[i] = sum;
+  }
+}
+
+static int compare_ints(const void* a, const void* b) {
+  int x = *(const int*) a;
+  int y = *(const int*) b;
+  return (x > y) - (x < y);
+}
+
+void sort_int_array(int* arr, int size) {
+  if (size > 0) {
+    qsort(arr, size, sizeof(int), compare_ints);
+  }
+}
+
+// Floats are sorted by their bits made into a signed int that orders them: -0.0 before 0.0,
+// nans with the sign bit first and the other nans last
+static int float_key(float f) {
+  int bits;
+  memcpy(&bits, &f, sizeof(bits));
+  return bits ^ ((bits >> 31) & 0x7fffffff);
+}
+
+static int compare_floats(const void* a, const void* b) {
+  int x = float_key(*(const float*) a);
+  int y = float_key(*(const float*) b);
+  return (x > y) - (x < y);
+}
+
+void sort_float_array(float* arr, int size) {
+  if (size > 0) {
+    qsort(arr, size, sizeof(float), compare_floats);
+  }
+}
+
+// Counters of a program built with --instrument. Each function has its calls and the cycles spent
+// in it without its callees, each block the times it ran
+
+static long long (*profile_function_counters)[2];
+static char** profile_function_names;
+static int profile_functions;
+static long long* profile_block_counters;
+static char** profile_block_names;
+static int profile_blocks;
+
+// Written to $PLUSH_PROFILE or plush.prof, one line per function and per block
+static void plush_profile_dump(void) {
+  char* path = getenv("PLUSH_PROFILE");
+  FILE* f = fopen(path ? path : "plush.prof", "w");
+  if (!f) {
+    perror("plush profile");
+    return;
+  }
+  fprintf(f, "# function <name> <calls> <cycles>, loop|branch <function> <label> <line> <count>\n");
+  for (int i = 0; i < profile_functions; ++i) {
+    fprintf(f, "function %s %lld %lld\n", profile_function_names[i], profile_function_counters[i][0], profile_function_counters[i][1]);
+  }
+  for (int i = 0; i < profile_blocks; ++i) {
+    fprintf(f, "%s %lld\n", profile_block_names[i], profile_block_counters[i]);
+  }
+  fclose(f);
+}
+
+void plush_profile_register(long long (*function_counters)[2], char** function_names, int functions, long long* block_counters, char** block_names, int blocks) {
+  profile_function_counters = function_counters;
+  profile_function_names = function_names;
+  profile_functions = functions;
+  profile_block_counters = block_counters;
+  profile_block_names = block_names;
+  profile_blocks = blocks;
+  atexit(plush_profile_dump);
+}
@@ -24,4 +24,26 @@ int** int_array_array(int size);
 
 int pow_int(int b, int e);
 
+void fill_int_array(int* arr, int size, int val);
+void fill_float_array(float* arr, int size, float val);
+void copy_float_array(float* dest, float* src, int size);
+void add_int_arrays(int* dest, int* a, int* b, int size);
+void add_float_arrays(float* dest, float* a, float* b, int size);
+void mul_int_arrays(int* dest, int* a, int* b, int size);
+void mul_float_arrays(float* dest, float* a, float* b, int size);
+int sum_int_array(int* arr, int size);
+float sum_float_array(float* arr, int size);
+int min_int_array(int* arr, int size);
+int max_int_array(int* arr, int size);
+float min_float_array(float* arr, int size);
+float max_float_array(float* arr, int size);
+int dot_int_arrays(int* a, int* b, int size);
+float dot_float_arrays(float* a, float* b, int size);
+void prefix_sum_int_array(int* arr, int size);
+void prefix_sum_float_array(float* arr, int size);
+void sort_int_array(int* arr, int size);
+void sort_float_array(float* arr, int size);
+
+void plush_profile_register(long long (*function_counters)[2], char** function_names, int functions, long long* block_counters, char** block_names, int blocks);
+
 #endif
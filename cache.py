@@ -0,0 +1,138 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+
+compilerDir = os.path.dirname(os.path.abspath(__file__))
+compilerFiles = ["lexer.py", "parser.py", "typeChecker.py", "interpreter.py", "codegen.py", "optimizer.py", "resolver.py", "plush.py", "cache.py"]
+runtimeFiles = ["c_functions.c", "c_functions.h", "Makefile"]
+
+def hashParts(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+def hashFile(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+compilerVersion = None
+
+# Hash of the compiler sources and of the external tools it runs, computed once per process
+def getCompilerVersion():
+    global compilerVersion
+    if not compilerVersion:
+        parts = [hashFile(os.path.join(compilerDir, file)) for file in compilerFiles]
+        for tool in ["opt", "llc", "gcc"]:
+            path = shutil.which(tool)
+            if path:
+                stat = os.stat(os.path.realpath(path))
+                parts.append(f"{path} {stat.st_size} {stat.st_mtime_ns}")
+        compilerVersion = hashParts(*parts)
+    return compilerVersion
+
+def getRuntimeVersion():
+    return hashParts(*[hashFile(os.path.join(compilerDir, file)) for file in runtimeFiles])
+
+class BuildCache:
+    def __init__(self, dir=None, maxSize=None):
+        self.dir = dir or os.environ.get("PLUSH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "plush"))
+        self.maxSize = maxSize or int(os.environ.get("PLUSH_CACHE_SIZE", 256 * 1024 * 1024))
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, stage, key):
+        return os.path.join(self.dir, "objects", key[:2], f"{key}.{stage}")
+
+    def get(self, stage, key):
+        path = self.path(stage, key)
+        try:
+            # the modification time is the last use, eviction removes the least recently used entries
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, stage, key, file):
+        path = self.path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        shutil.copy2(file, tmp)
+        os.replace(tmp, path)
+        return path
+
+    def getData(self, stage, key):
+        path = self.get(stage, key)
+        if path:
+            with open(path) as f:
+                return f.read()
+
+    def putData(self, stage, key, data):
+        path = self.path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def entries(self):
+        objects = os.path.join(self.dir, "objects")
+        for root, _, files in os.walk(objects):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        size = sum(e[1] for e in entries)
+        for path, entrySize, _ in entries:
+            if size <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entrySize
+
+    # hits and misses are added to the totals kept in the cache directory
+    def flush(self):
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, "stats.json"), "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            data = f.read()
+            stats = json.loads(data) if data else {"hits": 0, "misses": 0}
+            stats["hits"] += self.hits
+            stats["misses"] += self.misses
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(stats))
+        # only a build that added artifacts can take the cache over its size
+        if self.misses:
+            self.evict()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        try:
+            with open(os.path.join(self.dir, "stats.json")) as f:
+                stats = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stats = {"hits": 0, "misses": 0}
+        entries = list(self.entries())
+        stats["entries"] = len(entries)
+        stats["size"] = sum(e[1] for e in entries)
+        stats["maxSize"] = self.maxSize
+        stats["dir"] = self.dir
+        return stats
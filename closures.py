@@ -0,0 +1,370 @@
+import sys
+
+from parser import Node, Program, FunctionDeclaration, StructDeclaration, GlobalVariableDefinition, FunctionDefinition, CodeBlock, Assignment, While, If, VariableDefinition, FunctionCall, StructInit, Binary, Unary, Ident, Literal, Field, Variable, ArrayIndexing, FieldAccessing
+from parser import Type, TypeEnum, VarType, BinaryOp, UnaryOp
+from interpreter import Struct, builtins, arith, wrap, truncFloat, roundFloat, copy, defaultValue, indexError
+
+# Compiles the typed ast into nested python closures, one per node specialized on its operator and
+# types, and runs those. Every local lives in a slot of a flat frame, a list per function call
+
+INT_MIN = -2**31
+INT_MAX = 2**31 - 1
+
+class Function:
+    def __init__(self, functionHeader):
+        self.header = functionHeader
+        self.body = None
+        # frame of a new call: the return variable in slot 0, then the arguments and the locals
+        self.frame = None
+
+class Context:
+    def __init__(self):
+        self.globals = {}
+        self.globalValues = []
+        self.functions = {}
+        self.scopes = []
+        self.size = 0
+
+    def newScope(self):
+        self.scopes.append({})
+
+    def popScope(self):
+        self.scopes.pop()
+
+    def define(self, ident):
+        slot = self.size
+        self.size += 1
+        self.scopes[-1][ident] = slot
+        return slot
+
+    def getSlot(self, ident):
+        for scope in reversed(self.scopes):
+            if ident in scope:
+                return scope[ident]
+
+def isStruct(type):
+    return type.type == TypeEnum.STRUCT and type.listDepth == 0
+
+# Structs are values, they are copied when they are assigned or passed to a function
+def copied(expr, ctx):
+    fn = closure(expr, ctx)
+    if isStruct(expr.exprType):
+        return lambda fr: copy(fn(fr))
+    return fn
+
+def intArith(op, l, r):
+    match op:
+        case BinaryOp.PLUS:
+            def fn(fr):
+                v = l(fr) + r(fr)
+                return v if INT_MIN <= v <= INT_MAX else wrap(v)
+        case BinaryOp.MINUS:
+            def fn(fr):
+                v = l(fr) - r(fr)
+                return v if INT_MIN <= v <= INT_MAX else wrap(v)
+        case BinaryOp.MULT:
+            def fn(fr):
+                v = l(fr) * r(fr)
+                return v if INT_MIN <= v <= INT_MAX else wrap(v)
+        case _:
+            fn = lambda fr: arith(op, TypeEnum.INT, l(fr), r(fr))
+    return fn
+
+def floatArith(op, l, r):
+    match op:
+        case BinaryOp.PLUS:
+            fn = lambda fr: roundFloat(l(fr) + r(fr))
+        case BinaryOp.MINUS:
+            fn = lambda fr: roundFloat(l(fr) - r(fr))
+        case BinaryOp.MULT:
+            fn = lambda fr: roundFloat(l(fr) * r(fr))
+        case _:
+            fn = lambda fr: arith(op, TypeEnum.FLT, l(fr), r(fr))
+    return fn
+
+def intCompare(op, l, r):
+    match op:
+        case BinaryOp.LT:
+            fn = lambda fr: l(fr) < r(fr)
+        case BinaryOp.LTE:
+            fn = lambda fr: l(fr) <= r(fr)
+        case BinaryOp.GT:
+            fn = lambda fr: l(fr) > r(fr)
+        case BinaryOp.GTE:
+            fn = lambda fr: l(fr) >= r(fr)
+        case BinaryOp.EQ:
+            fn = lambda fr: l(fr) == r(fr)
+        case BinaryOp.NEQ:
+            fn = lambda fr: l(fr) != r(fr)
+    return fn
+
+# Float comparisons are unordered (true when an operand is nan), written as the negation of the
+# opposite ordered comparison
+def floatCompare(op, l, r):
+    match op:
+        case BinaryOp.LT:
+            fn = lambda fr: not l(fr) >= r(fr)
+        case BinaryOp.LTE:
+            fn = lambda fr: not l(fr) > r(fr)
+        case BinaryOp.GT:
+            fn = lambda fr: not l(fr) <= r(fr)
+        case BinaryOp.GTE:
+            fn = lambda fr: not l(fr) < r(fr)
+        case BinaryOp.EQ:
+            def fn(fr):
+                a = l(fr)
+                b = r(fr)
+                return a == b or a != a or b != b
+        case BinaryOp.NEQ:
+            fn = lambda fr: l(fr) != r(fr)
+    return fn
+
+def call(function, args):
+    match args:
+        case []:
+            def fn(fr):
+                frame = function.frame.copy()
+                function.body(frame)
+                return frame[0]
+        case [a]:
+            def fn(fr):
+                frame = function.frame.copy()
+                frame[1] = a(fr)
+                function.body(frame)
+                return frame[0]
+        case [a, b]:
+            def fn(fr):
+                frame = function.frame.copy()
+                frame[1] = a(fr)
+                frame[2] = b(fr)
+                function.body(frame)
+                return frame[0]
+        case _:
+            end = len(args) + 1
+            def fn(fr):
+                frame = function.frame.copy()
+                frame[1:end] = [arg(fr) for arg in args]
+                function.body(frame)
+                return frame[0]
+    return fn
+
+def callBuiltin(builtin, args):
+    match args:
+        case [a]:
+            fn = lambda fr: builtin(a(fr))
+        case [a, b]:
+            fn = lambda fr: builtin(a(fr), b(fr))
+        case _:
+            fn = lambda fr: builtin(*[arg(fr) for arg in args])
+    return fn
+
+def block(stmts):
+    match stmts:
+        case []:
+            fn = lambda fr: None
+        case [stmt]:
+            fn = stmt
+        case [a, b]:
+            def fn(fr):
+                a(fr)
+                b(fr)
+        case _:
+            def fn(fr):
+                for stmt in stmts:
+                    stmt(fr)
+    return fn
+
+def closure(node, ctx: Context):
+    match node:
+        case FunctionDefinition(functionHeader, codeBlock):
+            function = ctx.functions[functionHeader.ident]
+            ctx.size = 0
+            ctx.newScope()
+            ctx.define(functionHeader.ident)
+            [ctx.define(argIdent) for _, argIdent, _ in functionHeader.args[::-1]]
+            function.body = closure(codeBlock, ctx)
+            ctx.popScope()
+            function.frame = [None] * ctx.size
+            function.frame[0] = defaultValue(functionHeader.retType)
+
+        case CodeBlock(statements):
+            ctx.newScope()
+            fn = block([closure(stmt, ctx) for stmt in statements[::-1]])
+            ctx.popScope()
+            return fn
+
+        case Assignment(Variable(Ident(ident, glob)), rhs):
+            value = copied(rhs, ctx)
+            if glob:
+                values = ctx.globalValues
+                slot = ctx.globals[ident]
+                def fn(fr):
+                    values[slot] = value(fr)
+            else:
+                slot = ctx.getSlot(ident)
+                def fn(fr):
+                    fr[slot] = value(fr)
+            return fn
+
+        # the address is computed before the value like in the compiled code
+        case Assignment(ArrayIndexing(array, index), rhs):
+            a = closure(array, ctx)
+            i = closure(index, ctx)
+            value = copied(rhs, ctx)
+            def fn(fr):
+                arr = a(fr)
+                index = i(fr)
+                val = value(fr)
+                if arr is None or not 0 <= index < len(arr):
+                    raise indexError(arr, index)
+                arr[index] = val
+            return fn
+
+        case Assignment(FieldAccessing(struct, field), rhs):
+            s = closure(struct, ctx)
+            index = field.index
+            value = copied(rhs, ctx)
+            def fn(fr):
+                s(fr)[index] = value(fr)
+            return fn
+
+        case While(guard, codeBlock):
+            test = closure(guard, ctx)
+            body = closure(codeBlock, ctx)
+            def fn(fr):
+                while test(fr):
+                    body(fr)
+            return fn
+
+        case If(condition, thenBlock, elseBlock):
+            test = closure(condition, ctx)
+            then = closure(thenBlock, ctx)
+            if not elseBlock:
+                def fn(fr):
+                    if test(fr):
+                        then(fr)
+            else:
+                else_ = closure(elseBlock, ctx)
+                def fn(fr):
+                    if test(fr):
+                        then(fr)
+                    else:
+                        else_(fr)
+            return fn
+
+        case VariableDefinition(varType, ident, type, rhs):
+            value = copied(rhs, ctx)
+            slot = ctx.define(ident)
+            def fn(fr):
+                fr[slot] = value(fr)
+            return fn
+
+        case FunctionCall(ident, args):
+            argFns = [copied(arg, ctx) for arg in args[::-1]]
+            if ident in ctx.functions:
+                return call(ctx.functions[ident], argFns)
+            if ident not in builtins:
+                print(f"Function {ident} is not defined. On line {node.lineno}")
+                exit(4)
+            return callBuiltin(builtins[ident], argFns)
+
+        case StructInit(ident, initFields):
+            fields = [closure(initField, ctx) for initField in initFields[::-1]]
+            return lambda fr: Struct([field(fr) for field in fields])
+
+        case Binary(BinaryOp.AND, left, right):
+            l = closure(left, ctx)
+            r = closure(right, ctx)
+            return lambda fr: l(fr) and r(fr)
+
+        case Binary(BinaryOp.OR, left, right):
+            l = closure(left, ctx)
+            r = closure(right, ctx)
+            return lambda fr: l(fr) or r(fr)
+
+        case Binary(op, left, right):
+            l = closure(left, ctx)
+            r = closure(right, ctx)
+            isInt = left.exprType.type == TypeEnum.INT
+            if op in [BinaryOp.MULT, BinaryOp.DIV, BinaryOp.REM, BinaryOp.PLUS, BinaryOp.MINUS]:
+                return intArith(op, l, r) if isInt else floatArith(op, l, r)
+            return intCompare(op, l, r) if isInt else floatCompare(op, l, r)
+
+        case Unary(UnaryOp.NOT, expression):
+            e = closure(expression, ctx)
+            return lambda fr: not e(fr)
+
+        case Unary(UnaryOp.NEGATION, expression):
+            e = closure(expression, ctx)
+            if node.exprType.type == TypeEnum.INT:
+                return lambda fr: wrap(-e(fr))
+            return lambda fr: -e(fr)
+
+        case Variable(ident):
+            return closure(ident, ctx)
+
+        case ArrayIndexing(array, index):
+            a = closure(array, ctx)
+            i = closure(index, ctx)
+            def fn(fr):
+                arr = a(fr)
+                index = i(fr)
+                if arr is None or not 0 <= index < len(arr):
+                    raise indexError(arr, index)
+                return arr[index]
+            return fn
+
+        case FieldAccessing(struct, field):
+            s = closure(struct, ctx)
+            index = field.index
+            return lambda fr: s(fr)[index]
+
+        case Ident(ident, glob):
+            if glob:
+                values = ctx.globalValues
+                slot = ctx.globals[ident]
+                return lambda fr: values[slot]
+            slot = ctx.getSlot(ident)
+            return lambda fr: fr[slot]
+
+        case Literal(val, type):
+            val = truncFloat(val) if type.type == TypeEnum.FLT else val
+            return lambda fr: val
+
+# Returns a function that runs the program with the given command line arguments
+def compileProgram(program: Program):
+    ctx = Context()
+    defs = program.definitions[::-1]
+    for def_ in defs:
+        match def_:
+            case GlobalVariableDefinition(varType, ident, type, rhs):
+                ctx.globals[ident] = len(ctx.globalValues)
+                ctx.globalValues.append(None)
+            case FunctionDefinition(functionHeader, codeBlock):
+                ctx.functions[functionHeader.ident] = Function(functionHeader)
+
+    initializers = []
+    for def_ in defs:
+        match def_:
+            case GlobalVariableDefinition(varType, ident, type, rhs):
+                initializers.append((ctx.globals[ident], copied(rhs, ctx)))
+            case FunctionDefinition():
+                closure(def_, ctx)
+
+    def run(argv):
+        for slot, value in initializers:
+            ctx.globalValues[slot] = value(None)
+        main = ctx.functions["main"]
+        # main gets argc and argv in the registers of its first arguments, like the native binary
+        args = [len(argv), argv][:len(main.header.args)]
+        call(main, [lambda fr, arg=arg: arg for arg in args])(None)
+
+    return run
+
+def runProgram(program: Program, argv):
+    run = compileProgram(program)
+    # plush calls are python calls, a few per call, the native stack allows much deeper recursion than
+    # python does by default
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 2_000_000))
+    run(argv)
+    return 0
@@ -1,28 +1,71 @@
+import re
 import struct
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 
 from parser import Node, Program, FunctionDeclaration, StructDeclaration, GlobalVariableDefinition, FunctionDefinition, CodeBlock, Assignment, While, If, VariableDefinition, FunctionCall, StructInit, Binary, Unary, Ident, Literal, Field, Variable, ArrayIndexing, FieldAccessing
 from parser import Type, TypeEnum, VarType, BinaryOp, UnaryOp
-from interpreter import eval, Context as ValueContext
+from interpreter import eval, Context as ValueContext, PlushRuntimeError
+from resolver import resolve
 
 class Emitter:
-    def __init__(self):
+    def __init__(self, ssa=True, ctfeBudget=None, out=None, instrument=False, profile=None, jobs=1):
+        # sections of the module in the order they are written: struct types, global variables and
+        # string constants, function definitions (lines) and function declarations. With an out file
+        # the sections are written after every top level definition instead of kept until the end
+        self.types = []
+        self.constants = []
         self.lines = []
         self.decls = []
-        self.types = []
+        self.out = out
         self.counter = 0
-        self.literal = 0
         self.branch = 0
         self.arrayIdx = 0
+        # with ssa, locals that are not structs live in registers instead of allocas.
+        # values maps the name of each of these locals to its current register or constant
+        self.ssa = ssa
+        self.values = {}
+        self.valueTypes = {}
+        self.block = "entry"
+        # allocas of the function, they go to its entry block when it ends. An alloca anywhere else
+        # takes more stack every time it runs, in a loop until the stack overflows
+        self.allocas = []
+        self.globals = set()
+        self.functions = set()
+        # global initializers are evaluated at compile time, calls included, within ctfeBudget steps
+        self.ctfe = ValueContext(ctfeBudget)
+        self.structs = {}
+        # string constants are interned per module, equal strings share one global
+        self.strings = {}
+        # with instrument, every function counts its calls and self cycles, every loop its back edges and every
+        # branch of an if and exit of a while the times it is taken. The counters are registered with
+        # plush_profile_register of c_functions.c, which dumps them at exit
+        self.instrument = instrument
+        self.profiledFunctions = []
+        self.profiledBlocks = []
+        self.function = None
+        # a profile read by readProfile becomes branch weights and function entry counts
+        self.profile = profile
+        self.metadata = []
+        # worker processes that generate the functions of a program
+        self.jobs = jobs
 
     def __lshift__(self, line):
         self.lines.append(line)
 
-    def addTop(self, line):
-        self.lines.insert(0, line)
+    def label(self, label):
+        self.lines.append(f"{label}:")
+        self.block = label
+
+    def addConstant(self, line):
+        self.constants.append(line)
 
     def addDec(self, line):
         self.decls.append(line)
 
+    def alloca(self, name, type):
+        self.allocas.append(f"  {name} = alloca {type}")
+
     def addType(self, line):
         self.types.append(line) 
 
@@ -31,15 +74,177 @@ class Emitter:
         self.counter += 1
         return res
 
-    def nextLiteral(self):
-        res = self.literal
-        self.literal += 1
-        return res
+    def string(self, val):
+        if val not in self.strings:
+            data = val.encode()
+            name = f"@str.{len(self.strings)}"
+            self.strings[val] = name
+            self.addConstant(f"{name} = private unnamed_addr constant [{len(data) + 1} x i8] c\"{llvmString(data)}\\00\"")
+        return self.strings[val]
 
     def reset(self):
         self.counter = 0
-        self.literal = 0
         self.arrayIdx = 0
+        self.values = {}
+        self.valueTypes = {}
+        self.block = "entry"
+        self.allocas = []
+
+    def inRegister(self, type):
+        return self.ssa and type.type != TypeEnum.STRUCT
+
+    def define(self, name, type, value):
+        self.values[name] = value
+        self.valueTypes[name] = type.llvm()
+
+    def flush(self):
+        if self.out:
+            for section in [self.types, self.constants, self.lines]:
+                self.out.writelines(line + "\n" for line in section)
+                section.clear()
+
+    # Counters of a function: calls and cycles spent in the function itself, without its callees
+    def functionCounter(self, index, counter):
+        return f"getelementptr inbounds ([2 x i64], ptr @__plush.functionCounters, i64 {index}, i64 {counter})"
+
+    def blockCounter(self, index):
+        return f"getelementptr inbounds (i64, ptr @__plush.blockCounters, i64 {index})"
+
+    def increment(self, counter, by="1"):
+        old = self.next()
+        self.lines.append(f"  %{old} = load i64, ptr {counter}")
+        new = self.next()
+        self.lines.append(f"  %{new} = add i64 %{old}, {by}")
+        self.lines.append(f"  store i64 %{new}, ptr {counter}")
+        return f"%{new}"
+
+    # @__plush.calleeCycles adds up the cycles of the calls made by the running call. Every call
+    # saves it and starts it at 0, and when it returns it counts its cycles minus those of its callees
+    # and adds all of its cycles to the saved value for its caller, so recursion is not counted twice
+    def enterFunction(self, ident):
+        index = len(self.profiledFunctions)
+        self.profiledFunctions.append(ident)
+        self.increment(self.functionCounter(index, 0))
+        saved = self.next()
+        self.lines.append(f"  %{saved} = load i64, ptr @__plush.calleeCycles")
+        self.lines.append("  store i64 0, ptr @__plush.calleeCycles")
+        start = self.next()
+        self.lines.append(f"  %{start} = call i64 @llvm.readcyclecounter()")
+        return index, f"%{start}", f"%{saved}"
+
+    def leaveFunction(self, index, start, saved):
+        end = self.next()
+        self.lines.append(f"  %{end} = call i64 @llvm.readcyclecounter()")
+        cycles = self.next()
+        self.lines.append(f"  %{cycles} = sub i64 %{end}, {start}")
+        callees = self.next()
+        self.lines.append(f"  %{callees} = load i64, ptr @__plush.calleeCycles")
+        own = self.next()
+        self.lines.append(f"  %{own} = sub i64 %{cycles}, %{callees}")
+        self.increment(self.functionCounter(index, 1), f"%{own}")
+        total = self.next()
+        self.lines.append(f"  %{total} = add i64 {saved}, %{cycles}")
+        self.lines.append(f"  store i64 %{total}, ptr @__plush.calleeCycles")
+
+    # kind is loop for the back edge of a while and branch for the blocks a conditional branch goes to
+    def countBlock(self, kind, label, lineno):
+        self.increment(self.blockCounter(len(self.profiledBlocks)))
+        self.profiledBlocks.append((kind, self.function, label, lineno))
+
+    def addProfileRegistration(self):
+        functions, blocks = len(self.profiledFunctions), len(self.profiledBlocks)
+        self.addConstant(f"@__plush.functionCounters = internal global [{functions} x [2 x i64]] zeroinitializer")
+        self.addConstant("@__plush.calleeCycles = internal global i64 0")
+        functionNames = ", ".join(f"ptr {self.string(ident)}" for ident in self.profiledFunctions)
+        blockNames = ", ".join(f"ptr {self.string(f'{kind} {ident} {label} {lineno}')}" for kind, ident, label, lineno in self.profiledBlocks)
+        self.addConstant(f"@__plush.functionNames = internal constant [{functions} x ptr] [{functionNames}]")
+        self.addConstant(f"@__plush.blockCounters = internal global [{blocks} x i64] zeroinitializer")
+        self.addConstant(f"@__plush.blockNames = internal constant [{blocks} x ptr] [{blockNames}]")
+        self.addConstant("@llvm.global_ctors = appending global [1 x { i32, ptr, ptr }] [{ i32, ptr, ptr } { i32 65535, ptr @__plush.registerProfile, ptr null }]")
+        self.lines.append("define internal void @__plush.registerProfile() {")
+        self.lines.append("entry:")
+        self.lines.append(f"  call void @plush_profile_register(ptr @__plush.functionCounters, ptr @__plush.functionNames, i32 {functions}, ptr @__plush.blockCounters, ptr @__plush.blockNames, i32 {blocks})")
+        self.lines.append("  ret void")
+        self.lines.append("}")
+        self.addDec("declare void @plush_profile_register(ptr, ptr, i32, ptr, ptr, i32)")
+        self.addDec("declare i64 @llvm.readcyclecounter()")
+
+    def addMetadata(self, node):
+        self.metadata.append(node)
+        return f"!{len(self.metadata) - 1}"
+
+    def metadataLines(self):
+        return [f"!{index} = {node}" for index, node in enumerate(self.metadata)]
+
+    # what the emitter of every function shares with the emitter of its module
+    def functionSettings(self):
+        return self.ssa, self.instrument, self.profile, self.globals, self.functions, self.structs
+
+    # Adds the code of a function generated by generateFunction. Its strings, metadata and counters
+    # are numbered from 0, they are renumbered after the ones of the functions merged before it
+    def merge(self, function):
+        lines, strings, metadata, profiledFunctions, profiledBlocks = function
+        if strings or metadata or profiledFunctions:
+            names = [self.string(val) for val in strings]
+            offsets = [len(self.metadata), len(self.profiledFunctions), len(self.profiledBlocks)]
+
+            def renumber(reference):
+                index = int(reference[reference.lastindex])
+                match reference.lastindex:
+                    case 1:
+                        return names[index]
+                    case 2:
+                        return f"!prof !{offsets[0] + index}"
+                    case 3:
+                        return f"@__plush.functionCounters, i64 {offsets[1] + index}"
+                    case 4:
+                        return f"@__plush.blockCounters, i64 {offsets[2] + index}"
+
+            lines = moduleReferences.sub(renumber, "\n".join(lines)).split("\n")
+        self.lines.extend(lines)
+        self.metadata.extend(metadata)
+        self.profiledFunctions.extend(profiledFunctions)
+        self.profiledBlocks.extend(profiledBlocks)
+
+    # Weights of the two targets of a conditional branch from the counts of their blocks in the profile
+    def branchWeights(self, trueLabel, falseLabel):
+        if not self.profile:
+            return ""
+        weights = [self.profile["blocks"].get((self.function, label)) for label in [trueLabel, falseLabel]]
+        if None in weights:
+            return ""
+        # weights are 32 bit
+        scale = max(1, -(-max(weights) // 0xffffffff))
+        node = self.addMetadata(f'!{{!"branch_weights", i32 {weights[0] // scale}, i32 {weights[1] // scale}}}')
+        return f", !prof {node}"
+
+    # Attributes and entry count of a function from the profile: cold when the training run never
+    # called it, hot when it took at least a tenth of the self cycles of the hottest function. Self
+    # cycles leave out the callees, otherwise main and every caller of a hot function would be hot
+    def functionHints(self, ident):
+        if not self.profile or ident not in self.profile["functions"]:
+            return ""
+        calls, cycles = self.profile["functions"][ident]
+        maxCycles = max(cycles for _, cycles in self.profile["functions"].values())
+        hints = ""
+        if calls == 0:
+            hints += " cold"
+        elif maxCycles and cycles * 10 >= maxCycles:
+            hints += " hot"
+        node = self.addMetadata(f'!{{!"function_entry_count", i64 {calls}}}')
+        return f"{hints} !prof {node}"
+
+    def finish(self):
+        if self.instrument:
+            self.addProfileRegistration()
+        self.flush()
+        if self.out:
+            self.out.writelines(line + "\n" for line in self.decls + self.metadataLines())
+            self.decls.clear()
+            self.metadata.clear()
+
+    def module(self):
+        return "".join(line + "\n" for line in self.types + self.constants + self.lines + self.decls + self.metadataLines())
 
     def nextBranch(self):
         res = self.branch
@@ -51,18 +256,133 @@ class Emitter:
         self.arrayIdx += 1
         return res
 
+# references of the code of a function to the numbered strings, metadata and counters of the module
+moduleReferences = re.compile(r"@str\.(\d+)|!prof !(\d+)|@__plush\.functionCounters, i64 (\d+)|@__plush\.blockCounters, i64 (\d+)")
+
+# Generates a function with an emitter of its own, so functions can be generated in any order and
+# in other processes. Labels and registers are numbered per function already
+def generateFunction(def_, settings):
+    ssa, instrument, profile, globals, functions, structs = settings
+    emitter = Emitter(ssa=ssa, instrument=instrument, profile=profile)
+    emitter.globals, emitter.functions, emitter.structs = globals, functions, structs
+    codegen(def_, emitter)
+    return emitter.lines, list(emitter.strings), emitter.metadata, emitter.profiledFunctions, emitter.profiledBlocks
+
+# The functions and settings of a worker process are passed once, when it starts, instead of with every function
+workerFunctions = None
+workerSettings = None
+
+def startWorker(functions, settings):
+    global workerFunctions, workerSettings
+    workerFunctions, workerSettings = functions, settings
+
+def generateWorkerFunction(index):
+    return generateFunction(workerFunctions[index], workerSettings)
+
+# Yields the generated functions in order, from a pool of worker processes when there are jobs to share them
+@contextmanager
+def generatedFunctions(functions, emitter):
+    settings = emitter.functionSettings()
+    if emitter.jobs <= 1 or len(functions) < 2:
+        yield (generateFunction(def_, settings) for def_ in functions)
+        return
+    with ProcessPoolExecutor(emitter.jobs, initializer=startWorker, initargs=(functions, settings)) as pool:
+        yield pool.map(generateWorkerFunction, range(len(functions)), chunksize=max(1, len(functions) // (emitter.jobs * 8)))
+
+# Reads the counters that a binary built with instrument wrote at exit
+def readProfile(path):
+    profile = {"functions": {}, "blocks": {}}
+    with open(path) as f:
+        for line in f:
+            match line.split():
+                case ["function", ident, calls, cycles]:
+                    profile["functions"][ident] = (int(calls), int(cycles))
+                case ["loop" | "branch", ident, label, lineno, count]:
+                    profile["blocks"][(ident, label)] = int(count)
+    return profile
+
 def float_to_hex(f):
     packed = struct.pack('>d', f)
     unpacked = struct.unpack('>Q', packed)[0] & 0xffffffffe0000000
     hex_value = f"0x{unpacked:016X}"
     return hex_value
 
+# Bytes of a llvm string constant, everything but printable ascii is written as \XX
+def llvmString(data):
+    return "".join(chr(b) if 32 <= b < 127 and b not in b'"\\' else f"\\{b:02X}" for b in data)
+
+# Formats a value computed by the interpreter as a llvm constant
+def llvmConst(value, type, emitter):
+    if value is None:
+        return "null"
+    if type.listDepth > 0:
+        print("An array computed at compile time cannot be the value of a global variable")
+        exit(5)
+    match type.type:
+        case TypeEnum.STRUCT:
+            return "{ " + ", ".join(f"{fieldType.llvm()} {llvmConst(field, fieldType, emitter)}" for field, fieldType in zip(value, emitter.structs[type.structName])) + " }"
+        case TypeEnum.STR:
+            return emitter.string(value)
+        case TypeEnum.FLT:
+            return float_to_hex(value)
+        case TypeEnum.BOOL:
+            return "true" if value else "false"
+        case TypeEnum.CHA:
+            return str(ord(value))
+        case _:
+            return str(value)
+
+# Locals are named by the binding number the type checker gave them, unique in their function, so
+# bindings of the same name in sibling blocks do not share an alloca or a value
+def varName(ident, binding):
+    return f"{ident}.{binding}"
+
+def defaultValue(type):
+    return "null" if type.llvm() == "ptr" else type.llvmDefault()
+
+# Locals assigned somewhere inside a loop body, they need a phi in the loop guard. The locals of a
+# nested loop are kept in its node, so nested loops dont walk their bodies again
+def assignedLocals(node, names):
+    match node:
+        case CodeBlock(statements):
+            [assignedLocals(stmt, names) for stmt in statements]
+        case If(condition, thenBlock, elseBlock):
+            assignedLocals(thenBlock, names)
+            assignedLocals(elseBlock, names)
+        case While(guard, codeBlock):
+            names += loopLocals(node)
+        case Assignment(Variable(ident)):
+            if not ident.glob:
+                names.append(varName(ident.ident, ident.binding))
+    return names
+
+def loopLocals(node):
+    if not hasattr(node, "assigned"):
+        node.assigned = assignedLocals(node.codeBlock, [])
+    return node.assigned
+
 def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assignment=False):
     match node:
         case Program(decs, defs):
-            emitter = Emitter()
+            if not emitter:
+                emitter = Emitter()
+            emitter.globals = {def_.ident for def_ in defs if isinstance(def_, GlobalVariableDefinition)}
+            emitter.functions = {def_.functionHeader.ident for def_ in defs if isinstance(def_, FunctionDefinition)}
+            emitter.structs = {dec.ident: [type for _, _, type in dec.fields[::-1]] for dec in decs + defs if isinstance(dec, StructDeclaration)}
+            # the interpreter only runs the initializers of globals
+            if emitter.globals:
+                emitter.ctfe.globals = [None] * resolve(node)
+                [eval(def_, emitter.ctfe) for def_ in defs if isinstance(def_, FunctionDefinition)]
             [codegen(dec, emitter) for dec in decs[::-1]]
-            [codegen(def_, emitter) for def_ in defs[::-1]]
+            functions = [def_ for def_ in defs[::-1] if isinstance(def_, FunctionDefinition)]
+            with generatedFunctions(functions, emitter) as generated:
+                for def_ in defs[::-1]:
+                    if isinstance(def_, FunctionDefinition):
+                        emitter.merge(next(generated))
+                    else:
+                        codegen(def_, emitter)
+                    emitter.flush()
+            emitter.finish()
             return emitter
 
         case FunctionDeclaration(ident, args, retType):
@@ -74,7 +394,13 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
             emitter.addType(f"%struct.{ident} = type {{{', '.join(type.llvm() for _, _, type in fields[::-1])}}}")
 
         case GlobalVariableDefinition(varType, ident, type, rhs):
-            emitter.addTop(f"@{ident} = global {type.llvm()} {eval(rhs, ValueContext())}")
+            emitter.ctfe.steps = 0
+            try:
+                value = eval(rhs, emitter.ctfe)
+            except (PlushRuntimeError, RecursionError) as e:
+                print(f"Global variable {ident} cannot be computed at compile time: {e}. On line {node.lineno}")
+                exit(3)
+            emitter.addConstant(f"@{ident} = global {type.llvm()} {llvmConst(value, type, emitter)}")
 
         case FunctionDefinition(functionHeader, codeBlock):
             ident = functionHeader.ident
@@ -84,35 +410,60 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
             if ident == "main":
                 retType = Type(TypeEnum.INT)
 
+            emitter.function = ident
             emitter << f"define {retType.llvm()} @{ident}("\
                 + ", ".join(f"{argType.llvm()} %{argIdent}" for (_, argIdent, argType) in args)\
-                + ") {"
-
-            emitter << "entry:"
+                + f"){emitter.functionHints(ident)} {{"
+
+            emitter.label("entry")
+            entry = len(emitter.lines)
+            if emitter.instrument:
+                profileIndex, profileStart, profileSaved = emitter.enterFunction(ident)
+            # the function scope is nested in the global one, so names of globals are shadowed
+            retName = varName(ident, functionHeader.retBinding)
             if retType.type != TypeEnum.VOID:
-                emitter << f"  %{ident}.addr = alloca {retType.llvm()}"
-                if retType.listDepth > 0 or retType.type == TypeEnum.STR or retType.type == TypeEnum.STRUCT:
-                    pass
+                if emitter.inRegister(retType):
+                    emitter.define(retName, retType, defaultValue(retType))
                 else:
-                    emitter << f"  store {retType.llvm()} {retType.llvmDefault()}, ptr %{ident}.addr"
-            for (_, argIdent, argType) in args:
-                emitter << f"  %{argIdent}.addr = alloca {argType.llvm()}"
-                emitter << f"  store {argType.llvm()} %{argIdent}, ptr %{argIdent}.addr"
+                    emitter.alloca(f"%{retName}.addr", retType.llvm())
+                    if retType.listDepth > 0 or retType.type == TypeEnum.STR or retType.type == TypeEnum.STRUCT:
+                        pass
+                    else:
+                        emitter << f"  store {retType.llvm()} {retType.llvmDefault()}, ptr %{retName}.addr"
+            for (_, argIdent, argType), binding in zip(args, functionHeader.argBindings[::-1]):
+                argName = varName(argIdent, binding)
+                if emitter.inRegister(argType):
+                    emitter.define(argName, argType, f"%{argIdent}")
+                else:
+                    emitter.alloca(f"%{argName}.addr", argType.llvm())
+                    emitter << f"  store {argType.llvm()} %{argIdent}, ptr %{argName}.addr"
 
             codegen(codeBlock, emitter)
 
+            if emitter.instrument:
+                emitter.leaveFunction(profileIndex, profileStart, profileSaved)
             if retType.type == TypeEnum.VOID:
                 emitter << f"  ret void"
+            elif emitter.inRegister(retType):
+                emitter << f"  ret {retType.llvm()} {emitter.values[retName]}"
             else:
                 ret = emitter.next()
-                emitter << f"  %{ret} = load {retType.llvm()}, ptr %{ident}.addr"
+                emitter << f"  %{ret} = load {retType.llvm()}, ptr %{retName}.addr"
                 emitter << f"  ret {retType.llvm()} %{ret}"
             emitter << "}"
+            emitter.lines[entry:entry] = emitter.allocas
 
             emitter.reset()
 
         case CodeBlock(statements):
+            # the locals of the block are the last ones defined, values keeps the order of definition
+            outer = len(emitter.values)
             [codegen(stmt, emitter) for stmt in statements[::-1]]
+            while len(emitter.values) > outer:
+                emitter.values.popitem()
+
+        case Assignment(Variable(ident), rhs) if not ident.glob and emitter.inRegister(ident.exprType):
+            emitter.values[varName(ident.ident, ident.binding)] = codegen(rhs, emitter)
 
         case Assignment(lhs, rhs):
             lhsReg = codegen(lhs, emitter, assignment=True)
@@ -127,16 +478,37 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
             endLabel = emitter.nextBranch()
 
             emitter << f"  br label %while.guard{guardLabel}"
+            preheader = emitter.block
+
+            emitter.label(f"while.guard{guardLabel}")
+            # the incoming value from the loop body is only known after generating it, so the
+            # phis are emitted now and filled in afterwards
+            phis = []
+            for name in dict.fromkeys(loopLocals(node)):
+                if name in emitter.values:
+                    phi = f"%{emitter.next()}"
+                    phis.append((name, phi, len(emitter.lines), emitter.values[name]))
+                    emitter << ""
+                    emitter.values[name] = phi
 
-            emitter << f"while.guard{guardLabel}:"
             guardReg = codegen(guard, emitter)
-            emitter << f"  br i1 {guardReg}, label %while.body{bodyLabel}, label %while.end{endLabel}"
+            weights = emitter.branchWeights(f"while.guard{guardLabel}", f"while.end{endLabel}")
+            emitter << f"  br i1 {guardReg}, label %while.body{bodyLabel}, label %while.end{endLabel}{weights}"
 
-            emitter << f"while.body{bodyLabel}:"
+            emitter.label(f"while.body{bodyLabel}")
             codegen(codeBlock, emitter)
+            if emitter.instrument:
+                emitter.countBlock("loop", f"while.guard{guardLabel}", node.lineno)
             emitter << f"  br label %while.guard{guardLabel}"
+            latch = emitter.block
 
-            emitter << f"while.end{endLabel}:"
+            for name, phi, line, initial in phis:
+                emitter.lines[line] = f"  {phi} = phi {emitter.valueTypes[name]} [{initial}, %{preheader}], [{emitter.values[name]}, %{latch}]"
+                emitter.values[name] = phi
+
+            emitter.label(f"while.end{endLabel}")
+            if emitter.instrument:
+                emitter.countBlock("branch", f"while.end{endLabel}", node.lineno)
 
         case If(condition, thenBlock, elseBlock):
 
@@ -145,37 +517,60 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
             endLabel = emitter.nextBranch()
 
             conditionReg = codegen(condition, emitter)
-            emitter << f"  br i1 {conditionReg}, label %if.then{thenLabel}, label %if.else{elseLabel}"
-
-            emitter << f"if.then{thenLabel}:"
+            weights = emitter.branchWeights(f"if.then{thenLabel}", f"if.else{elseLabel}")
+            emitter << f"  br i1 {conditionReg}, label %if.then{thenLabel}, label %if.else{elseLabel}{weights}"
+            before = emitter.values
+
+            emitter.values = dict(before)
+            emitter.label(f"if.then{thenLabel}")
+            if emitter.instrument:
+                emitter.countBlock("branch", f"if.then{thenLabel}", node.lineno)
             codegen(thenBlock, emitter)
             emitter << f"  br label %if.end{endLabel}"
+            thenValues, thenEnd = emitter.values, emitter.block
 
-            emitter << f"if.else{elseLabel}:"
+            emitter.values = dict(before)
+            emitter.label(f"if.else{elseLabel}")
+            if emitter.instrument:
+                emitter.countBlock("branch", f"if.else{elseLabel}", node.lineno)
             codegen(elseBlock, emitter)
             emitter << f"  br label %if.end{endLabel}"
+            elseValues, elseEnd = emitter.values, emitter.block
 
-            emitter << f"if.end{endLabel}:"
+            emitter.values = {}
+            emitter.label(f"if.end{endLabel}")
+            for name in before:
+                if thenValues[name] == elseValues[name]:
+                    emitter.values[name] = thenValues[name]
+                else:
+                    phi = f"%{emitter.next()}"
+                    emitter << f"  {phi} = phi {emitter.valueTypes[name]} [{thenValues[name]}, %{thenEnd}], [{elseValues[name]}, %{elseEnd}]"
+                    emitter.values[name] = phi
 
 
         case VariableDefinition(varType, ident, type, rhs):
-            if isinstance(rhs, StructInit):
-                structPtr = f"%{ident}{node.shadows if node.shadows > 0 else ''}.addr"
-                emitter << f"  {structPtr} = alloca {type.llvm()}"
+            if emitter.inRegister(type):
+                emitter.define(varName(ident, node.binding), type, codegen(rhs, emitter))
+            elif isinstance(rhs, StructInit):
+                structPtr = f"%{varName(ident, node.binding)}.addr"
+                emitter.alloca(structPtr, type.llvm())
                 reg = codegen(rhs, emitter, structPtr=structPtr)
             else:
                 reg = codegen(rhs, emitter)
-                emitter << f"  %{ident}{node.shadows if node.shadows > 0 else ''}.addr = alloca {type.llvm()}"
-                emitter << f"  store {type.llvm()} {reg}, ptr %{ident}{node.shadows if node.shadows > 0 else ''}.addr"
+                emitter.alloca(f"%{varName(ident, node.binding)}.addr", type.llvm())
+                emitter << f"  store {type.llvm()} {reg}, ptr %{varName(ident, node.binding)}.addr"
 
         case FunctionCall(ident, args):
             llvmArgs = ",".join(f"{arg.exprType.llvm()} {codegen(arg, emitter)}" for arg in args[::-1])
+            # plush functions can share the name of a libc function (sqrt, abs...), they must not be
+            # optimized as if they were the library function
+            attrs = " nobuiltin" if ident in emitter.functions else ""
             if node.exprType.type == TypeEnum.VOID:
-                emitter << f"  call {node.exprType.llvm()} @{ident} ({llvmArgs})"
+                emitter << f"  call {node.exprType.llvm()} @{ident} ({llvmArgs}){attrs}"
                 ret = None
             else:
                 ret = emitter.next()
-                emitter << f"  %{ret} = call {node.exprType.llvm()} @{ident}({llvmArgs})"
+                emitter << f"  %{ret} = call {node.exprType.llvm()} @{ident}({llvmArgs}){attrs}"
 
             return f"%{ret}"
 
@@ -184,8 +579,9 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
             noStructPtr = False
             if not structPtr:
                 noStructPtr = True
-                structPtr = f"%{emitter.next()}"
-                emitter << f"  {structPtr} = alloca {node.exprType.llvm()}"
+                # struct is a keyword, no variable has this name
+                structPtr = f"%struct.{len(emitter.allocas)}"
+                emitter.alloca(structPtr, node.exprType.llvm())
             for i, initField in enumerate(initFields[::-1]):
                 fieldPtr = emitter.next()
                 emitter << f"  %{fieldPtr} = getelementptr %struct.{ident}, ptr {structPtr}, i32 0, i32 {i}"
@@ -200,6 +596,28 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
                 emitter << f"  %{ret} = load {node.exprType.llvm()}, ptr {structPtr}"
                 return f"%{ret}"
 
+        case Binary(BinaryOp.AND | BinaryOp.OR as op, left, right):
+            # the right operand is only evaluated when the left one does not decide the result
+            lReg = codegen(left, emitter)
+            name = "and" if op == BinaryOp.AND else "or"
+            rhsLabel = emitter.nextBranch()
+            endLabel = emitter.nextBranch()
+            if op == BinaryOp.AND:
+                emitter << f"  br i1 {lReg}, label %{name}.rhs{rhsLabel}, label %{name}.end{endLabel}"
+            else:
+                emitter << f"  br i1 {lReg}, label %{name}.end{endLabel}, label %{name}.rhs{rhsLabel}"
+            lhsEnd = emitter.block
+
+            emitter.label(f"{name}.rhs{rhsLabel}")
+            rReg = codegen(right, emitter)
+            emitter << f"  br label %{name}.end{endLabel}"
+            rhsEnd = emitter.block
+
+            emitter.label(f"{name}.end{endLabel}")
+            res = emitter.next()
+            emitter << f"  %{res} = phi i1 [{'false' if op == BinaryOp.AND else 'true'}, %{lhsEnd}], [{rReg}, %{rhsEnd}]"
+            return f"%{res}"
+
         case Binary(op, left, right):
             lReg = codegen(left, emitter)
             rReg = codegen(right, emitter)
@@ -226,12 +644,6 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
                 case BinaryOp.LT | BinaryOp.LTE | BinaryOp.GT | BinaryOp.GTE | BinaryOp.EQ | BinaryOp.NEQ:
                     emitter << f"  %{res} = {'icmp' if left.exprType.type == TypeEnum.INT else 'fcmp'} {op.llvmInt() if left.exprType.type == TypeEnum.INT else op.llvmFloat()} {left.exprType.llvm()} {lReg}, {rReg}"
 
-                case BinaryOp.AND:
-                    emitter << f"  %{res} = and {node.exprType.llvm()} {lReg}, {rReg}"
-
-                case BinaryOp.OR:
-                    emitter << f"  %{res} = or {node.exprType.llvm()} {lReg}, {rReg}"
-
             return f"%{res}"
                 
 
@@ -254,13 +666,15 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
                 if node.glob:
                     return f"@{ident}"
                 else:
-                    return f"%{ident}{node.shadows if node.shadows > 0 else ''}.addr"
-            else:                
+                    return f"%{varName(ident, node.binding)}.addr"
+            elif not node.glob and emitter.inRegister(node.exprType):
+                return emitter.values[varName(ident, node.binding)]
+            else:
                 reg = emitter.next()
                 if node.glob:
                     emitter << f"  %{reg} = load {node.exprType.llvm()}, ptr @{ident}"
                 else:
-                    emitter << f"  %{reg} = load {node.exprType.llvm()}, ptr %{ident}{node.shadows if node.shadows > 0 else ''}.addr"
+                    emitter << f"  %{reg} = load {node.exprType.llvm()}, ptr %{varName(ident, node.binding)}.addr"
 
                 return f"%{reg}"
 
@@ -272,9 +686,7 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
                 case TypeEnum.FLT:
                     val = float_to_hex(val)
                 case TypeEnum.STR:
-                    lit = emitter.nextLiteral()
-                    emitter.addTop(f"@str.{lit} = constant [{len(val)+1} x i8] c\"{val}\\00\"")
-                    val = f"@str.{lit}"
+                    val = emitter.string(val)
                 case TypeEnum.CHA:
                     val = ord(val)
                 case TypeEnum.BOOL:
@@ -294,12 +706,19 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
             # Não gosto disto, mas não arranjo outro solução :/
             if isinstance(array, ArrayIndexing):
                 arrReg = codegen(array, emitter, assignment=assignment, firstFieldAccessing=False)
+            elif array.glob:
+                arrReg = f"@{array.ident}"
+            elif emitter.inRegister(array.exprType):
+                arrReg = None
             else:
-                arrReg = f"%{array.ident}{array.shadows if array.shadows > 0 else ''}.addr"
+                arrReg = f"%{varName(array.ident, array.binding)}.addr"
 
-            arrPtr = emitter.next()                    
-            emitter << f"  %{arrPtr} = load ptr, ptr {arrReg}"
-            arrReg = f"%{arrPtr}"
+            if arrReg:
+                arrPtr = emitter.next()
+                emitter << f"  %{arrPtr} = load ptr, ptr {arrReg}"
+                arrReg = f"%{arrPtr}"
+            else:
+                arrReg = emitter.values[varName(array.ident, array.binding)]
 
             idxReg = codegen(index, emitter)
 
@@ -317,7 +736,7 @@ def codegen(node, emitter=None, structPtr=None, firstFieldAccessing=True, assign
         case FieldAccessing(struct, field):
             # Não gosto disto, mas não arranjo outro solução :/
             if isinstance(struct, Ident):
-                structReg = f"@{struct.ident}" if struct.glob else f"%{struct.ident}{struct.shadows if struct.shadows > 0 else ''}.addr"
+                structReg = f"@{struct.ident}" if struct.glob else f"%{varName(struct.ident, struct.binding)}.addr"
             else:
                 structReg = codegen(struct, emitter, firstFieldAccessing=False, assignment=assignment) 
 
@@ -0,0 +1,158 @@
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout, redirect_stderr
+
+# Only the standard library is imported at the top of this module, the client must start fast.
+# The compiler itself is imported by the server and its workers.
+
+def defaultSocket():
+    return os.environ.get("PLUSH_SOCKET", f"/tmp/plush-{os.getuid()}.sock")
+
+def sendMessage(sock, message):
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+def recvMessage(sock):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = sock.recv(65536)
+        if not chunk:
+            return None
+        data += chunk
+    return json.loads(data)
+
+# Flags of plush that change what is built, with the argument of compileFile they set and either its
+# value or how the value that follows the flag is read. The client forwards them to the server and
+# refuses any other flag
+flagOptions = {
+    "-t": ("tree", True), "--tree": ("tree", True),
+    "--no-ssa": ("ssa", False), "--no-fold": ("fold", False), "--fold-stats": ("foldStats", True),
+    "--instrument": ("instrument", True), "--profile-generate": ("instrument", True),
+    "--ctfe-budget": ("ctfeBudget", int), "--profile-use": ("profileUse", os.path.abspath), "--codegen-jobs": ("codegenJobs", int),
+}
+compileOptions = {option for option, _ in flagOptions.values()} | {"optLevel"}
+
+def warmWorker():
+    # only the server removes its socket on SIGTERM
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    from plush import frontEnd
+    from parser import getParser
+    frontEnd()
+    getParser()
+
+def compileRequest(file, cwd, options, useCache):
+    from plush import compileFile
+    from cache import BuildCache
+
+    cache = BuildCache() if useCache else None
+    out = io.StringIO()
+    with redirect_stdout(out), redirect_stderr(out):
+        try:
+            status = compileFile(os.path.join(cwd, file), cwd, rebuildRuntime=False, cache=cache, **options)
+        # the front end reports errors by printing and calling exit
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+
+    if cache:
+        cache.flush()
+
+    return status, out.getvalue()
+
+class CompileHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = recvMessage(self.request)
+        if not request:
+            return
+        try:
+            options = {option: value for option, value in request.get("options", {}).items() if option in compileOptions}
+            status, output = self.server.pool.submit(compileRequest, request["file"], request["cwd"], options, self.server.useCache).result()
+        except Exception as e:
+            status, output = 1, f"Compile server error: {e}\n"
+        sendMessage(self.request, {"status": status, "output": output})
+
+def terminate(signum, frame):
+    raise KeyboardInterrupt
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(socketPath=None, workers=None, useCache=True):
+    from plush import buildRuntime
+
+    socketPath = socketPath or defaultSocket()
+    if buildRuntime() != 0:
+        print("Could not build c_functions.o")
+        exit(1)
+
+    if os.path.exists(socketPath):
+        os.remove(socketPath)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=warmWorker) as pool:
+        with CompileServer(socketPath, CompileHandler) as server:
+            server.pool = pool
+            server.useCache = useCache
+            print(f"Compile server listening on {socketPath}")
+            # stopping the server with kill also goes through the finally below and removes the socket
+            signal.signal(signal.SIGTERM, terminate)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.remove(socketPath)
+
+def request(file, socketPath=None, options=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socketPath or defaultSocket())
+        sendMessage(sock, {"file": file, "cwd": os.getcwd(), "options": options or {}})
+        response = recvMessage(sock)
+
+    if not response:
+        print("Compile server closed the connection")
+        return 1
+
+    print(response["output"], end="")
+    return response["status"]
+
+usage = "usage: daemon.py [--socket PATH] [-t] [-O LEVEL] [--no-ssa] [--no-fold] [--fold-stats] [--instrument] [--ctfe-budget N] [--profile-use FILE] [--codegen-jobs N] file.pl"
+
+# Thin client: python daemon.py [--socket PATH] [flags of plush that change the build] file.pl
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    socketPath = None
+    # the server reads the defaults of its own environment, the ones of the client are sent
+    options = {"optLevel": int(os.environ.get("PLUSH_OPT_LEVEL", 0))}
+    if "PLUSH_CTFE_BUDGET" in os.environ:
+        options["ctfeBudget"] = int(os.environ["PLUSH_CTFE_BUDGET"])
+    file = None
+    while args:
+        arg = args.pop(0)
+        flag, _, value = arg.partition("=")
+        if arg == "--socket":
+            socketPath = args.pop(0)
+        elif arg.startswith("-O"):
+            options["optLevel"] = int(arg[2:] or args.pop(0))
+        elif flag in flagOptions:
+            option, read = flagOptions[flag]
+            options[option] = read(value or args.pop(0)) if callable(read) else read
+        elif arg.startswith("-"):
+            print(f"Unknown option {arg} for the compile server")
+            print(usage)
+            exit(2)
+        else:
+            file = arg
+
+    if not file:
+        print(usage)
+        exit(2)
+
+    try:
+        exit(request(file, socketPath, options))
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("No compile server running, start one with 'plush --serve'")
+        exit(1)
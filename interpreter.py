@@ -1,28 +1,35 @@
-from parser import Node, Program, FunctionDeclaration, GlobalVariableDefinition, FunctionDefinition, CodeBlock, Assignment, While, If, VariableDefinition, FunctionCall, Binary, Unary, Ident, Literal, StructInit
-from parser import Type, TypeEnum, VarType, BinaryOp, UnaryOp
-
-class Context:
-    def __init__(self):
-        self.environment = [{}]
-        self.funDefs = {}
+import ctypes
+import gc
+from array import array
+import math
+import operator
+import struct
 
-    def newScope(self):
-        self.environment.append({})
+try:
+    import numpy
+    # overflows give inf or wrap around like in c, they are not errors
+    numpy.seterr(all="ignore")
+except ImportError:
+    numpy = None
 
-    def popScope(self):
-        self.environment.pop()
+from parser import Node, Program, FunctionDeclaration, StructDeclaration, GlobalVariableDefinition, FunctionDefinition, CodeBlock, Assignment, While, If, VariableDefinition, FunctionCall, Binary, Unary, Ident, Literal, StructInit, Variable, ArrayIndexing, FieldAccessing
+from parser import Type, TypeEnum, VarType, BinaryOp, UnaryOp
+from resolver import resolve
 
-    def addVal(self, ident, val):
-        for scope in self.environment[::-1]:
-            if ident in scope:
-                scope[ident] = val
-                return
-        self.environment[-1][ident]= val
+# Plush calls do not use the python stack, so recursion can go as deep as this
+defaultMaxCallDepth = 200_000
 
-    def getVal(self, ident):
-        for scope in self.environment[::-1]:
-            if ident in scope:
-                return scope[ident]
+class Context:
+    def __init__(self, budget=None, argv=None, maxCallDepth=None):
+        # bindings are found by the (depth, slot) given by the resolver: depth 0 are the globals,
+        # depth 1 the flat frame of the function that is running
+        self.globals = []
+        self.frame = []
+        self.funDefs = {}
+        self.budget = budget
+        self.steps = 0
+        self.argv = argv or []
+        self.maxCallDepth = maxCallDepth or defaultMaxCallDepth
 
     def addFunDef(self, ident, functionHeader, codeBlock):
         self.funDefs[ident] = (functionHeader, codeBlock)
@@ -30,139 +37,556 @@ class Context:
     def getFunDef(self, ident):
         return self.funDefs.get(ident, None)
 
+    # Loop iterations and calls are counted so compile-time evaluation cannot hang the compiler
+    def step(self, node):
+        self.steps += 1
+        if self.budget is not None and self.steps > self.budget:
+            print(f"Compile-time evaluation exceeded the budget of {self.budget} steps. On line {node.lineno}")
+            exit(3)
+
+# Struct values are lists of their fields in declaration order, copied on assignment like in the compiled code
+class Struct(list):
+    pass
+
+def copy(val):
+    return Struct(copy(field) for field in val) if isinstance(val, Struct) else val
+
+def wrap(val):
+    return (val + 2**31) % 2**32 - 2**31
+
+# Float literals reach llvm truncated to single precision (see float_to_hex in codegen)
+def truncFloat(val):
+    bits = struct.unpack('>Q', struct.pack('>d', val))[0] & 0xffffffffe0000000
+    return struct.unpack('>d', bits.to_bytes(8, "big"))[0]
+
+def roundFloat(val):
+    return ctypes.c_float(val).value
+
+# Errors of the running program that are undefined in the native build, reported by every engine
+class PlushRuntimeError(Exception):
+    pass
+
+# Indexing outside of an array or into one that was never allocated. Every engine checks the index
+# before the access, python would take a negative one from the end of the array
+def inBounds(arr, index):
+    return arr is not None and 0 <= index < len(arr)
+
+def indexError(arr, index):
+    if arr is None:
+        return PlushRuntimeError("indexing an array that was not allocated")
+    return PlushRuntimeError(f"index {index} is out of bounds of an array of {len(arr)} elements")
+
+def load(arr, index):
+    if not inBounds(arr, index):
+        raise indexError(arr, index)
+    return arr[index]
+
+def store(arr, index, val):
+    if not inBounds(arr, index):
+        raise indexError(arr, index)
+    arr[index] = val
+
+# Integer division by zero and INT_MIN / -1 raise PlushRuntimeError, they are undefined in llvm
+def arith(op, type, l, r):
+    if type == TypeEnum.INT:
+        match op:
+            case BinaryOp.MULT:
+                return wrap(l * r)
+            case BinaryOp.DIV | BinaryOp.REM:
+                if r == 0:
+                    raise PlushRuntimeError("integer division by zero")
+                if l == -2**31 and r == -1:
+                    raise PlushRuntimeError("integer division overflow")
+                q = abs(l) // abs(r)
+                q = q if (l < 0) == (r < 0) else -q
+                return q if op == BinaryOp.DIV else l - r * q
+            case BinaryOp.PLUS:
+                return wrap(l + r)
+            case BinaryOp.MINUS:
+                return wrap(l - r)
+
+    match op:
+        case BinaryOp.MULT:
+            return roundFloat(l * r)
+        case BinaryOp.DIV:
+            if r == 0:
+                return math.nan if l == 0 or math.isnan(l) else math.copysign(math.inf, l) * math.copysign(1, r)
+            return roundFloat(l / r)
+        case BinaryOp.REM:
+            if r == 0 or math.isinf(l):
+                return math.nan
+            return roundFloat(math.fmod(l, r))
+        case BinaryOp.PLUS:
+            return roundFloat(l + r)
+        case BinaryOp.MINUS:
+            return roundFloat(l - r)
+
+# Float comparisons are unordered, they are true when an operand is nan
+def compare(op, l, r):
+    if isinstance(l, float) and (math.isnan(l) or math.isnan(r)):
+        return True
+    match op:
+        case BinaryOp.LT:
+            return l < r
+        case BinaryOp.LTE:
+            return l <= r
+        case BinaryOp.GT:
+            return l > r
+        case BinaryOp.GTE:
+            return l >= r
+        case BinaryOp.EQ:
+            return l == r
+        case BinaryOp.NEQ:
+            return l != r
+
+def defaultValue(type):
+    if type.listDepth > 0 or type.type == TypeEnum.STR:
+        return None
+    match type.type:
+        case TypeEnum.INT:
+            return 0
+        case TypeEnum.FLT:
+            return 0.0
+        case TypeEnum.BOOL:
+            return False
+        case TypeEnum.CHA:
+            return "\0"
+
+# Arrays are stored like the ones of c_functions.c: ints are 32 bit, floats single precision, bools and
+# chars a byte each. Arrays of pointers (strings and arrays) are lists of None until they are assigned
+class CharArray:
+    def __init__(self, size):
+        self.data = bytearray(size)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.data[index].decode("latin-1")
+        return chr(self.data[index])
+
+    def __setitem__(self, index, val):
+        self.data[index] = ord(val) & 0xff
+
+def copyIntArray(dest, src, size):
+    dest[:size] = src[:size]
+
+# The bulk array functions of c_functions.c. With numpy they run vectorized on the memory of the arrays,
+# without it in python, and both give the results of the c loops: ints wrap around, floats are added
+# in order in single precision and the extremes are the first smallest or largest element
+def elements(arr, size):
+    if arr is None:
+        raise PlushRuntimeError("array that was not allocated given to a builtin")
+    if size > len(arr):
+        raise PlushRuntimeError(f"size {size} is larger than the array of {len(arr)} elements")
+    size = max(size, 0)
+    if numpy:
+        return numpy.frombuffer(arr, numpy.int32 if arr.typecode == "i" else numpy.float32, size)
+    return arr[:size]
+
+# Running sums in single precision like the c loops, which start from 0.0 and so turn a first -0.0 into 0.0
+def runningSums(elems):
+    elems[0] += numpy.float32(0.0)
+    return numpy.add.accumulate(elems, out=elems)
+
+def fillArray(arr, size, val):
+    elems = elements(arr, size)
+    if numpy:
+        elems[:] = val
+    else:
+        arr[:len(elems)] = array(arr.typecode, [val]) * len(elems)
+
+def copyArray(dest, src, size):
+    elems = elements(src, size)
+    out = elements(dest, size)
+    if numpy:
+        out[:] = elems
+    else:
+        dest[:len(out)] = elems
+
+def zipArrays(dest, a, b, size, op, ufunc):
+    x, y = elements(a, size), elements(b, size)
+    out = elements(dest, size)
+    if numpy:
+        ufunc(x, y, out=out)
+    elif dest.typecode == "i":
+        dest[:len(out)] = array("i", [wrap(op(l, r)) for l, r in zip(x, y)])
+    else:
+        dest[:len(out)] = array("f", [op(l, r) for l, r in zip(x, y)])
+
+def sumArray(arr, size):
+    elems = elements(arr, size)
+    if arr.typecode == "i":
+        return wrap(int(elems.sum(dtype=numpy.int64)) if numpy else sum(elems))
+    if numpy:
+        return float(runningSums(elems.copy())[-1]) if len(elems) else 0.0
+    res = 0.0
+    for val in elems:
+        res = roundFloat(res + val)
+    return res
+
+def extremeArray(arr, size, less):
+    elems = elements(arr, size)
+    if not len(elems):
+        return 0 if arr.typecode == "i" else 0.0
+    if numpy:
+        if arr.typecode == "i":
+            return int(elems.min() if less else elems.max())
+        if math.isnan(elems[0]):
+            return float(elems[0])
+        res = numpy.fmin.reduce(elems) if less else numpy.fmax.reduce(elems)
+        return float(elems[(elems == res).argmax()])
+    res = elems[0]
+    for val in elems[1:]:
+        if (val < res) if less else (val > res):
+            res = val
+    return res
+
+def dotArrays(a, b, size):
+    x, y = elements(a, size), elements(b, size)
+    if a.typecode == "i":
+        return wrap(int((x.astype(numpy.int64) * y).sum()) if numpy else sum(l * r for l, r in zip(x, y)))
+    if numpy:
+        return float(runningSums(x * y)[-1]) if len(x) else 0.0
+    res = 0.0
+    for l, r in zip(x, y):
+        res = roundFloat(res + roundFloat(l * r))
+    return res
+
+def prefixSumArray(arr, size):
+    elems = elements(arr, size)
+    if not numpy:
+        res = 0 if arr.typecode == "i" else 0.0
+        for i, val in enumerate(elems):
+            res = wrap(res + val) if arr.typecode == "i" else roundFloat(res + val)
+            arr[i] = res
+    elif arr.typecode == "i":
+        numpy.add.accumulate(elems, out=elems)
+    elif len(elems):
+        runningSums(elems)
+
+# Floats sort by their bits made into an int that orders them like sort_float_array
+def floatKey(val):
+    bits = struct.unpack("<i", struct.pack("<f", val))[0]
+    return bits ^ ((bits >> 31) & 0x7fffffff)
+
+def sortArray(arr, size):
+    elems = elements(arr, size)
+    if numpy and arr.typecode == "i":
+        elems.sort()
+    elif numpy:
+        keys = elems.view(numpy.int32)
+        keys ^= (keys >> 31) & 0x7fffffff
+        keys.sort()
+        keys ^= (keys >> 31) & 0x7fffffff
+    else:
+        arr[:len(elems)] = array(arr.typecode, sorted(elems, key=floatKey if arr.typecode == "f" else None))
+
+def printArray(arr, size, format):
+    print("[" + ", ".join(format(val) for val in arr[:size]) + "]")
+
+def formatBool(b):
+    return "true" if b else "false"
+
+# The functions of c_functions.c
+builtins = {
+    "print_int": lambda n: print(n),
+    "print_float": lambda f: print(f"{f:f}"),
+    "print_bool": lambda b: print(formatBool(b)),
+    "print_str": lambda s: print(f"\"{s}\""),
+    "print_char": lambda c: print(f"'{c}\n'", end=""),
+    "print_int_array": lambda arr, size: printArray(arr, size, str),
+    "print_float_array": lambda arr, size: printArray(arr, size, lambda f: f"{f:f}"),
+    "print_str_array": lambda arr, size: printArray(arr, size, lambda s: f"\"{s}\""),
+    "print_char_array": lambda arr, size: printArray(arr, size, lambda c: f"'{c}'"),
+    "print_bool_array": lambda arr, size: printArray(arr, size, formatBool),
+    "int_array": lambda size: array("i", [0]) * size,
+    "float_array": lambda size: array("f", [0.0]) * size,
+    "str_array": lambda size: [None] * size,
+    "char_array": CharArray,
+    "bool_array": lambda size: array("B", [0]) * size,
+    "int_array_array": lambda size: [None] * size,
+    "copy_int_array": copyIntArray,
+    "pow_int": lambda b, e: wrap(int(math.pow(b, e))),
+    "fill_int_array": fillArray,
+    "fill_float_array": fillArray,
+    "copy_float_array": copyArray,
+    "add_int_arrays": lambda dest, a, b, size: zipArrays(dest, a, b, size, operator.add, numpy and numpy.add),
+    "add_float_arrays": lambda dest, a, b, size: zipArrays(dest, a, b, size, operator.add, numpy and numpy.add),
+    "mul_int_arrays": lambda dest, a, b, size: zipArrays(dest, a, b, size, operator.mul, numpy and numpy.multiply),
+    "mul_float_arrays": lambda dest, a, b, size: zipArrays(dest, a, b, size, operator.mul, numpy and numpy.multiply),
+    "sum_int_array": sumArray,
+    "sum_float_array": sumArray,
+    "min_int_array": lambda arr, size: extremeArray(arr, size, True),
+    "max_int_array": lambda arr, size: extremeArray(arr, size, False),
+    "min_float_array": lambda arr, size: extremeArray(arr, size, True),
+    "max_float_array": lambda arr, size: extremeArray(arr, size, False),
+    "dot_int_arrays": dotArrays,
+    "dot_float_arrays": dotArrays,
+    "prefix_sum_int_array": prefixSumArray,
+    "prefix_sum_float_array": prefixSumArray,
+    "sort_int_array": sortArray,
+    "sort_float_array": sortArray,
+}
+
+# Builtins without side effects outside of their arguments, calls to them can be evaluated at compile time
+pureBuiltins = {"int_array", "float_array", "str_array", "char_array", "bool_array", "int_array_array", "copy_int_array", "pow_int",
+    "fill_int_array", "fill_float_array", "copy_float_array", "add_int_arrays", "add_float_arrays", "mul_int_arrays", "mul_float_arrays",
+    "sum_int_array", "sum_float_array", "min_int_array", "max_int_array", "min_float_array", "max_float_array", "dot_int_arrays",
+    "dot_float_arrays", "prefix_sum_int_array", "prefix_sum_float_array", "sort_int_array", "sort_float_array"}
+
+def assign(lhs, val, ctx: Context):
+    match lhs:
+        case Variable(Ident() as ident):
+            (ctx.frame if ident.depth else ctx.globals)[ident.slot] = val
+
+        case ArrayIndexing(array, index):
+            store(eval(array, ctx), eval(index, ctx), val)
+
+        case FieldAccessing(struct, field):
+            eval(struct, ctx)[field.index] = val
+
+def binary(op, type, l, r):
+    if op in [BinaryOp.MULT, BinaryOp.DIV, BinaryOp.REM, BinaryOp.PLUS, BinaryOp.MINUS]:
+        return arith(op, type, l, r)
+    return compare(op, l, r)
+
+def unary(op, val):
+    match op:
+        case UnaryOp.NEGATION:
+            return wrap(-val) if isinstance(val, int) else -val
+        case UnaryOp.NOT:
+            return not val
+
+# Calls of plush functions run on an explicit stack instead of the python stack. Function bodies
+# that call other functions run as generators of execute, which yield every call they make and are
+# sent its result back; bodies that do not call any are evaluated directly
+def call(funDef, argVals, ctx: Context):
+    stack = []
+    gen = None
+    while True:
+        if funDef:
+            if len(stack) >= ctx.maxCallDepth:
+                raise RecursionError(f"maximum call depth of {ctx.maxCallDepth} exceeded")
+            functionHeader, codeBlock = funDef
+
+            # functions only see the globals and their own frame
+            frame = [None] * functionHeader.frameSize
+            frame[0] = defaultValue(functionHeader.retType)
+            frame[1:len(argVals) + 1] = argVals
+
+            if codeBlock.suspends:
+                stack.append((gen, ctx.frame))
+                ctx.frame = frame
+                gen = execute(codeBlock, ctx)
+                res = None
+            else:
+                caller = ctx.frame
+                ctx.frame = frame
+                eval(codeBlock, ctx)
+                ctx.frame = caller
+                res = frame[0]
+                if not gen:
+                    return res
+
+        try:
+            funDef, argVals = gen.send(res)
+        except StopIteration:
+            res = ctx.frame[0]
+            gen, ctx.frame = stack.pop()
+            if not gen:
+                return res
+            funDef = None
+
+# Evaluates a node that calls plush functions, see call
+def execute(node, ctx: Context):
+    match node:
+        case CodeBlock(statements):
+            for stmt in statements[::-1]:
+                if stmt.suspends:
+                    yield from execute(stmt, ctx)
+                else:
+                    eval(stmt, ctx)
+
+        case Assignment(lhs, rhs):
+            val = copy((yield from execute(rhs, ctx)) if rhs.suspends else eval(rhs, ctx))
+            match lhs:
+                case ArrayIndexing(array, index) if lhs.suspends:
+                    arr = (yield from execute(array, ctx)) if array.suspends else eval(array, ctx)
+                    store(arr, (yield from execute(index, ctx)) if index.suspends else eval(index, ctx), val)
+                case FieldAccessing(struct, field) if lhs.suspends:
+                    (yield from execute(struct, ctx))[field.index] = val
+                case _:
+                    assign(lhs, val, ctx)
+
+        case While(guard, codeBlock):
+            while (yield from execute(guard, ctx)) if guard.suspends else eval(guard, ctx):
+                ctx.step(node)
+                if codeBlock.suspends:
+                    yield from execute(codeBlock, ctx)
+                else:
+                    eval(codeBlock, ctx)
+
+        case If(condition, thenBlock, elseBlock):
+            if (yield from execute(condition, ctx)) if condition.suspends else eval(condition, ctx):
+                block = thenBlock
+            else:
+                block = elseBlock
+            # the statements of the block run here, saving a generator per level of nesting
+            if block and block.suspends:
+                for stmt in block.statements[::-1]:
+                    if stmt.suspends:
+                        yield from execute(stmt, ctx)
+                    else:
+                        eval(stmt, ctx)
+            elif block:
+                eval(block, ctx)
+
+        case VariableDefinition(varType, ident, type, rhs):
+            ctx.frame[node.slot] = copy((yield from execute(rhs, ctx)) if rhs.suspends else eval(rhs, ctx))
+
+        case FunctionCall(ident, args):
+            argVals = []
+            for arg in args[::-1]:
+                argVals.append(copy((yield from execute(arg, ctx)) if arg.suspends else eval(arg, ctx)))
+
+            funDef = ctx.getFunDef(ident)
+            if not funDef:
+                if ident not in builtins:
+                    print(f"Dont recognonize function {ident}")
+                    exit(4)
+                return builtins[ident](*argVals)
+
+            ctx.step(node)
+            return (yield funDef, argVals)
+
+        case StructInit(ident, initFields):
+            fields = []
+            for initField in initFields[::-1]:
+                fields.append((yield from execute(initField, ctx)) if initField.suspends else eval(initField, ctx))
+            return Struct(fields)
+
+        case Binary(BinaryOp.AND, left, right):
+            return ((yield from execute(left, ctx)) if left.suspends else eval(left, ctx)) \
+                and ((yield from execute(right, ctx)) if right.suspends else eval(right, ctx))
+
+        case Binary(BinaryOp.OR, left, right):
+            return ((yield from execute(left, ctx)) if left.suspends else eval(left, ctx)) \
+                or ((yield from execute(right, ctx)) if right.suspends else eval(right, ctx))
+
+        case Binary(op, left, right):
+            l = (yield from execute(left, ctx)) if left.suspends else eval(left, ctx)
+            r = (yield from execute(right, ctx)) if right.suspends else eval(right, ctx)
+            return binary(op, left.exprType.type, l, r)
+
+        case Unary(op, expression):
+            return unary(op, (yield from execute(expression, ctx)))
+
+        case ArrayIndexing(array, index):
+            arr = (yield from execute(array, ctx)) if array.suspends else eval(array, ctx)
+            return load(arr, (yield from execute(index, ctx)) if index.suspends else eval(index, ctx))
+
+        case FieldAccessing(struct, field):
+            return (yield from execute(struct, ctx))[field.index]
+
 def eval(node, ctx: Context):
     match node:
         case Program(decs, defs):
+            ctx.globals = [None] * resolve(node)
             [eval(dec, ctx) for dec in decs[::-1]]
-            [eval(def_, ctx) for def_ in defs[::-1]]
+            [eval(def_, ctx) for def_ in defs[::-1] if isinstance(def_, FunctionDefinition)]
+            [eval(def_, ctx) for def_ in defs[::-1] if not isinstance(def_, FunctionDefinition)]
+            main = ctx.getFunDef("main")
+            if main:
+                # main gets argc and argv in its first arguments, like the native binary
+                call(main, [len(ctx.argv), ctx.argv][:len(main[0].args)], ctx)
 
         case FunctionDeclaration(ident, args, retType):
             pass
 
+        case StructDeclaration(ident, fields):
+            pass
+
         case GlobalVariableDefinition(varType, ident, type, rhs):
-            ctx.addVal(ident, eval(rhs, ctx))
+            ctx.globals[node.slot] = eval(rhs, ctx)
 
         case FunctionDefinition(functionHeader, codeBlock):
-            if functionHeader.ident == "main":
-                eval(codeBlock, ctx)
-            else:
-                ctx.addFunDef(functionHeader.ident, functionHeader, codeBlock)
+            ctx.addFunDef(functionHeader.ident, functionHeader, codeBlock)
 
         case CodeBlock(statements):
-            ctx.newScope()
             [eval(stmt, ctx) for stmt in statements[::-1]]
-            ctx.popScope()
 
-        case Assignment(ident, indexing, rhs):
-            rhsVal = eval(rhs, ctx)
-            if indexing:
-                index = eval(indexing, ctx)
-                ctx.getVal(ident)[index] = rhsVal
-            else:
-                ctx.addVal(ident, rhsVal)
+        case Assignment(lhs, rhs):
+            assign(lhs, copy(eval(rhs, ctx)), ctx)
 
         case While(guard, codeBlock):
             while eval(guard, ctx):
+                ctx.step(node)
                 eval(codeBlock, ctx)
 
         case If(condition, thenBlock, elseBlock):
             if eval(condition, ctx):
                 eval(thenBlock, ctx)
-            else:
+            elif elseBlock:
                 eval(elseBlock, ctx)
 
         case VariableDefinition(varType, ident, type, rhs):
-            ctx.addVal(ident, eval(rhs, ctx))
+            ctx.frame[node.slot] = copy(eval(rhs, ctx))
 
         case FunctionCall(ident, args):
+            argVals = [copy(eval(arg, ctx)) for arg in args[::-1]]
+
             funDef = ctx.getFunDef(ident)
             if not funDef:
+                if ident not in builtins:
+                    print(f"Dont recognonize function {ident}")
+                    exit(4)
+                return builtins[ident](*argVals)
 
-                res = None
-                match ident:
-                    case "print_int":
-                        print(eval(args[0], ctx))
-                    case "print_bool":
-                        print(eval(args[0], ctx))
-                    case "print_int_array":
-                        print(eval(args[0], ctx))
-                    case "int_array":
-                        res = eval(args[0], ctx)*[0]
-                    case "int_array_array":
-                        res = eval(args[0], ctx)*[[]]
-                    case "pow":
-                        res = eval(args[0], ctx) ** eval(args[1], ctx)
-                
-                    case _:
-                        print(f"Dont recognonize function {ident}")
-                        exit(4)
-
-                return res
-
-            functionHeader, codeBlock = funDef
-
-            ctx.newScope()
-            ctx.addVal(ident, None)
-            for (_, argIdent, _), argVal in zip(functionHeader.args, args):
-                ctx.addVal(argIdent, eval(argVal, ctx))
+            ctx.step(node)
+            return call(funDef, argVals, ctx)
 
-            eval(codeBlock, ctx)
-
-            res = ctx.getVal(ident)
-            ctx.popScope()
+        case StructInit(ident, initFields):
+            return Struct(eval(initField, ctx) for initField in initFields[::-1])
 
-            return res
+        case Binary(BinaryOp.AND, left, right):
+            return eval(left, ctx) and eval(right, ctx)
 
-        case StructInit(ident, initFields):
-            return f"{{ {', '.join([initField.exprType.llvm() + ' ' + str(eval(initField, ctx)) for initField in initFields])} }}"
+        case Binary(BinaryOp.OR, left, right):
+            return eval(left, ctx) or eval(right, ctx)
 
         case Binary(op, left, right):
             l = eval(left, ctx)
             r = eval(right, ctx)
-            match op:
-                case BinaryOp.MULT:
-                    res = l * r
-                case BinaryOp.DIV:
-                    res = l / r
-                case BinaryOp.REM:
-                    res = l % r
-                case BinaryOp.PLUS:
-                    res = l + r
-                case BinaryOp.MINUS:
-                    res = l - r
-                case BinaryOp.LT:
-                    res = l < r
-                case BinaryOp.LTE:
-                    res = l <= r
-                case BinaryOp.GT:
-                    res = l > r
-                case BinaryOp.GTE:
-                    res = l >= r
-                case BinaryOp.EQ:
-                    res = l == r
-                case BinaryOp.NEQ:
-                    res = l != r
-                case BinaryOp.AND:
-                    res = l and r
-                case BinaryOp.OR:
-                    res = l or r
-                case BinaryOp.INDEXING:
-                    res = l[r]
-
-            return res
+            if op in [BinaryOp.MULT, BinaryOp.DIV, BinaryOp.REM, BinaryOp.PLUS, BinaryOp.MINUS]:
+                return arith(op, left.exprType.type, l, r)
+            return compare(op, l, r)
 
         case Unary(op, expression):
-            val = eval(expression, ctx)
-            match op:
-                case UnaryOp.NEGATION:
-                    res = -val
-                case UnaryOp.NOT:
-                    res = not val
+            return unary(op, eval(expression, ctx))
 
-            return res
+        case Variable(ident):
+            return eval(ident, ctx)
+
+        case ArrayIndexing(array, index):
+            return load(eval(array, ctx), eval(index, ctx))
+
+        case FieldAccessing(struct, field):
+            return eval(struct, ctx)[field.index]
 
         case Ident(ident):
-            return ctx.getVal(ident)
+            return ctx.frame[node.slot] if node.depth else ctx.globals[node.slot]
 
         case Literal(val, type):
-            return val
+            return truncFloat(val) if type.type == TypeEnum.FLT else val
+
+def runProgram(program: Program, argv, maxCallDepth=None):
+    # reference counting frees the values of a program, the cycle collector would only keep rescanning
+    # the generators of deep recursions
+    gc.disable()
+    try:
+        eval(program, Context(argv=argv, maxCallDepth=maxCallDepth))
+    finally:
+        gc.enable()
+    return 0
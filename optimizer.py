@@ -0,0 +1,211 @@
+import math
+
+from parser import Node, Program, FunctionDeclaration, StructDeclaration, GlobalVariableDefinition, FunctionDefinition, CodeBlock, Assignment, While, If, VariableDefinition, FunctionCall, StructInit, Binary, Unary, Ident, Literal, Field, Variable, ArrayIndexing, FieldAccessing
+from parser import Type, TypeEnum, VarType, BinaryOp, UnaryOp
+from interpreter import arith, compare, wrap, truncFloat, PlushRuntimeError
+
+def countNodes(node) -> int:
+    match node:
+        case Program(decs, defs):
+            return 1 + sum(countNodes(n) for n in decs + defs)
+        case GlobalVariableDefinition(varType, ident, type, rhs):
+            return 1 + countNodes(rhs)
+        case FunctionDefinition(functionHeader, codeBlock):
+            return 1 + countNodes(codeBlock)
+        case CodeBlock(statements):
+            return 1 + sum(countNodes(stmt) for stmt in statements)
+        case Assignment(lhs, rhs):
+            return 1 + countNodes(lhs) + countNodes(rhs)
+        case While(guard, codeBlock):
+            return 1 + countNodes(guard) + countNodes(codeBlock)
+        case If(condition, thenBlock, elseBlock):
+            return 1 + countNodes(condition) + countNodes(thenBlock) + countNodes(elseBlock)
+        case VariableDefinition(varType, ident, type, rhs):
+            return 1 + countNodes(rhs)
+        case FunctionCall(ident, args):
+            return 1 + sum(countNodes(arg) for arg in args)
+        case StructInit(ident, initFields):
+            return 1 + sum(countNodes(initField) for initField in initFields)
+        case Binary(op, left, right):
+            return 1 + countNodes(left) + countNodes(right)
+        case Unary(op, expression):
+            return 1 + countNodes(expression)
+        case Variable(ident):
+            return 1 + countNodes(ident)
+        case ArrayIndexing(array, index):
+            return 1 + countNodes(array) + countNodes(index)
+        case FieldAccessing(struct, field):
+            return 1 + countNodes(struct) + countNodes(field)
+        case Node():
+            return 1
+        case _:
+            return 0
+
+def literal(val, type, lineno):
+    lit = Literal(val, Type(type))
+    lit.exprType = Type(type)
+    lit.lineno = lineno
+    return lit
+
+def isLiteral(node, val=None):
+    return isinstance(node, Literal) and (val is None or node.val == val)
+
+# Expressions without function calls can be dropped without changing what the program does
+def isPure(node):
+    match node:
+        case FunctionCall(ident, args):
+            return False
+        case StructInit(ident, initFields):
+            return all(isPure(initField) for initField in initFields)
+        case Binary(op, left, right):
+            return isPure(left) and isPure(right)
+        case Unary(op, expression):
+            return isPure(expression)
+        case ArrayIndexing(array, index):
+            return isPure(array) and isPure(index)
+        case FieldAccessing(struct, field):
+            return isPure(struct)
+        case _:
+            return True
+
+# Results that are undefined or not finite are left for runtime
+def foldArith(op, type, l, r):
+    try:
+        val = arith(op, type, l, r)
+    except PlushRuntimeError:
+        return None
+    return val if type == TypeEnum.INT or math.isfinite(val) else None
+
+def foldBinary(node):
+    op, left, right = node.op, node.left, node.right
+    type = left.exprType.type
+
+    match op:
+        case BinaryOp.AND:
+            if isLiteral(left):
+                return right if left.val else left
+            if isLiteral(right, True):
+                return left
+            if isLiteral(right, False) and isPure(left):
+                return right
+
+        case BinaryOp.OR:
+            if isLiteral(left):
+                return left if left.val else right
+            if isLiteral(right, False):
+                return left
+            if isLiteral(right, True) and isPure(left):
+                return right
+
+        case BinaryOp.LT | BinaryOp.LTE | BinaryOp.GT | BinaryOp.GTE | BinaryOp.EQ | BinaryOp.NEQ:
+            if isLiteral(left) and isLiteral(right):
+                l, r = (left.val, right.val) if type == TypeEnum.INT else (truncFloat(left.val), truncFloat(right.val))
+                return literal(compare(op, l, r), TypeEnum.BOOL, node.lineno)
+
+        case _ if type == TypeEnum.INT:
+            if isLiteral(left) and isLiteral(right):
+                val = foldArith(op, TypeEnum.INT, left.val, right.val)
+                if val is not None:
+                    return literal(val, TypeEnum.INT, node.lineno)
+            if (op == BinaryOp.PLUS and isLiteral(left, 0)) or (op == BinaryOp.MULT and isLiteral(left, 1)):
+                return right
+            if (op in [BinaryOp.PLUS, BinaryOp.MINUS] and isLiteral(right, 0)) or (op in [BinaryOp.MULT, BinaryOp.DIV] and isLiteral(right, 1)):
+                return left
+            if op == BinaryOp.MULT and ((isLiteral(left, 0) and isPure(right)) or (isLiteral(right, 0) and isPure(left))):
+                return literal(0, TypeEnum.INT, node.lineno)
+
+        case _ if type == TypeEnum.FLT:
+            if isLiteral(left) and isLiteral(right):
+                val = foldArith(op, TypeEnum.FLT, truncFloat(left.val), truncFloat(right.val))
+                if val is not None:
+                    return literal(val, TypeEnum.FLT, node.lineno)
+            # x + 0.0 is not an identity for x = -0.0, x * 0.0 is not 0.0 for infinities and nans
+            if op == BinaryOp.MULT and isLiteral(left, 1.0):
+                return right
+            if (op in [BinaryOp.MULT, BinaryOp.DIV] and isLiteral(right, 1.0)) or (op == BinaryOp.MINUS and isLiteral(right, 0.0)):
+                return left
+
+    return node
+
+def foldUnary(node):
+    op, expression = node.op, node.expression
+    if isinstance(expression, Unary) and expression.op == op:
+        return expression.expression
+
+    if isLiteral(expression):
+        match op:
+            case UnaryOp.NEGATION if node.exprType.type == TypeEnum.INT:
+                return literal(wrap(-expression.val), TypeEnum.INT, node.lineno)
+            case UnaryOp.NEGATION:
+                return literal(-truncFloat(expression.val), TypeEnum.FLT, node.lineno)
+            case UnaryOp.NOT:
+                return literal(not expression.val, TypeEnum.BOOL, node.lineno)
+
+    return node
+
+# Folds the typed ast in place and returns the node that replaces node, None for statements that are removed
+def fold(node):
+    match node:
+        case Program(decs, defs):
+            [fold(def_) for def_ in defs]
+
+        case GlobalVariableDefinition(varType, ident, type, rhs):
+            node.rhs = fold(rhs)
+
+        case FunctionDefinition(functionHeader, codeBlock):
+            fold(codeBlock)
+
+        case CodeBlock(statements):
+            node.statements = [stmt for stmt in map(fold, statements) if stmt is not None]
+
+        case Assignment(lhs, rhs):
+            node.lhs = fold(lhs)
+            node.rhs = fold(rhs)
+
+        case While(guard, codeBlock):
+            node.guard = fold(guard)
+            if isLiteral(node.guard, False):
+                return None
+            fold(codeBlock)
+
+        case If(condition, thenBlock, elseBlock):
+            node.condition = fold(condition)
+            if isLiteral(node.condition):
+                block = thenBlock if node.condition.val else elseBlock
+                return fold(block) if block else None
+            fold(thenBlock)
+            if elseBlock:
+                fold(elseBlock)
+
+        case VariableDefinition(varType, ident, type, rhs):
+            node.rhs = fold(rhs)
+
+        case FunctionCall(ident, args):
+            node.args = [fold(arg) for arg in args]
+
+        case StructInit(ident, initFields):
+            node.initFields = [fold(initField) for initField in initFields]
+
+        case Binary(op, left, right):
+            node.left = fold(left)
+            node.right = fold(right)
+            return foldBinary(node)
+
+        case Unary(op, expression):
+            node.expression = fold(expression)
+            return foldUnary(node)
+
+        case ArrayIndexing(array, index):
+            node.array = fold(array)
+            node.index = fold(index)
+
+        case FieldAccessing(struct, field):
+            node.struct = fold(struct)
+
+    return node
+
+# Runs the ast optimizations and returns how many nodes they removed
+def optimize(program) -> int:
+    before = countNodes(program)
+    fold(program)
+    return before - countNodes(program)
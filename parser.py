@@ -1,10 +1,11 @@
 from __future__ import annotations
+import os
 from dataclasses import dataclass
 from enum import Enum
 
 from ply import yacc
 
-from lexer import tokens
+from lexer import tokens, lexer
 
 class TypeEnum(Enum):
     INT = 0
@@ -534,7 +535,9 @@ def p_ifStatement1(p):
 
 def p_ifStatement2(p):
     "ifStatement : IF expression codeBlock ELSE codeBlock"
-    p[0] = If(p[2], p[3], p[5])
+    if_ = If(p[2], p[3], p[5])
+    if_.lineno = p.lineno(1)
+    p[0] = if_
 
 def p_wileStatement(p):
     "whileStatement : WHILE expression codeBlock"
@@ -798,7 +801,23 @@ def p_error(p):
         print(f"Syntax error at '{p.value}'. On line {p.lineno}")
     exit(2)
 
+# Parse tables are pickled per start symbol next to the bytecode cache. PLY stores a signature of
+# the grammar with the tables and rebuilds them when any rule in this file changes
+tablesDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
+parsers = {}
+
+def getParser(parserStart="start"):
+    parser = parsers.get(parserStart)
+    if not parser:
+        os.makedirs(tablesDir, exist_ok=True)
+        parser = yacc.yacc(start=parserStart, debug=False, picklefile=os.path.join(tablesDir, f"parsetab_{parserStart}.pickle"))
+        parsers[parserStart] = parser
+
+    return parser
+
 def parse(data, parserStart="start"):
-    parser = yacc.yacc(start=parserStart)
-    return parser.parse(data)
+    # Each parse gets its own lexer so line numbers start at 1 and concurrent parses dont share state
+    lex = lexer.clone()
+    lex.lineno = 1
+    return getParser(parserStart).parse(data, lexer=lex)
   
@@ -1,52 +1,310 @@
+import argparse
+import gc
+import importlib
+import json
 import sys
 import os
-from pprint import pprint
+import shutil
+import subprocess
+from contextlib import contextmanager
 
-from parser import parse, FunctionDeclaration, Type, TypeEnum
-from typeChecker import verify, Context as TypeContext
-from interpreter import eval, Context as ValueContext
-from codegen import codegen
-from pretty_print import pp_ast
+from cache import BuildCache, getCompilerVersion, getRuntimeVersion, hashParts, hashFile
+from timing import PassTimer
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        with open(sys.argv[1]) as file:
-            input = file.read()
-            ast = parse(input)
+# The front end is imported when it is first needed, a build that is fully cached never loads it
+def frontEnd():
+    global parse, FunctionDeclaration, Type, TypeEnum, verify, TypeContext, optimize, countNodes, eval, ValueContext, PlushRuntimeError, resolve, codegen, Emitter, readProfile, pp_ast
+    from parser import parse, FunctionDeclaration, Type, TypeEnum
+    from typeChecker import verify, Context as TypeContext
+    from optimizer import optimize, countNodes
+    from interpreter import eval, Context as ValueContext, PlushRuntimeError
+    from resolver import resolve
+    from codegen import codegen, Emitter, readProfile
+    from pretty_print import pp_ast
+
+# opt pipelines of each optimization level, -O0 skips opt
+optPipelines = {
+    1: "function(sroa,mem2reg,early-cse,instcombine,simplifycfg)",
+    2: "cgscc(inline),function(sroa,mem2reg,early-cse,instcombine,simplifycfg,loop(loop-rotate),gvn,loop-mssa(licm),loop(indvars,loop-deletion),instcombine,simplifycfg)",
+    3: "cgscc(inline),function(sroa,mem2reg,early-cse,instcombine,simplifycfg,loop(loop-rotate),gvn,loop-mssa(licm),loop(indvars,loop-deletion),loop-unroll,loop-vectorize,slp-vectorizer,instcombine,simplifycfg)",
+}
+defaultOptLevel = int(os.environ.get("PLUSH_OPT_LEVEL", 0))
+# steps (loop iterations and calls) allowed to evaluate each global initializer at compile time
+defaultCtfeBudget = int(os.environ.get("PLUSH_CTFE_BUDGET", 100_000))
+
+# c_functions.o is built next to the compiler so programs can be compiled from any directory
+runtimeDir = os.path.dirname(os.path.abspath(__file__))
+
+# with a timer the command is measured as the phase named phase
+def run(cmd, cwd, timer=None, phase=None):
+    if timer:
+        proc = timer.run(phase, cmd, cwd)
+    else:
+        proc = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+    if proc.stdout:
+        print(proc.stdout, end="")
+    if proc.stderr:
+        print(proc.stderr, end="", file=sys.stderr)
+    return proc.returncode
 
+def buildRuntime(timer=None):
+    return run(["make", "-s", "c_functions"], runtimeDir, timer, "make")
+
+# The AST and the lines of the module live until the front end ends and it makes almost no cyclic
+# garbage, so the collector would only scan them again and again, more often as the program grows
+@contextmanager
+def pausedCollector():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+@pausedCollector()
+def generate(source, llPath, tree=False, ssa=True, fold=True, foldStats=False, ctfeBudget=defaultCtfeBudget, instrument=False, profileUse=None, timer=None, jobs=1, stats=None):
+    frontEnd()
+    timer = timer or PassTimer()
+    with timer.phase("parse") as phase:
+        ast = parse(source)
+        phase["nodes"] = countNodes(ast)
+
+    with timer.phase("verify") as phase:
         verify(TypeContext(), ast)
-        # print("=====AST=====")
-        if len(sys.argv) > 2:
-            pp_ast(ast)
-            exit(0)
-
-        emitter = codegen(ast)
-        # print("=====Codegen=====")
-        # print("\n".join(emitter.lines))
-        # print("\n".join(emitter.decls))
-
-        outName = sys.argv[1].rsplit(".", 1)[0].rsplit("/", 1)[-1] + ".ll"
-        with open(outName, "w") as out:
-            out.write("\n".join(emitter.types))
-            out.write("\n".join(emitter.lines))
-            out.write("\n".join(emitter.decls))
-
-        os.system(f"llc -O0 {outName} -o {outName.rsplit('.', 1)[0].rsplit('/', 1)[-1]+'.s'}")  
-        os.system("make c_functions")  
-        os.system(f"gcc -g -c {outName.rsplit('.', 1)[0].rsplit('/', 1)[-1]+'.s'} -o {outName.rsplit('.', 1)[0].rsplit('/', 1)[-1]+'.o'}")
-        os.system(f"gcc -g -lm c_functions.o {outName.rsplit('.', 1)[0].rsplit('/', 1)[-1]+'.o'} -o {outName.rsplit('.', 1)[0].rsplit('/', 1)[-1]}")
+        phase["nodes"] = countNodes(ast)
+    if tree:
+        pp_ast(ast)
+        return 0
+
+    if fold:
+        with timer.phase("fold") as phase:
+            eliminated = optimize(ast)
+            phase["nodes"] = countNodes(ast)
+        if stats is not None:
+            stats["eliminated"] = eliminated
+        if foldStats:
+            print(f"Constant folding eliminated {eliminated} nodes")
+
+    profile = readProfile(profileUse) if profileUse else None
+
+    # the module is streamed while it is generated, a failed build must not leave half of it behind
+    try:
+        with timer.phase("codegen") as phase, open(llPath + ".tmp", "w") as out:
+            phase["nodes"] = countNodes(ast)
+            codegen(ast, Emitter(ssa=ssa, ctfeBudget=ctfeBudget, out=out, instrument=instrument, profile=profile, jobs=jobs))
+    except SystemExit:
+        os.remove(llPath + ".tmp")
+        raise
+    os.replace(llPath + ".tmp", llPath)
+
+    return 0
+
+# Runs build() to produce output unless the cache has an artifact for key
+def cachedStep(cache, stage, key, output, build, timer=None):
+    if cache:
+        path = cache.get(stage, key)
+        if path:
+            shutil.copy2(path, output)
+            if timer:
+                timer.cached(stage)
+            return 0
+
+    status = build()
+    if status == 0 and cache:
+        cache.put(stage, key, output)
+    return status
+
+# The nodes eliminated by folding are kept in the cache next to the .ll, so --fold-stats still reports
+# them when the .ll comes from the cache
+def cachedFoldStats(cache, llKey):
+    eliminated = cache.getData("fold", llKey)
+    if eliminated is not None:
+        print(f"Constant folding eliminated {eliminated} nodes")
+
+def compileFile(file, outDir=".", rebuildRuntime=True, tree=False, cache=None, optLevel=defaultOptLevel, ssa=True, fold=True, foldStats=False, ctfeBudget=defaultCtfeBudget, instrument=False, profileUse=None, timer=None, codegenJobs=1):
+    with open(file) as f:
+        source = f.read()
+
+    if profileUse and not os.path.isfile(profileUse):
+        print(f"Profile {profileUse} not found, run a program built with --profile-generate first")
+        return 1
+
+    if tree:
+        return generate(source, None, tree=True)
+
+    name = file.rsplit(".", 1)[0].rsplit("/", 1)[-1]
+    out = lambda ext: os.path.join(outDir, name + ext)
+    runtimeObject = os.path.join(runtimeDir, "c_functions.o")
+
+    codegenFlags = ([] if ssa else ["--no-ssa"]) + ([] if fold else ["--no-fold"]) + [f"--ctfe-budget={ctfeBudget}"] + (["--instrument"] if instrument else [])\
+        + ([f"--profile-use={hashFile(profileUse)}"] if profileUse else [])
+    optFlags = [f"-passes={optPipelines[optLevel]}"] if optLevel > 0 else []
+    llcFlags = [f"-O{optLevel}", "-relocation-model=pic"]
+    gccFlags = ["-g", f"-O{optLevel}"]
+    llcInput = f"{name}.opt.ll" if optFlags else f"{name}.ll"
+
+    foldResult = {}
+    stages = [
+        ("ll", ".ll", lambda: [source, *codegenFlags], lambda: generate(source, out(".ll"), ssa=ssa, fold=fold, foldStats=foldStats, ctfeBudget=ctfeBudget, instrument=instrument, profileUse=profileUse, timer=timer, jobs=codegenJobs, stats=foldResult)),
+        ("opt", ".opt.ll", lambda: [hashFile(out(".ll")), *optFlags], lambda: run(["opt", *optFlags, "-S", f"{name}.ll", "-o", f"{name}.opt.ll"], outDir, timer, "opt")),
+        ("s", ".s", lambda: [hashFile(os.path.join(outDir, llcInput)), *llcFlags], lambda: run(["llc", *llcFlags, llcInput, "-o", f"{name}.s"], outDir, timer, "llc")),
+        ("o", ".o", lambda: [hashFile(out(".s")), *gccFlags], lambda: run(["gcc", *gccFlags, "-c", f"{name}.s", "-o", f"{name}.o"], outDir, timer, "assemble")),
+        ("exe", "", lambda: [hashFile(out(".o")), hashFile(runtimeObject), *gccFlags], lambda: run(["gcc", *gccFlags, runtimeObject, f"{name}.o", "-o", name, "-lm"], outDir, timer, "link")),
+    ]
+
+    if not optFlags:
+        stages = [stage for stage in stages if stage[0] != "opt"]
+
+    if cache:
+        # unchanged source, compiler, flags and runtime go straight to the artifacts of the last build
+        version = getCompilerVersion()
+        buildKey = hashParts("build", source, version, getRuntimeVersion(), *codegenFlags, *optFlags, *llcFlags, *gccFlags)
+        manifest = cache.getData("build", buildKey)
+        if manifest:
+            keys = json.loads(manifest)
+            paths = [(ext, cache.get(stage, keys[stage])) for stage, ext, _, _ in stages]
+            if all(path for _, path in paths):
+                for ext, path in paths:
+                    shutil.copy2(path, out(ext))
+                if fold and foldStats:
+                    cachedFoldStats(cache, keys["ll"])
+                if timer:
+                    timer.cached("build")
+                return 0
+
+    if rebuildRuntime and buildRuntime(timer) != 0:
+        return 1
+
+    keys = {}
+    for stage, ext, inputs, build in stages:
+        key = hashParts(stage, version, *inputs()) if cache else None
+        if cachedStep(cache, stage, key, out(ext), build, timer) != 0:
+            return 1
+        keys[stage] = key
+        if stage == "ll" and cache and fold:
+            if "eliminated" in foldResult:
+                cache.putData("fold", key, str(foldResult["eliminated"]))
+            elif foldStats:
+                cachedFoldStats(cache, key)
+
+    if cache:
+        cache.putData("build", buildKey, json.dumps(keys))
+
+    return 0
+
+# Modules that can run a program without llc and gcc, each with a runProgram(program, argv)
+engines = {"closures": "closures", "vm": "vm", "tree": "interpreter"}
+
+def runFile(file, args, engine="closures", fold=True, maxCallDepth=None, profile=False):
+    frontEnd()
+    runProgram = importlib.import_module(engines[engine]).runProgram
+
+    with open(file) as f:
+        source = f.read()
+    ast = parse(source)
+    verify(TypeContext(), ast)
+    if fold:
+        optimize(ast)
+
+    name = file.rsplit(".", 1)[0].rsplit("/", 1)[-1]
+    argv = [f"./{name}", *args]
+    try:
+        if profile:
+            return runProfiled(ast, argv, source, name)
+        # the tree interpreter and the vm keep plush calls off the python stack
+        if engine in ["tree", "vm"]:
+            return runProgram(ast, argv, maxCallDepth=maxCallDepth)
+        return runProgram(ast, argv)
+    except (PlushRuntimeError, RecursionError) as e:
+        sys.stdout.flush()
+        print(f"Runtime error: {e}", file=sys.stderr)
+        return 1
+
+# Runs the program in the tree interpreter counting the nodes and the time of every function and line,
+# the report goes to stderr and the collapsed stacks to name.folded
+def runProfiled(ast, argv, source, name):
+    from profiler import Profile, profileProgram
+
+    profile = Profile()
+    try:
+        return profileProgram(ast, argv, profile)
+    finally:
+        sys.stdout.flush()
+        profile.report(source)
+        profile.writeCollapsed(f"{name}.folded")
+        print(f"Collapsed stacks written to {name}.folded", file=sys.stderr)
+
+def repl():
+    frontEnd()
+    while True:
+        input = sys.stdin.readline()
+        ast = parse(input, parserStart="statement")
+        typeCtx = TypeContext()
+        typeCtx.addFuncDef(FunctionDeclaration("print_int", [("val", "n", Type(TypeEnum.INT))], Type(TypeEnum.VOID)))
+        typeCtx.addFuncDef(FunctionDeclaration("print_bool", [("val", "n", Type(TypeEnum.BOOL))], Type(TypeEnum.VOID)))
+        typeCtx.addFuncDef(FunctionDeclaration("print_int_array", [("val", "arr", Type(TypeEnum.INT, 1)), ("val", "size", Type(TypeEnum.INT))], Type(TypeEnum.VOID)))
+        typeCtx.addFuncDef(FunctionDeclaration("int_array", [("val", "size", Type(TypeEnum.INT))], Type(TypeEnum.INT, 1)))
+        typeCtx.addFuncDef(FunctionDeclaration("int_array_array", [("val", "size", Type(TypeEnum.INT))], Type(TypeEnum.INT, 2)))
+        typeCtx.addFuncDef(FunctionDeclaration("pow", [("val", "b", Type(TypeEnum.INT)), ("val", "e", Type(TypeEnum.INT))], Type(TypeEnum.INT)))
+        verify(typeCtx, ast)
+        pp_ast(ast)
+        ctx = ValueContext()
+        ctx.frame = [None] * resolve(ast)
+        eval(ast, ctx)
+
+if __name__ == "__main__":
+    # plush build DIR compiles a whole directory, see batch.py
+    if sys.argv[1:2] == ["build"]:
+        from batch import main
+        exit(main(sys.argv[2:]))
+
+    argParser = argparse.ArgumentParser(prog="plush")
+    argParser.add_argument("file", nargs="?")
+    argParser.add_argument("args", nargs=argparse.REMAINDER, help="arguments of the program when it is run with --run")
+    argParser.add_argument("--run", action="store_true", help="run the program in python instead of compiling it")
+    argParser.add_argument("--engine", choices=list(engines), default="closures", help="how --run executes the program: closures (default), vm (register bytecode) or tree (the ast interpreter)")
+    argParser.add_argument("--profile", action="store_true", help="with --run, profile the program in the tree interpreter and report the time of each function and line")
+    argParser.add_argument("--max-call-depth", type=int, help="maximum depth of plush calls with --engine tree and vm, by default 200000")
+    argParser.add_argument("-t", "--tree", action="store_true", help="print the ast of the program instead of compiling it")
+    argParser.add_argument("-O", dest="optLevel", type=int, choices=[0, 1, 2, 3], default=defaultOptLevel, help="optimization level, by default $PLUSH_OPT_LEVEL or 0")
+    argParser.add_argument("--no-ssa", dest="ssa", action="store_false", help="keep every local in an alloca instead of building ssa form")
+    argParser.add_argument("--no-fold", dest="fold", action="store_false", help="skip constant folding of the ast")
+    argParser.add_argument("--fold-stats", action="store_true", help="print how many ast nodes constant folding eliminated")
+    argParser.add_argument("--ctfe-budget", type=int, default=defaultCtfeBudget, help="steps allowed to compute each global variable at compile time, by default $PLUSH_CTFE_BUDGET or 100000")
+    argParser.add_argument("--instrument", "--profile-generate", dest="instrument", action="store_true", help="count the calls and cycles of every function and the times every branch is taken, the binary writes them to $PLUSH_PROFILE or plush.prof at exit")
+    argParser.add_argument("--profile-use", metavar="FILE", help="add the branch weights and hot and cold functions of a profile written by a --profile-generate build")
+    argParser.add_argument("--codegen-jobs", type=int, default=1, help="worker processes that generate the functions of the program, the module is the same with any number")
+    argParser.add_argument("--time-passes", action="store_true", help="report the wall time, cumulative peak RSS and ast nodes of every phase of the build to stderr")
+    argParser.add_argument("--time-passes-json", metavar="FILE", help="write the phases of --time-passes to FILE as json")
+    argParser.add_argument("--serve", action="store_true", help="start a compile server on a unix socket")
+    argParser.add_argument("--socket", help="socket of the compile server")
+    argParser.add_argument("--workers", type=int, help="number of worker processes of the compile server")
+    argParser.add_argument("--no-cache", action="store_true", help="always rebuild every artifact")
+    argParser.add_argument("--cache-stats", action="store_true", help="print statistics of the build cache")
+    args = argParser.parse_args()
 
+    if args.cache_stats:
+        stats = BuildCache().stats()
+        print(f"Cache directory: {stats['dir']}")
+        print(f"Entries: {stats['entries']}")
+        print(f"Size: {stats['size'] / 2**20:.1f} MiB of {stats['maxSize'] / 2**20:.1f} MiB")
+        print(f"Hits: {stats['hits']}, misses: {stats['misses']}")
+    elif args.serve:
+        from daemon import serve
+        serve(args.socket, args.workers, not args.no_cache)
+    elif args.run:
+        exit(runFile(args.file, args.args, engine=args.engine, fold=args.fold, maxCallDepth=args.max_call_depth, profile=args.profile))
+    elif args.file:
+        cache = None if args.no_cache else BuildCache()
+        timer = PassTimer() if args.time_passes or args.time_passes_json else None
+        status = compileFile(args.file, tree=args.tree, cache=cache, optLevel=args.optLevel, ssa=args.ssa, fold=args.fold, foldStats=args.fold_stats, ctfeBudget=args.ctfe_budget, instrument=args.instrument, profileUse=args.profile_use, timer=timer, codegenJobs=args.codegen_jobs)
+        if args.time_passes:
+            timer.report()
+        if args.time_passes_json:
+            timer.writeJson(args.time_passes_json, args.file)
+        if cache:
+            cache.flush()
+        exit(status)
     else:
-        while True:
-            input = sys.stdin.readline()
-            ast = parse(input, parserStart="statement")
-            typeCtx = TypeContext()
-            typeCtx.addFuncDef(FunctionDeclaration("print_int", [("val", "n", Type(TypeEnum.INT))], Type(TypeEnum.VOID)))
-            typeCtx.addFuncDef(FunctionDeclaration("print_bool", [("val", "n", Type(TypeEnum.BOOL))], Type(TypeEnum.VOID)))
-            typeCtx.addFuncDef(FunctionDeclaration("print_int_array", [("val", "arr", Type(TypeEnum.INT, 1)), ("val", "size", Type(TypeEnum.INT))], Type(TypeEnum.VOID)))
-            typeCtx.addFuncDef(FunctionDeclaration("int_array", [("val", "size", Type(TypeEnum.INT))], Type(TypeEnum.INT, 1)))
-            typeCtx.addFuncDef(FunctionDeclaration("int_array_array", [("val", "size", Type(TypeEnum.INT))], Type(TypeEnum.INT, 2)))
-            typeCtx.addFuncDef(FunctionDeclaration("pow", [("val", "b", Type(TypeEnum.INT)), ("val", "e", Type(TypeEnum.INT))], Type(TypeEnum.INT)))
-            verify(typeCtx, ast)
-            pp_ast(ast)
-            eval(ast, ValueContext())
+        repl()
@@ -0,0 +1,140 @@
+import gc
+import sys
+from time import perf_counter
+
+import interpreter
+from parser import Program
+from interpreter import Context, defaultValue
+
+# Profiling of the tree interpreter. While a program is profiled interpreter.eval and interpreter.call
+# are swapped for the instrumented versions below, so a program that is not profiled runs the
+# interpreter untouched. Calls recurse on the python stack here, the explicit stack of call is not used
+
+globalsName = "(globals)"
+# Calls deeper than this are counted in a ... frame of the collapsed stacks
+maxStackDepth = 256
+
+class Profile:
+    def __init__(self):
+        # name -> [calls, nodes, self time, total time]
+        self.functions = {globalsName: [0, 0, 0.0, 0.0]}
+        # line -> [nodes, self time]
+        self.lines = {}
+        # call stacks are numbered, each one is its number in the stack of its caller and the function called
+        self.keys = {}
+        self.names = [(None, globalsName)]
+        # call stack -> self time
+        self.stacks = {}
+        self.stack = [globalsName]
+        self.stackKeys = [0]
+        self.running = {}
+        # time of the nodes evaluated inside the node being evaluated
+        self.childTimes = [0.0]
+
+    def eval(self, node, ctx):
+        self.childTimes.append(0.0)
+        start = perf_counter()
+        res = evalNode(node, ctx)
+        elapsed = perf_counter() - start
+        selfTime = elapsed - self.childTimes.pop()
+        self.childTimes[-1] += elapsed
+
+        function = self.functions[self.stack[-1]]
+        function[1] += 1
+        function[2] += selfTime
+        key = self.stackKeys[-1]
+        self.stacks[key] = self.stacks.get(key, 0.0) + selfTime
+        if node.lineno is not None:
+            line = self.lines.setdefault(node.lineno, [0, 0.0])
+            line[0] += 1
+            line[1] += selfTime
+        return res
+
+    def call(self, funDef, argVals, ctx):
+        functionHeader, codeBlock = funDef
+        name = functionHeader.ident
+        function = self.functions.setdefault(name, [0, 0, 0.0, 0.0])
+        function[0] += 1
+        self.stack.append(name)
+        self.stackKeys.append(self.stackKey(name))
+        # the time of a recursive function is counted once, in its outermost call
+        outermost = name not in self.running
+        self.running[name] = self.running.get(name, 0) + 1
+
+        frame = [None] * functionHeader.frameSize
+        frame[0] = defaultValue(functionHeader.retType)
+        frame[1:len(argVals) + 1] = argVals
+        caller = ctx.frame
+        ctx.frame = frame
+        start = perf_counter()
+        try:
+            interpreter.eval(codeBlock, ctx)
+        finally:
+            if outermost:
+                function[3] += perf_counter() - start
+            ctx.frame = caller
+            self.running[name] -= 1
+            if not self.running[name]:
+                del self.running[name]
+            self.stack.pop()
+            self.stackKeys.pop()
+        return frame[0]
+
+    def stackKey(self, name):
+        parent = self.stackKeys[-1]
+        if len(self.stackKeys) > maxStackDepth:
+            if self.names[parent][1] == "...":
+                return parent
+            name = "..."
+        key = self.keys.get((parent, name))
+        if key is None:
+            key = self.keys[(parent, name)] = len(self.names)
+            self.names.append((parent, name))
+        return key
+
+    def report(self, source, file=sys.stderr, lines=20):
+        sourceLines = source.splitlines()
+        total = sum(selfTime for _, _, selfTime, _ in self.functions.values())
+        nodes = sum(visits for _, visits, _, _ in self.functions.values())
+        print(f"Profile: {total:.3f}s in {nodes} nodes", file=file)
+        print(f"{'function':<24}{'calls':>10}{'nodes':>12}{'self':>10}{'total':>10}", file=file)
+        for name, (calls, visits, selfTime, totalTime) in sorted(self.functions.items(), key=lambda item: -item[1][2]):
+            if visits:
+                print(f"{name:<24}{calls:>10}{visits:>12}{selfTime:>9.3f}s{totalTime:>9.3f}s", file=file)
+        print(file=file)
+        print(f"{'line':>6}{'nodes':>12}{'self':>10}  source", file=file)
+        for lineno, (visits, selfTime) in sorted(self.lines.items(), key=lambda item: -item[1][1])[:lines]:
+            text = sourceLines[lineno - 1].strip() if 0 < lineno <= len(sourceLines) else ""
+            print(f"{lineno:>6}{visits:>12}{selfTime:>9.3f}s  {text}", file=file)
+
+    # One line per call stack with its self time in microseconds, the input of flamegraph.pl
+    def writeCollapsed(self, path):
+        with open(path, "w") as f:
+            for key, selfTime in self.stacks.items():
+                micros = round(selfTime * 1e6)
+                if micros:
+                    f.write(f"{self.collapsed(key)} {micros}\n")
+
+    # the functions of a call stack separated by ;, the globals are only named when no function runs
+    def collapsed(self, key):
+        names = []
+        while key:
+            key, name = self.names[key]
+            names.append(name)
+        return ";".join(names[::-1]) or globalsName
+
+evalNode = interpreter.eval
+
+def profileProgram(program: Program, argv, profile: Profile):
+    call = interpreter.call
+    interpreter.eval = profile.eval
+    interpreter.call = profile.call
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 2_000_000))
+    gc.disable()
+    try:
+        interpreter.eval(program, Context(argv=argv))
+    finally:
+        gc.enable()
+        interpreter.eval = evalNode
+        interpreter.call = call
+    return 0
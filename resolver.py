@@ -0,0 +1,127 @@
+from parser import Node, Program, FunctionDeclaration, StructDeclaration, GlobalVariableDefinition, FunctionDefinition, CodeBlock, Assignment, While, If, VariableDefinition, FunctionCall, StructInit, Binary, Unary, Ident, Literal, Field, Variable, ArrayIndexing, FieldAccessing
+
+# Gives every binding a (depth, slot): depth 0 are the globals, depth 1 the frame of the function.
+# Variables of a block reuse the slots of blocks that already ended, so a function needs a single
+# flat frame of frameSize slots, with its return variable in slot 0 and then its arguments.
+# Every statement and expression also gets suspends, whether it calls a function of the program
+
+class Context:
+    def __init__(self):
+        self.globals = {}
+        self.functions = set()
+        self.scopes = []
+        # the slots of every ident in scope, innermost last
+        self.slots = {}
+        self.size = 0
+        self.frameSize = 0
+
+    def newScope(self):
+        self.scopes.append(({}, self.size))
+
+    def popScope(self):
+        scope, self.size = self.scopes.pop()
+        for ident in scope:
+            slots = self.slots[ident]
+            slots.pop()
+            if not slots:
+                del self.slots[ident]
+
+    def define(self, ident):
+        slot = self.size
+        self.size += 1
+        self.frameSize = max(self.frameSize, self.size)
+        if ident in self.scopes[-1][0]:
+            self.slots[ident][-1] = slot
+        else:
+            self.slots.setdefault(ident, []).append(slot)
+        self.scopes[-1][0][ident] = slot
+        return slot
+
+    def getSlot(self, ident):
+        if ident in self.slots:
+            return self.slots[ident][-1]
+
+def resolveFunction(ident, args, codeBlock, ctx: Context) -> int:
+    ctx.size = ctx.frameSize = 0
+    ctx.newScope()
+    ctx.define(ident)
+    [ctx.define(argIdent) for _, argIdent, _ in args[::-1]]
+    resolveNode(codeBlock, ctx)
+    ctx.popScope()
+    return ctx.frameSize
+
+# Returns the number of globals of a program, or the frame size of a lone statement (the repl)
+def resolve(node) -> int:
+    ctx = Context()
+    match node:
+        case Program(decs, defs):
+            for def_ in defs[::-1]:
+                match def_:
+                    case GlobalVariableDefinition(varType, ident, type, rhs):
+                        def_.slot = ctx.globals[ident] = len(ctx.globals)
+                    case FunctionDefinition(functionHeader, codeBlock):
+                        ctx.functions.add(functionHeader.ident)
+            [resolveNode(def_, ctx) for def_ in defs[::-1]]
+            return len(ctx.globals)
+
+        case _:
+            ctx.newScope()
+            resolveNode(node, ctx)
+            return ctx.frameSize
+
+def resolveNode(node, ctx: Context) -> bool:
+    suspends = False
+    match node:
+        case GlobalVariableDefinition(varType, ident, type, rhs):
+            resolveNode(rhs, ctx)
+
+        case FunctionDefinition(functionHeader, codeBlock):
+            functionHeader.frameSize = resolveFunction(functionHeader.ident, functionHeader.args, codeBlock, ctx)
+
+        case CodeBlock(statements):
+            ctx.newScope()
+            suspends = any([resolveNode(stmt, ctx) for stmt in statements[::-1]])
+            ctx.popScope()
+
+        case Assignment(lhs, rhs):
+            suspends = any([resolveNode(lhs, ctx), resolveNode(rhs, ctx)])
+
+        case While(guard, codeBlock):
+            suspends = any([resolveNode(guard, ctx), resolveNode(codeBlock, ctx)])
+
+        case If(condition, thenBlock, elseBlock):
+            suspends = any([resolveNode(condition, ctx), resolveNode(thenBlock, ctx), elseBlock is not None and resolveNode(elseBlock, ctx)])
+
+        case VariableDefinition(varType, ident, type, rhs):
+            suspends = resolveNode(rhs, ctx)
+            node.slot = ctx.define(ident)
+
+        case FunctionCall(ident, args):
+            suspends = any([resolveNode(arg, ctx) for arg in args]) or ident in ctx.functions
+
+        case StructInit(ident, initFields):
+            suspends = any([resolveNode(initField, ctx) for initField in initFields])
+
+        case Binary(op, left, right):
+            suspends = any([resolveNode(left, ctx), resolveNode(right, ctx)])
+
+        case Unary(op, expression):
+            suspends = resolveNode(expression, ctx)
+
+        case Variable(ident):
+            suspends = resolveNode(ident, ctx)
+
+        case ArrayIndexing(array, index):
+            suspends = any([resolveNode(array, ctx), resolveNode(index, ctx)])
+
+        case FieldAccessing(struct, field):
+            suspends = resolveNode(struct, ctx)
+
+        case Ident(ident, glob):
+            if glob:
+                node.depth, node.slot = 0, ctx.globals[ident]
+            else:
+                node.depth, node.slot = 1, ctx.getSlot(ident)
+
+    node.suspends = suspends
+    return suspends
@@ -0,0 +1,83 @@
+function print_int(val n: int);
+function print_float(val f: float);
+function print_int_array(val arr: [int], val size: int);
+function print_float_array(val arr: [float], val size: int);
+function int_array(val size: int): [int];
+function float_array(val size: int): [float];
+function fill_int_array(val arr: [int], val size: int, val v: int);
+function fill_float_array(val arr: [float], val size: int, val v: float);
+function copy_float_array(val dest: [float], val src: [float], val size: int);
+function add_int_arrays(val dest: [int], val a: [int], val b: [int], val size: int);
+function add_float_arrays(val dest: [float], val a: [float], val b: [float], val size: int);
+function mul_int_arrays(val dest: [int], val a: [int], val b: [int], val size: int);
+function mul_float_arrays(val dest: [float], val a: [float], val b: [float], val size: int);
+function sum_int_array(val arr: [int], val size: int): int;
+function sum_float_array(val arr: [float], val size: int): float;
+function min_int_array(val arr: [int], val size: int): int;
+function max_int_array(val arr: [int], val size: int): int;
+function min_float_array(val arr: [float], val size: int): float;
+function max_float_array(val arr: [float], val size: int): float;
+function dot_int_arrays(val a: [int], val b: [int], val size: int): int;
+function dot_float_arrays(val a: [float], val b: [float], val size: int): float;
+function prefix_sum_int_array(val arr: [int], val size: int);
+function prefix_sum_float_array(val arr: [float], val size: int);
+function sort_int_array(val arr: [int], val size: int);
+function sort_float_array(val arr: [float], val size: int);
+
+function main() {
+  val n: int := 6;
+  var a: [int] := int_array(n);
+  var b: [int] := int_array(n);
+  var c: [int] := int_array(n);
+  var i: int := 0;
+  while i < n {
+    a[i] := (i * 7) % 5 - 2;
+    i := i + 1;
+  }
+  fill_int_array(b, n, 3);
+  a[5] := 2147483647;
+
+  add_int_arrays(c, a, b, n);
+  print_int_array(c, n);
+  mul_int_arrays(c, a, b, n);
+  print_int_array(c, n);
+  print_int(sum_int_array(a, n));
+  print_int(min_int_array(a, n));
+  print_int(max_int_array(a, n));
+  print_int(dot_int_arrays(a, b, n));
+  prefix_sum_int_array(a, n);
+  print_int_array(a, n);
+  sort_int_array(a, n);
+  print_int_array(a, n);
+  print_int(min_int_array(a, 0));
+
+  # 2^24 absorbs every 1.0 added after it in single precision
+  val m: int := 1000;
+  var f: [float] := float_array(m);
+  var g: [float] := float_array(m);
+  fill_float_array(f, m, 1.0);
+  f[0] := 16777216.0;
+  print_float(sum_float_array(f, m));
+  copy_float_array(g, f, m);
+  g[0] := 0.1;
+  print_float(sum_float_array(g, m));
+  print_float(dot_float_arrays(g, g, m));
+
+  var h: [float] := float_array(n);
+  h[0] := 2.5;
+  h[1] := 0.1;
+  h[2] := -3.0;
+  h[3] := 10000000000.0;
+  h[4] := 0.1;
+  h[5] := -7.25;
+  print_float(min_float_array(h, n));
+  print_float(max_float_array(h, n));
+  add_float_arrays(g, h, h, n);
+  print_float_array(g, n);
+  mul_float_arrays(g, h, h, n);
+  print_float_array(g, n);
+  prefix_sum_float_array(h, n);
+  print_float_array(h, n);
+  sort_float_array(h, n);
+  print_float_array(h, n);
+}
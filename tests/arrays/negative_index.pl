@@ -0,0 +1,10 @@
+function print_int(val n: int);
+function int_array(val n: int): [int];
+
+function main() {
+  var a: [int] := int_array(3);
+  a[2] := 7;
+  print_int(a[2]);
+  a[0 - 1] := 5;
+  print_int(a[2]);
+}
@@ -0,0 +1,13 @@
+function print_int(val n: int);
+
+function sum(val n: int): int {
+  if n = 0 {
+    sum := 0;
+  } else {
+    sum := n + sum(n - 1);
+  }
+}
+
+function main() {
+  print_int(sum(100000));
+}
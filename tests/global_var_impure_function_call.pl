@@ -0,0 +1,14 @@
+function print_int(val n: int);
+
+var counter: int := 0;
+
+function next(): int {
+  counter := counter + 1;
+  next := counter;
+}
+
+val a: int := next();
+
+function main() {
+  print_int(a);
+}
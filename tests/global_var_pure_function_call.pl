@@ -0,0 +1,33 @@
+function print_int(val n: int);
+function int_array(val size: int): [int];
+
+function fib(val n: int): int {
+  if (n < 2) {
+    fib := n;
+  } else {
+    fib := fib(n - 1) + fib(n - 2);
+  }
+}
+
+function sum_squares(val n: int): int {
+  var arr: [int] := int_array(n);
+  var i: int := 0;
+  while (i < n) {
+    arr[i] := i * i;
+    i := i + 1;
+  }
+  sum_squares := 0;
+  i := 0;
+  while (i < n) {
+    sum_squares := sum_squares + arr[i];
+    i := i + 1;
+  }
+}
+
+val a: int := fib(20);
+val b: int := sum_squares(100) + 1;
+
+function main() {
+  print_int(a);
+  print_int(b);
+}
@@ -0,0 +1,18 @@
+function print_int(val n: int);
+
+function sum_int_array(val a: [int], val n: int): int {
+  print_int(99);
+  sum_int_array := n;
+}
+
+function total(): int {
+  total := sum_int_array(int_array(3), 3);
+}
+
+function int_array(val n: int): [int];
+
+val t: int := total();
+
+function main() {
+  print_int(t);
+}
@@ -0,0 +1,24 @@
+struct Inner {
+  var values: [int],
+}
+
+struct S {
+  var n: int,
+  var inner: struct Inner,
+}
+
+function print_int(val n: int);
+function int_array(val n: int): [int];
+
+function mk(val n: int): struct S {
+  var a: [int] := int_array(n);
+  a[0] := 42;
+  mk := struct S(n, struct Inner(a));
+}
+
+val s: struct S := mk(3);
+
+function main() {
+  print_int(s.n);
+  print_int(s.inner.values[0]);
+}
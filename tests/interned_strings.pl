@@ -0,0 +1,21 @@
+function print_str(val s: string);
+
+val greeting: string := "hello";
+
+function log(val n: int) {
+  print_str("tick");
+  if (n = 0) {
+    print_str("café \ 100% \"done\"");
+  }
+}
+
+function main() {
+  var i: int := 3;
+  while (i > 0) {
+    print_str("tick");
+    i := i - 1;
+    log(i);
+  }
+  print_str(greeting);
+  print_str("hello");
+}
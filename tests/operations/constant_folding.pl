@@ -0,0 +1,29 @@
+function print_int(val n: int);
+function print_bool(val b: bool);
+function print_float(val f: float);
+
+function side(val n: int): int {
+  print_int(n);
+  side := n;
+}
+
+function main() {
+  print_int(2147483647 + 1);
+  print_int(-2147483647 - 2);
+  print_int(65536 * 65536);
+  print_int(-7 / 2);
+  print_int(-7 % 2);
+  print_int(side(1) * 0);
+  print_int(side(2) + 0);
+  print_float(0.1 + 0.2);
+  print_bool(0.1 + 0.2 = 0.3);
+  print_bool(!!(1 < 2) && true);
+  if (2 > 1) {
+    print_int(3);
+  } else {
+    print_int(4);
+  }
+  while (false) {
+    print_int(5);
+  }
+}
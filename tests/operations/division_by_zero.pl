@@ -0,0 +1,9 @@
+function print_int(val n: int);
+
+function divide(val a: int, val b: int): int {
+  divide := a / b;
+}
+
+function main(val argc: int) {
+  print_int(divide(10, argc - 1));
+}
@@ -0,0 +1,15 @@
+function print_int(val n: int);
+function print_bool(val b: bool);
+
+function side(val n: int): bool {
+  print_int(n);
+  side := true;
+}
+
+function main() {
+  print_bool(false && side(1));
+  print_bool(true && side(2));
+  print_bool(true || side(3));
+  print_bool(false || side(4));
+  print_bool(false && side(5) || side(6));
+}
@@ -0,0 +1,139 @@
+import argparse
+import difflib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Golden output tests: every program of tests/ and programs/ is compiled and run, natively and with
+# --run, and its stdout and exit code are compared with name.out and name.exit next to it (no .exit
+# means 0). A program that does not compile is expected to print the errors of the compiler and exit
+# with its status. Every engine must match the golden files, so the engines are also checked against
+# each other. python tests/run_tests.py --update writes the golden files from the native build.
+# name.<engine>.out and name.<engine>.exit replace the golden files for that engine only, for programs
+# whose behavior is undefined in the native build and reported as an error by the python engines
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+plush = os.path.join(root, "plush.py")
+engines = ["native", "closures", "vm", "tree"]
+
+def findPrograms(paths):
+    programs = []
+    for path in paths:
+        if path.endswith(".pl"):
+            programs.append(path)
+            continue
+        for dir, dirs, files in os.walk(path):
+            dirs.sort()
+            programs += [os.path.join(dir, file) for file in sorted(files) if file.endswith(".pl")]
+    return programs
+
+def goldenPaths(program, engine=None):
+    base = program.rsplit(".", 1)[0] + (f".{engine}" if engine else "")
+    return base + ".out", base + ".exit"
+
+# The golden files of the engine when it has its own, otherwise the ones of every engine
+def enginePaths(program, engine):
+    paths = goldenPaths(program, engine)
+    return paths if os.path.exists(paths[0]) else goldenPaths(program)
+
+def readGolden(program, engine):
+    outPath, exitPath = enginePaths(program, engine)
+    if not os.path.exists(outPath):
+        return None
+    with open(outPath) as f:
+        out = f.read()
+    status = 0
+    if os.path.exists(exitPath):
+        with open(exitPath) as f:
+            status = int(f.read())
+    return out, status
+
+def writeGolden(program, out, status):
+    outPath, exitPath = enginePaths(program, "native")
+    with open(outPath, "w") as f:
+        f.write(out)
+    if status:
+        with open(exitPath, "w") as f:
+            f.write(f"{status}\n")
+    elif os.path.exists(exitPath):
+        os.remove(exitPath)
+
+def execute(cmd, cwd, timeout):
+    try:
+        proc = subprocess.run(cmd, cwd=cwd, stdin=subprocess.DEVNULL, capture_output=True, text=True, errors="replace", timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return f"timed out after {timeout}s\n", "timeout"
+    return proc.stdout, proc.returncode
+
+# Output and exit code of the program in every engine, the native build runs in a directory of its own
+def runProgram(program, runEngines, cacheFlags, tmpDir, timeout):
+    name = os.path.basename(program).rsplit(".", 1)[0]
+    cwd = tempfile.mkdtemp(prefix=name + ".", dir=tmpDir)
+    program = os.path.abspath(program)
+    results = {}
+    for engine in runEngines:
+        if engine == "native":
+            out, status = execute([sys.executable, plush, *cacheFlags, program], cwd, timeout)
+            if status == 0:
+                out, status = execute([f"./{name}"], cwd, timeout)
+        else:
+            out, status = execute([sys.executable, plush, "--run", "--engine", engine, program], cwd, timeout)
+        results[engine] = (out, status)
+    return results
+
+def describe(program, engine, expected, actual):
+    lines = [f"FAIL {program} ({engine})"]
+    if expected[1] != actual[1]:
+        lines.append(f"  exit code {actual[1]}, expected {expected[1]}")
+    if expected[0] != actual[0]:
+        diff = difflib.unified_diff(expected[0].splitlines(), actual[0].splitlines(), "expected", engine, lineterm="", n=1)
+        lines += [f"  {line}" for line in list(diff)[:20]]
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("paths", nargs="*", help="programs or directories to test, by default tests/ and programs/")
+    argParser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="programs tested at a time, by default the number of cpus")
+    argParser.add_argument("--engines", nargs="+", choices=engines, default=["native", "closures"], help="engines every program runs in, by default native and closures")
+    argParser.add_argument("--update", action="store_true", help="write the golden files from the output of the native build")
+    argParser.add_argument("--timeout", type=float, default=60, help="seconds each compilation and run can take")
+    argParser.add_argument("--no-cache", action="store_true", help="compile without the build cache")
+    args = argParser.parse_args()
+
+    programs = findPrograms(args.paths or [os.path.join(root, "tests"), os.path.join(root, "programs")])
+    runEngines = ["native"] if args.update else args.engines
+    cacheFlags = ["--no-cache"] if args.no_cache else []
+
+    # c_functions.o is built once, before the compilations that link it run at the same time
+    if subprocess.run(["make", "-s", "c_functions"], cwd=root).returncode != 0:
+        print("Could not build c_functions.o")
+        exit(1)
+
+    start = time.perf_counter()
+    failures = []
+    with tempfile.TemporaryDirectory() as tmpDir, ThreadPoolExecutor(args.jobs) as pool:
+        results = pool.map(lambda program: runProgram(program, runEngines, cacheFlags, tmpDir, args.timeout), programs)
+        for program, result in zip(programs, results):
+            relative = os.path.relpath(program, root)
+            if args.update:
+                writeGolden(program, *result["native"])
+                continue
+            for engine, actual in result.items():
+                expected = readGolden(program, engine)
+                if expected is None:
+                    failures.append(f"FAIL {relative}: no golden output, run with --update")
+                    break
+                if actual != expected:
+                    failures.append(describe(relative, engine, expected, actual))
+    elapsed = time.perf_counter() - start
+
+    if args.update:
+        print(f"Golden files of {len(programs)} programs written in {elapsed:.3f}s")
+        exit(0)
+    for failure in failures:
+        print(failure)
+    print(f"{len(programs)} programs, {len(runEngines)} engines, {len(failures)} failures in {elapsed:.3f}s")
+    exit(1 if failures else 0)
@@ -0,0 +1,35 @@
+struct Point {
+  var x: int,
+  var y: int,
+}
+
+function print_int(val n: int);
+
+function pick(val c: bool): int {
+  if c {
+    var p: struct Point := struct Point(1, 2);
+    var n: int := p.x;
+    pick := n;
+  } else {
+    var p: struct Point := struct Point(3, 4);
+    var n: int := p.y;
+    pick := n;
+  }
+}
+
+function main() {
+  var x1: int := 5;
+  var x: int := 1;
+  if x > 0 {
+    var x: int := 7;
+    print_int(x1 + x);
+  }
+  while x < 3 {
+    var x1: int := x * 10;
+    x := x + 1;
+    print_int(x1);
+  }
+  print_int(x1);
+  print_int(pick(true));
+  print_int(pick(false));
+}
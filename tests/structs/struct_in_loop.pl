@@ -0,0 +1,23 @@
+struct Point {
+  var x: int,
+  var y: int,
+  var z: int,
+  var w: int,
+}
+
+function print_int(val n: int);
+
+function sum(val p: struct Point): int {
+  sum := p.x + p.y + p.z + p.w;
+}
+
+function main() {
+  var i: int := 0;
+  var total: int := 0;
+  while i < 300000 {
+    var p: struct Point := struct Point(i % 10, 1, 2, 3);
+    total := (total + p.x + sum(struct Point(1, 2, 3, i % 7))) % 1000;
+    i := i + 1;
+  }
+  print_int(total);
+}
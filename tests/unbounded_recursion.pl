@@ -0,0 +1,10 @@
+function print_int(val n: int);
+
+function down(val n: int): int {
+  down := n - down(n + 1);
+}
+
+function main() {
+  print_int(1);
+  print_int(down(0));
+}
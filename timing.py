@@ -0,0 +1,69 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Wall time, cumulative peak RSS and ast nodes of every phase of a build, reported by --time-passes.
+# Linux only keeps high-water marks: ru_maxrss of the compiler is its peak since it started, and a
+# tool run by it, read with wait4, starts from the peak of the compiler it was forked from. So the peak
+# of a single phase cannot be measured, and every phase reports the peak of the build up to its end,
+# the largest of the compiler and of the tools run so far
+
+def peakRss(usage):
+    # ru_maxrss is in kilobytes on linux
+    return usage.ru_maxrss * 1024
+
+class PassTimer:
+    def __init__(self):
+        self.phases = []
+        self.peak = 0
+
+    def cumulativePeak(self, usage):
+        self.peak = max(self.peak, peakRss(usage))
+        return self.peak
+
+    @contextmanager
+    def phase(self, name):
+        record = {"phase": name, "wall": 0.0, "cumulativePeakRss": 0, "nodes": None, "cached": False}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["wall"] = time.perf_counter() - start
+            record["cumulativePeakRss"] = self.cumulativePeak(resource.getrusage(resource.RUSAGE_SELF))
+            self.phases.append(record)
+
+    # subprocess.run reaps the child itself, so its resource usage is lost. The output goes to
+    # temporary files instead of pipes so waiting cannot block on a full pipe
+    def run(self, name, cmd, cwd):
+        with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+            start = time.perf_counter()
+            proc = subprocess.Popen(cmd, cwd=cwd, stdout=stdout, stderr=stderr)
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            self.phases.append({"phase": name, "wall": time.perf_counter() - start, "cumulativePeakRss": self.cumulativePeak(usage), "nodes": None, "cached": False})
+            stdout.seek(0)
+            stderr.seek(0)
+            return subprocess.CompletedProcess(cmd, proc.returncode, stdout.read().decode(), stderr.read().decode())
+
+    def cached(self, name):
+        self.phases.append({"phase": name, "wall": 0.0, "cumulativePeakRss": 0, "nodes": None, "cached": True})
+
+    def report(self, file=sys.stderr):
+        print(f"{'phase':<12}{'wall':>10}{'cum. peak RSS':>18}{'nodes':>10}", file=file)
+        for phase in self.phases:
+            if phase["cached"]:
+                print(f"{phase['phase']:<12}{'cached':>10}", file=file)
+                continue
+            nodes = "-" if phase["nodes"] is None else phase["nodes"]
+            print(f"{phase['phase']:<12}{phase['wall']:>9.3f}s{phase['cumulativePeakRss'] / 2**20:>14.1f} MiB{nodes:>10}", file=file)
+        print(f"{'total':<12}{sum(phase['wall'] for phase in self.phases):>9.3f}s", file=file)
+
+    def writeJson(self, path, file):
+        with open(path, "w") as f:
+            json.dump({"file": file, "total": sum(phase["wall"] for phase in self.phases), "phases": self.phases}, f, indent=2)
+            f.write("\n")
@@ -1,50 +1,71 @@
 from parser import Node, Expression, Program, FunctionDeclaration, StructDeclaration, GlobalVariableDefinition, FunctionDefinition, CodeBlock, Assignment, While, If, VariableDefinition, FunctionCall, StructInit, Binary, Unary, Ident, Literal, Field, Variable, ArrayIndexing, FieldAccessing
 from parser import Type, TypeEnum, VarType, BinaryOp, UnaryOp
+from interpreter import pureBuiltins
 
 class Context:
     def __init__(self):
         self.stack = [{}]
+        # the depths of the scopes that define each ident, innermost last, so lookups dont walk the stack
+        self.depths = {}
         self.funcDefs = {}
         self.structDefs = {}
+        self.function = None
+        # every binding of a function gets a number of its own, so bindings with the same name and
+        # shadows in sibling blocks still get different names in the llvm ir
+        self.bindings = 0
+        self.bodies = set()
+        self.calls = {}
+        self.impure = set()
+        self.pure = set()
 
     def add(self, ident, type, varType):
-        self.stack[-1][ident] = (type, varType)
+        if ident not in self.stack[-1]:
+            self.depths.setdefault(ident, []).append(len(self.stack) - 1)
+        self.stack[-1][ident] = (type, varType, self.bindings)
+        self.bindings += 1
+        return self.bindings - 1
 
     def remove(self, ident):
         self.stack[-1].pop(ident)
+        self.forget(ident)
+
+    def forget(self, ident):
+        depths = self.depths[ident]
+        depths.pop()
+        if not depths:
+            del self.depths[ident]
 
     def newScope(self):
         self.stack.append({})
 
     def popScope(self):
-        self.stack.pop()
+        for ident in self.stack.pop():
+            self.forget(ident)
 
     def getType(self, ident):
-        for scope in self.stack[::-1]:
-            if ident in scope:
-                return scope[ident][0] 
+        if ident in self.depths:
+            return self.stack[self.depths[ident][-1]][ident][0]
 
         return None
 
     def getVarType(self, ident):
-        for scope in self.stack[::-1]:
-            if ident in scope:
-                return scope[ident][1] 
+        if ident in self.depths:
+            return self.stack[self.depths[ident][-1]][ident][1]
+
+        return None
+
+    def getBinding(self, ident):
+        if ident in self.depths:
+            return self.stack[self.depths[ident][-1]][ident][2]
 
         return None
 
     def isGlobalVar(self, ident):
-        for i, scope in enumerate(self.stack[::-1]):
-            if ident in scope:
-                return len(self.stack) - i == 1
+        if ident in self.depths:
+            return self.depths[ident][-1] == 0
 
     def getShadows(self, ident):
-        count = 0
-        for scope in self.stack:
-            if ident in scope:
-                count += 1
-
-        return count - 1
+        return len(self.depths.get(ident, [])) - 1
 
     def definedCurrentScope(self, ident):
         return ident in self.stack[-1]
@@ -67,20 +88,48 @@ class Context:
     def getStructFields(self, ident):
         return self.structDefs.get(ident, None)
 
+    # A function is pure if it does not use global variables and only calls pure functions
+    def computePurity(self):
+        pure = {ident for ident in self.bodies if ident not in self.impure}
+        changed = True
+        while changed:
+            changed = False
+            for ident in list(pure):
+                # a function of the program with the name of a builtin replaces it
+                if any(callee not in pure and (callee not in pureBuiltins or callee in self.bodies) for callee in self.calls.get(ident, [])):
+                    pure.remove(ident)
+                    changed = True
+        self.pure = pure
+
+    def isPure(self, ident):
+        return ident in self.pure or (ident in pureBuiltins and ident not in self.bodies)
+
+# Arrays are allocated when the program runs, a value that holds one, in a field of a nested struct
+# too, cannot be a constant of the llvm ir
+def containsArray(ctx: Context, type: Type) -> bool:
+    if type.listDepth > 0:
+        return True
+    if type.type == TypeEnum.STRUCT:
+        return any(containsArray(ctx, fieldType) for _, fieldType, _ in ctx.getStructFields(type.structName).values())
+    return False
+
 # Verifies if my interpreter can calculate the value for the llvm ir codegen of global variables
-def checkCompileTimeConst(expr: Expression) -> bool:
+def checkCompileTimeConst(ctx: Context, expr: Expression) -> bool:
     match expr:
         case FunctionCall(ident, args):
-            return False
+            retType = ctx.getFuncDef(ident).retType
+            if containsArray(ctx, retType) or retType.type in [TypeEnum.STR, TypeEnum.VOID]:
+                return False
+            return ctx.isPure(ident) and all([checkCompileTimeConst(ctx, arg) for arg in args])
 
         case StructInit(ident, initFields):
-                return all([checkCompileTimeConst(initField) for initField in initFields])
+                return all([checkCompileTimeConst(ctx, initField) for initField in initFields])
 
         case Binary(op, left, right):
-            return checkCompileTimeConst(left) and checkCompileTimeConst(right)
+            return checkCompileTimeConst(ctx, left) and checkCompileTimeConst(ctx, right)
 
         case Unary(op, expression):
-            return checkCompileTimeConst(expression)
+            return checkCompileTimeConst(ctx, expression)
 
         case Ident(ident):
             return False
@@ -118,6 +167,7 @@ def first_pass(ctx: Context, node: Node):
                 print(f"Function {functionHeader.ident} cannot be re-defined. On line {node.lineno}")
                 exit(3)
             ctx.addFuncDef(functionHeader)
+            ctx.bodies.add(functionHeader.ident)
 
         case _:
             return
@@ -128,6 +178,13 @@ def second_pass(ctx: Context, node: Node, assignment=False):
             [second_pass(ctx, decl) for decl in decs[::-1]]
             [second_pass(ctx, defi) for defi in defs[::-1]]
 
+            # calls in global initializers need every function body checked to know which are pure
+            ctx.computePurity()
+            for defi in defs[::-1]:
+                if isinstance(defi, GlobalVariableDefinition) and not checkCompileTimeConst(ctx, defi.rhs):
+                    print(f"Global variable must be compile-time constant. On line {defi.lineno}")
+                    exit(3)
+
         case FunctionDeclaration(ident, args, retType):
             pass
 
@@ -135,9 +192,6 @@ def second_pass(ctx: Context, node: Node, assignment=False):
             pass
 
         case GlobalVariableDefinition(varType, ident, type, rhs):
-            if not checkCompileTimeConst(rhs):
-                print(f"Global variable must be compile-time constant. On line {node.lineno}")
-                exit(3)
             rhsType = second_pass(ctx, rhs)
             if type != rhsType:
                 print(f"Right hand side expression is type {rhsType} but its declare to have type {type}. On line {node.lineno}")
@@ -145,9 +199,12 @@ def second_pass(ctx: Context, node: Node, assignment=False):
 
         case FunctionDefinition(functionHeader, codeBlock):
             ctx.newScope()
-            [ctx.add(ident, type, varType)  for (varType, ident, type) in functionHeader.args]
-            ctx.add(functionHeader.ident, functionHeader.retType, VarType.VAR)
+            ctx.bindings = 0
+            functionHeader.argBindings = [ctx.add(ident, type, varType) for (varType, ident, type) in functionHeader.args]
+            functionHeader.retBinding = ctx.add(functionHeader.ident, functionHeader.retType, VarType.VAR)
+            ctx.function = functionHeader.ident
             second_pass(ctx, codeBlock)
+            ctx.function = None
             ctx.popScope()
 
         case CodeBlock(statements):
@@ -165,7 +222,7 @@ def second_pass(ctx: Context, node: Node, assignment=False):
                 print(f"Cannot shadow variables in the same scope. On line {node.lineno}")
                 exit(3)
 
-            ctx.add(ident, type, varType)
+            node.binding = ctx.add(ident, type, varType)
 
             if ctx.getType(ident):
                 node.shadows = ctx.getShadows(ident)
@@ -208,6 +265,8 @@ def second_pass(ctx: Context, node: Node, assignment=False):
                     exit(3)
 
             node.exprType = funcDef.retType
+            if ctx.function:
+                ctx.calls.setdefault(ctx.function, set()).add(ident)
 
             return funcDef.retType
 
@@ -293,6 +352,9 @@ def second_pass(ctx: Context, node: Node, assignment=False):
 
             node.glob = ctx.isGlobalVar(ident)
             node.shadows = ctx.getShadows(ident)
+            node.binding = ctx.getBinding(ident)
+            if node.glob and ctx.function:
+                ctx.impure.add(ctx.function)
 
             node.exprType = idType
 
@@ -0,0 +1,460 @@
+from array import array
+
+from parser import Node, Program, FunctionDeclaration, StructDeclaration, GlobalVariableDefinition, FunctionDefinition, CodeBlock, Assignment, While, If, VariableDefinition, FunctionCall, StructInit, Binary, Unary, Ident, Literal, Field, Variable, ArrayIndexing, FieldAccessing
+from parser import Type, TypeEnum, VarType, BinaryOp, UnaryOp
+from interpreter import Struct, builtins, arith, wrap, truncFloat, roundFloat, copy, defaultValue, defaultMaxCallDepth, indexError
+
+# Register bytecode. Every instruction is four ints of an array: the opcode and three operands,
+# registers are slots of the frame of the call. Register 0 is the return variable, then come the
+# arguments, the locals and the temporaries, and the constants of the function are at the end
+# of the frame, constant k is register -(k+1)
+
+(MOVE, COPY, GETG, SETG,
+ ADD, SUB, MUL, DIV, REM, NEG,
+ FADD, FSUB, FMUL, FDIV, FREM, FNEG,
+ LT, LE, GT, GE, EQ, NE,
+ FLT, FLE, FGT, FGE, FEQ, FNE,
+ NOT, JMP, JMPF, JMPT,
+ JNLT, JNLE, JNGT, JNGE, JNEQ, JNNE,
+ GETI, SETI, GETF, SETF, STRUCT,
+ CALL, BUILTIN, RET) = range(46)
+
+INT_MIN = -2**31
+INT_MAX = 2**31 - 1
+
+intOps = {BinaryOp.PLUS: ADD, BinaryOp.MINUS: SUB, BinaryOp.MULT: MUL, BinaryOp.DIV: DIV, BinaryOp.REM: REM,
+          BinaryOp.LT: LT, BinaryOp.LTE: LE, BinaryOp.GT: GT, BinaryOp.GTE: GE, BinaryOp.EQ: EQ, BinaryOp.NEQ: NE}
+floatOps = {BinaryOp.PLUS: FADD, BinaryOp.MINUS: FSUB, BinaryOp.MULT: FMUL, BinaryOp.DIV: FDIV, BinaryOp.REM: FREM,
+            BinaryOp.LT: FLT, BinaryOp.LTE: FLE, BinaryOp.GT: FGT, BinaryOp.GTE: FGE, BinaryOp.EQ: FEQ, BinaryOp.NEQ: FNE}
+# an int comparison that guards an if or a while becomes a single jump taken when it is false
+jumpOps = {BinaryOp.LT: JNLT, BinaryOp.LTE: JNLE, BinaryOp.GT: JNGT, BinaryOp.GTE: JNGE, BinaryOp.EQ: JNEQ, BinaryOp.NEQ: JNNE}
+
+class Function:
+    def __init__(self, functionHeader):
+        self.header = functionHeader
+        self.nargs = len(functionHeader.args)
+        self.code = array("i")
+        # registers of a new call, with the default return value and the constants
+        self.frame = None
+
+class Context:
+    def __init__(self):
+        self.globals = {}
+        self.functions = {}
+        self.functionTable = []
+        self.builtinTable = []
+        self.builtinIndexes = {}
+        self.function = None
+        self.constants = {}
+        self.scopes = []
+        self.size = 0
+        self.maxSize = 0
+
+    def newScope(self):
+        self.scopes.append({})
+
+    def popScope(self):
+        self.scopes.pop()
+
+    def temp(self):
+        reg = self.size
+        self.size += 1
+        self.maxSize = max(self.maxSize, self.size)
+        return reg
+
+    def define(self, ident):
+        reg = self.temp()
+        self.scopes[-1][ident] = reg
+        return reg
+
+    def getReg(self, ident):
+        for scope in reversed(self.scopes):
+            if ident in scope:
+                return scope[ident]
+
+    def constant(self, val):
+        # 1, 1.0 and True are equal keys of a dict
+        key = (type(val), repr(val))
+        if key not in self.constants:
+            self.constants[key] = (len(self.constants), val)
+        return -(self.constants[key][0] + 1)
+
+    def builtin(self, ident, nargs):
+        if ident not in self.builtinIndexes:
+            self.builtinIndexes[ident] = len(self.builtinTable)
+            self.builtinTable.append((builtins[ident], nargs))
+        return self.builtinIndexes[ident]
+
+    def emit(self, op, a=0, b=0, c=0):
+        code = self.function.code
+        code.extend((op, a, b, c))
+        return len(code) - 4
+
+    def here(self):
+        return len(self.function.code)
+
+    def patch(self, pos, target):
+        self.function.code[pos + 1] = target
+
+def isStruct(type):
+    return type.type == TypeEnum.STRUCT and type.listDepth == 0
+
+# Puts the value of expr in register dst, structs are copied since they are values
+def into(expr, ctx, dst):
+    reg = expression(expr, ctx, dst)
+    if isStruct(expr.exprType):
+        ctx.emit(COPY, dst, reg)
+    elif reg != dst:
+        ctx.emit(MOVE, dst, reg)
+
+# Returns the register with the value of node, dst is where the caller would like it
+def expression(node, ctx: Context, dst=None):
+    match node:
+        case Literal(val, type):
+            return ctx.constant(truncFloat(val) if type.type == TypeEnum.FLT else val)
+
+        case Variable(ident):
+            return expression(ident, ctx, dst)
+
+        case Ident(ident, glob):
+            if not glob:
+                return ctx.getReg(ident)
+            reg = ctx.temp() if dst is None else dst
+            ctx.emit(GETG, reg, ctx.globals[ident])
+            return reg
+
+        case Binary(BinaryOp.AND | BinaryOp.OR as op, left, right):
+            reg = ctx.temp()
+            into(left, ctx, reg)
+            jump = ctx.emit(JMPF if op == BinaryOp.AND else JMPT, 0, reg)
+            into(right, ctx, reg)
+            ctx.patch(jump, ctx.here())
+            return reg
+
+        case Binary(op, left, right):
+            l = expression(left, ctx)
+            r = expression(right, ctx)
+            reg = ctx.temp() if dst is None else dst
+            ops = intOps if left.exprType.type == TypeEnum.INT else floatOps
+            ctx.emit(ops[op], reg, l, r)
+            return reg
+
+        case Unary(op, expression_):
+            val = expression(expression_, ctx)
+            reg = ctx.temp() if dst is None else dst
+            if op == UnaryOp.NOT:
+                ctx.emit(NOT, reg, val)
+            else:
+                ctx.emit(NEG if node.exprType.type == TypeEnum.INT else FNEG, reg, val)
+            return reg
+
+        case ArrayIndexing(array, index):
+            a = expression(array, ctx)
+            i = expression(index, ctx)
+            reg = ctx.temp() if dst is None else dst
+            ctx.emit(GETI, reg, a, i)
+            return reg
+
+        case FieldAccessing(struct, field):
+            s = expression(struct, ctx)
+            reg = ctx.temp() if dst is None else dst
+            ctx.emit(GETF, reg, s, field.index)
+            return reg
+
+        case StructInit(ident, initFields):
+            base = ctx.size
+            regs = [ctx.temp() for _ in initFields]
+            for initField, reg in zip(initFields[::-1], regs):
+                into(initField, ctx, reg)
+            reg = ctx.temp() if dst is None else dst
+            ctx.emit(STRUCT, reg, base, len(initFields))
+            return reg
+
+        case FunctionCall(ident, args):
+            base = ctx.size
+            regs = [ctx.temp() for _ in args]
+            for arg, reg in zip(args[::-1], regs):
+                into(arg, ctx, reg)
+            reg = ctx.temp() if dst is None else dst
+            if ident in ctx.functions:
+                ctx.emit(CALL, reg, ctx.functions[ident], base)
+            else:
+                if ident not in builtins:
+                    print(f"Function {ident} is not defined. On line {node.lineno}")
+                    exit(4)
+                ctx.emit(BUILTIN, reg, ctx.builtin(ident, len(args)), base)
+            return reg
+
+# Puts the value of expr in a register for a store, a new one only if it has to be copied
+def stored(expr, ctx):
+    if isStruct(expr.exprType):
+        reg = ctx.temp()
+        into(expr, ctx, reg)
+        return reg
+    return expression(expr, ctx)
+
+# Emits the jumps taken when condition is false and returns their positions to be patched
+def jumpIfFalse(condition, ctx: Context):
+    match condition:
+        case Binary(BinaryOp.AND, left, right):
+            return jumpIfFalse(left, ctx) + jumpIfFalse(right, ctx)
+        case Binary(op, left, right) if op in jumpOps and left.exprType.type == TypeEnum.INT:
+            l = expression(left, ctx)
+            r = expression(right, ctx)
+            return [ctx.emit(jumpOps[op], 0, l, r)]
+        case _:
+            return [ctx.emit(JMPF, 0, expression(condition, ctx))]
+
+def statement(node, ctx: Context):
+    # temporaries of a statement are free once it is done
+    size = ctx.size
+    match node:
+        case CodeBlock(statements):
+            ctx.newScope()
+            [statement(stmt, ctx) for stmt in statements[::-1]]
+            ctx.popScope()
+
+        case VariableDefinition(varType, ident, type, rhs):
+            reg = ctx.temp()
+            into(rhs, ctx, reg)
+            ctx.scopes[-1][ident] = reg
+            size = ctx.size = reg + 1
+            return
+
+        case Assignment(Variable(Ident(ident, glob)), rhs):
+            if glob:
+                ctx.emit(SETG, ctx.globals[ident], stored(rhs, ctx))
+            else:
+                into(rhs, ctx, ctx.getReg(ident))
+
+        # the address is computed before the value like in the compiled code
+        case Assignment(ArrayIndexing(array, index), rhs):
+            a = expression(array, ctx)
+            i = expression(index, ctx)
+            ctx.emit(SETI, a, i, stored(rhs, ctx))
+
+        case Assignment(FieldAccessing(struct, field), rhs):
+            s = expression(struct, ctx)
+            ctx.emit(SETF, s, field.index, stored(rhs, ctx))
+
+        case While(guard, codeBlock):
+            top = ctx.here()
+            exits = jumpIfFalse(guard, ctx)
+            ctx.size = size
+            statement(codeBlock, ctx)
+            ctx.emit(JMP, top)
+            [ctx.patch(exit_, ctx.here()) for exit_ in exits]
+
+        case If(condition, thenBlock, elseBlock):
+            elses = jumpIfFalse(condition, ctx)
+            ctx.size = size
+            statement(thenBlock, ctx)
+            if elseBlock:
+                end = ctx.emit(JMP)
+                [ctx.patch(else_, ctx.here()) for else_ in elses]
+                statement(elseBlock, ctx)
+                ctx.patch(end, ctx.here())
+            else:
+                [ctx.patch(else_, ctx.here()) for else_ in elses]
+
+        case FunctionCall():
+            expression(node, ctx)
+
+    ctx.size = size
+
+def compileFunction(function, codeBlock, ctx: Context):
+    ctx.function = function
+    ctx.constants = {}
+    ctx.size = ctx.maxSize = 0
+    ctx.newScope()
+    ctx.define(function.header.ident)
+    [ctx.define(argIdent) for _, argIdent, _ in function.header.args[::-1]]
+    if codeBlock:
+        statement(codeBlock, ctx)
+    ctx.popScope()
+    ctx.emit(RET)
+
+    constants = sorted(ctx.constants.values(), reverse=True)
+    function.frame = [None] * ctx.maxSize + [val for _, val in constants]
+    function.frame[0] = defaultValue(function.header.retType)
+
+def compileProgram(program: Program):
+    ctx = Context()
+    defs = program.definitions[::-1]
+    for def_ in defs:
+        match def_:
+            case GlobalVariableDefinition(varType, ident, type, rhs):
+                ctx.globals[ident] = len(ctx.globals)
+            case FunctionDefinition(functionHeader, codeBlock):
+                ctx.functions[functionHeader.ident] = len(ctx.functionTable)
+                ctx.functionTable.append(Function(functionHeader))
+
+    for def_ in defs:
+        if isinstance(def_, FunctionDefinition):
+            compileFunction(ctx.functionTable[ctx.functions[def_.functionHeader.ident]], def_.codeBlock, ctx)
+
+    # the entry code initializes the globals and calls main with argc and argv in registers 1 and 2
+    main = ctx.functionTable[ctx.functions["main"]]
+    entry = Function(FunctionDeclaration("entry", [], Type(TypeEnum.VOID)))
+    ctx.function = entry
+    ctx.constants = {}
+    ctx.size = ctx.maxSize = 3
+    for def_ in defs:
+        if isinstance(def_, GlobalVariableDefinition):
+            reg = ctx.temp()
+            into(def_.rhs, ctx, reg)
+            ctx.emit(SETG, ctx.globals[def_.ident], reg)
+            ctx.size = 3
+    ctx.emit(CALL, 0, ctx.functions["main"], 1)
+    ctx.emit(RET)
+    constants = sorted(ctx.constants.values(), reverse=True)
+    entry.frame = [None] * ctx.maxSize + [val for _, val in constants]
+
+    return entry, ctx.functionTable, ctx.builtinTable, len(ctx.globals)
+
+def execute(entry, functions, builtinTable, nglobals, argv, maxCallDepth=None):
+    maxCallDepth = maxCallDepth or defaultMaxCallDepth
+    g = [None] * nglobals
+    stack = []
+    code = entry.code
+    r = entry.frame.copy()
+    r[1] = len(argv)
+    r[2] = argv
+    pc = 0
+
+    while True:
+        op = code[pc]
+        a = code[pc + 1]
+        b = code[pc + 2]
+        c = code[pc + 3]
+        pc += 4
+
+        if op == MOVE:
+            r[a] = r[b]
+        elif op == ADD:
+            v = r[b] + r[c]
+            r[a] = v if INT_MIN <= v <= INT_MAX else wrap(v)
+        elif op == SUB:
+            v = r[b] - r[c]
+            r[a] = v if INT_MIN <= v <= INT_MAX else wrap(v)
+        elif op == JNLT:
+            if not r[b] < r[c]:
+                pc = a
+        elif op == JNGT:
+            if not r[b] > r[c]:
+                pc = a
+        elif op == JNEQ:
+            if r[b] != r[c]:
+                pc = a
+        elif op == JMP:
+            pc = a
+        elif op == GETI:
+            arr = r[b]
+            index = r[c]
+            if arr is None or not 0 <= index < len(arr):
+                raise indexError(arr, index)
+            r[a] = arr[index]
+        elif op == SETI:
+            arr = r[a]
+            index = r[b]
+            if arr is None or not 0 <= index < len(arr):
+                raise indexError(arr, index)
+            arr[index] = r[c]
+        elif op == JMPF:
+            if not r[b]:
+                pc = a
+        elif op == JNLE:
+            if not r[b] <= r[c]:
+                pc = a
+        elif op == JNGE:
+            if not r[b] >= r[c]:
+                pc = a
+        elif op == JNNE:
+            if r[b] == r[c]:
+                pc = a
+        elif op == MUL:
+            v = r[b] * r[c]
+            r[a] = v if INT_MIN <= v <= INT_MAX else wrap(v)
+        elif op == DIV or op == REM:
+            r[a] = arith(BinaryOp.DIV if op == DIV else BinaryOp.REM, TypeEnum.INT, r[b], r[c])
+        elif op == CALL:
+            if len(stack) >= maxCallDepth:
+                raise RecursionError(f"maximum call depth of {maxCallDepth} exceeded")
+            function = functions[b]
+            frame = function.frame.copy()
+            frame[1:function.nargs + 1] = r[c:c + function.nargs]
+            stack.append((code, pc, r, a))
+            code = function.code
+            r = frame
+            pc = 0
+        elif op == RET:
+            if not stack:
+                return
+            val = r[0]
+            code, pc, r, a = stack.pop()
+            r[a] = val
+        elif op == BUILTIN:
+            builtin, nargs = builtinTable[b]
+            r[a] = builtin(*r[c:c + nargs])
+        elif op == GETF:
+            r[a] = r[b][c]
+        elif op == SETF:
+            r[a][b] = r[c]
+        elif op == GETG:
+            r[a] = g[b]
+        elif op == SETG:
+            g[a] = r[b]
+        elif op == LT:
+            r[a] = r[b] < r[c]
+        elif op == LE:
+            r[a] = r[b] <= r[c]
+        elif op == GT:
+            r[a] = r[b] > r[c]
+        elif op == GE:
+            r[a] = r[b] >= r[c]
+        elif op == EQ:
+            r[a] = r[b] == r[c]
+        elif op == NE:
+            r[a] = r[b] != r[c]
+        elif op == NOT:
+            r[a] = not r[b]
+        elif op == JMPT:
+            if r[b]:
+                pc = a
+        elif op == NEG:
+            r[a] = wrap(-r[b])
+        elif op == COPY:
+            r[a] = copy(r[b])
+        elif op == STRUCT:
+            r[a] = Struct(r[b:b + c])
+        elif op == FADD:
+            r[a] = roundFloat(r[b] + r[c])
+        elif op == FSUB:
+            r[a] = roundFloat(r[b] - r[c])
+        elif op == FMUL:
+            r[a] = roundFloat(r[b] * r[c])
+        elif op == FDIV:
+            r[a] = arith(BinaryOp.DIV, TypeEnum.FLT, r[b], r[c])
+        elif op == FREM:
+            r[a] = arith(BinaryOp.REM, TypeEnum.FLT, r[b], r[c])
+        elif op == FNEG:
+            r[a] = -r[b]
+        # float comparisons are unordered, true when an operand is nan
+        elif op == FLT:
+            r[a] = not r[b] >= r[c]
+        elif op == FLE:
+            r[a] = not r[b] > r[c]
+        elif op == FGT:
+            r[a] = not r[b] <= r[c]
+        elif op == FGE:
+            r[a] = not r[b] < r[c]
+        elif op == FEQ:
+            l = r[b]
+            rr = r[c]
+            r[a] = l == rr or l != l or rr != rr
+        elif op == FNE:
+            r[a] = r[b] != r[c]
+
+def runProgram(program: Program, argv, maxCallDepth=None):
+    execute(*compileProgram(program), argv, maxCallDepth)
+    return 0